@@ -0,0 +1,50 @@
+"""item processing status + durable jobs table
+
+Revision ID: 20261016_01
+Revises: 20260110_02
+Create Date: 2026-10-16
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261016_01"
+down_revision = "20260110_02"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # items: processing | ready | failed (existing rows are fully processed)
+    op.add_column("items", sa.Column("status", sa.String(length=16), nullable=False, server_default="ready"))
+    op.add_column("items", sa.Column("status_error", sa.Text(), nullable=True))
+    op.create_index("ix_items_status", "items", ["status"], unique=False)
+
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.String(length=64), primary_key=True),
+        sa.Column("kind", sa.String(length=64), nullable=False),
+        sa.Column("item_id", sa.String(length=64), nullable=True),
+        sa.Column("payload_json", sa.Text(), nullable=True),
+        sa.Column("status", sa.String(length=16), nullable=False, server_default="queued"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("max_attempts", sa.Integer(), nullable=False, server_default="3"),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_jobs_status_created_at", "jobs", ["status", "created_at"], unique=False)
+    op.create_index("ix_jobs_item_id", "jobs", ["item_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_item_id", table_name="jobs")
+    op.drop_index("ix_jobs_status_created_at", table_name="jobs")
+    op.drop_table("jobs")
+    op.drop_index("ix_items_status", table_name="items")
+    with op.batch_alter_table("items") as batch:
+        batch.drop_column("status_error")
+        batch.drop_column("status")
@@ -0,0 +1,197 @@
+"""trigger-maintained items_fts (external content)
+
+Revision ID: 20261016_02
+Revises: 20261016_01
+Create Date: 2026-10-16
+
+items_fts used to be filled from application code (fts_upsert_item after every write).
+Now SQLite keeps it in sync:
+
+  items / item_versions / item_tags / tags
+      -- triggers -->  items_fts_docs   (one row per item: title, series, prompt, tags)
+      -- triggers -->  items_fts        (FTS5, content='items_fts_docs')
+
+items_fts_source is a view computing the document of every item (current version's
+prompt, or the latest version when current_version_id is dangling; distinct tag names,
+sorted, space separated), so triggers and full rebuilds share one definition.
+items_fts_docs has an INTEGER PRIMARY KEY, so FTS rowids survive VACUUM.
+Trashed items keep their row; search filters on items.is_deleted.
+"""
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "20261016_02"
+down_revision = "20261016_01"
+branch_labels = None
+depends_on = None
+
+
+SOURCE_VIEW = """
+CREATE VIEW items_fts_source AS
+SELECT
+    i.id AS item_id,
+    COALESCE(i.title, '') AS title,
+    COALESCE(i.series_name_snapshot, '') AS series,
+    COALESCE(
+        (SELECT v.prompt_blob FROM item_versions v WHERE v.id = i.current_version_id),
+        (SELECT v.prompt_blob FROM item_versions v WHERE v.item_id = i.id ORDER BY v.v DESC LIMIT 1),
+        ''
+    ) AS prompt,
+    COALESCE(
+        (SELECT group_concat(name, ' ') FROM (
+            SELECT DISTINCT t.name AS name
+            FROM item_tags it JOIN tags t ON t.id = it.tag_id
+            WHERE it.item_id = i.id
+            ORDER BY t.name
+        )),
+        ''
+    ) AS tags
+FROM items i
+"""
+
+
+def _sync_sql(item_id_expr: str) -> str:
+    # upsert the document of one item (no-op if the item no longer exists)
+    return f"""
+        INSERT INTO items_fts_docs (item_id, title, series, prompt, tags)
+        SELECT item_id, title, series, prompt, tags FROM items_fts_source WHERE item_id = {item_id_expr}
+        ON CONFLICT(item_id) DO UPDATE SET
+            title = excluded.title, series = excluded.series,
+            prompt = excluded.prompt, tags = excluded.tags
+        WHERE title IS NOT excluded.title OR series IS NOT excluded.series
+           OR prompt IS NOT excluded.prompt OR tags IS NOT excluded.tags;
+    """
+
+
+TRIGGERS = {
+    # docs -> FTS (standard external-content pattern)
+    "items_fts_docs_ai": """
+        CREATE TRIGGER items_fts_docs_ai AFTER INSERT ON items_fts_docs BEGIN
+            INSERT INTO items_fts (rowid, item_id, title, series, prompt, tags)
+            VALUES (new.id, new.item_id, new.title, new.series, new.prompt, new.tags);
+        END
+    """,
+    "items_fts_docs_ad": """
+        CREATE TRIGGER items_fts_docs_ad AFTER DELETE ON items_fts_docs BEGIN
+            INSERT INTO items_fts (items_fts, rowid, item_id, title, series, prompt, tags)
+            VALUES ('delete', old.id, old.item_id, old.title, old.series, old.prompt, old.tags);
+        END
+    """,
+    "items_fts_docs_au": """
+        CREATE TRIGGER items_fts_docs_au AFTER UPDATE ON items_fts_docs BEGIN
+            INSERT INTO items_fts (items_fts, rowid, item_id, title, series, prompt, tags)
+            VALUES ('delete', old.id, old.item_id, old.title, old.series, old.prompt, old.tags);
+            INSERT INTO items_fts (rowid, item_id, title, series, prompt, tags)
+            VALUES (new.id, new.item_id, new.title, new.series, new.prompt, new.tags);
+        END
+    """,
+    # source tables -> docs
+    "items_fts_items_ai": f"""
+        CREATE TRIGGER items_fts_items_ai AFTER INSERT ON items BEGIN
+            {_sync_sql("new.id")}
+        END
+    """,
+    "items_fts_items_au": f"""
+        CREATE TRIGGER items_fts_items_au
+        AFTER UPDATE OF title, series_name_snapshot, current_version_id ON items BEGIN
+            {_sync_sql("new.id")}
+        END
+    """,
+    "items_fts_items_ad": """
+        CREATE TRIGGER items_fts_items_ad AFTER DELETE ON items BEGIN
+            DELETE FROM items_fts_docs WHERE item_id = old.id;
+        END
+    """,
+    "items_fts_versions_ai": f"""
+        CREATE TRIGGER items_fts_versions_ai AFTER INSERT ON item_versions BEGIN
+            {_sync_sql("new.item_id")}
+        END
+    """,
+    "items_fts_versions_au": f"""
+        CREATE TRIGGER items_fts_versions_au AFTER UPDATE OF prompt_blob, item_id ON item_versions BEGIN
+            {_sync_sql("new.item_id")}
+        END
+    """,
+    "items_fts_versions_ad": f"""
+        CREATE TRIGGER items_fts_versions_ad AFTER DELETE ON item_versions BEGIN
+            {_sync_sql("old.item_id")}
+        END
+    """,
+    "items_fts_item_tags_ai": f"""
+        CREATE TRIGGER items_fts_item_tags_ai AFTER INSERT ON item_tags BEGIN
+            {_sync_sql("new.item_id")}
+        END
+    """,
+    "items_fts_item_tags_ad": f"""
+        CREATE TRIGGER items_fts_item_tags_ad AFTER DELETE ON item_tags BEGIN
+            {_sync_sql("old.item_id")}
+        END
+    """,
+    "items_fts_tags_au": """
+        CREATE TRIGGER items_fts_tags_au AFTER UPDATE OF name ON tags BEGIN
+            INSERT INTO items_fts_docs (item_id, title, series, prompt, tags)
+            SELECT s.item_id, s.title, s.series, s.prompt, s.tags
+            FROM items_fts_source s
+            WHERE s.item_id IN (SELECT item_id FROM item_tags WHERE tag_id = new.id)
+            ON CONFLICT(item_id) DO UPDATE SET tags = excluded.tags;
+        END
+    """,
+}
+
+
+def upgrade() -> None:
+    # the old application-maintained table (content stored inside FTS)
+    op.execute("DROP TABLE IF EXISTS items_fts;")
+
+    op.execute(
+        "CREATE TABLE items_fts_docs ("
+        " id INTEGER PRIMARY KEY,"
+        " item_id TEXT NOT NULL UNIQUE,"
+        " title TEXT NOT NULL DEFAULT '',"
+        " series TEXT NOT NULL DEFAULT '',"
+        " prompt TEXT NOT NULL DEFAULT '',"
+        " tags TEXT NOT NULL DEFAULT ''"
+        ");"
+    )
+    op.execute(SOURCE_VIEW)
+    op.execute(
+        "INSERT INTO items_fts_docs (item_id, title, series, prompt, tags) "
+        "SELECT item_id, title, series, prompt, tags FROM items_fts_source;"
+    )
+
+    op.execute(
+        "CREATE VIRTUAL TABLE items_fts USING fts5("
+        " item_id UNINDEXED,"
+        " title,"
+        " series,"
+        " prompt,"
+        " tags,"
+        " content='items_fts_docs',"
+        " content_rowid='id'"
+        ");"
+    )
+    op.execute("INSERT INTO items_fts (items_fts) VALUES ('rebuild');")
+
+    for ddl in TRIGGERS.values():
+        op.execute(ddl)
+
+
+def downgrade() -> None:
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name};")
+    op.execute("DROP TABLE IF EXISTS items_fts;")
+    op.execute("DROP VIEW IF EXISTS items_fts_source;")
+    op.execute("DROP TABLE IF EXISTS items_fts_docs;")
+
+    # back to 20260108_03 (empty; refill with rebuild_fts.py)
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5("
+        " item_id UNINDEXED,"
+        " title,"
+        " series,"
+        " prompt,"
+        " tags"
+        ");"
+    )
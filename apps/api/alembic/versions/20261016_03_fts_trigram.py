@@ -0,0 +1,58 @@
+"""items_fts: trigram tokenizer (CJK / substring search)
+
+Revision ID: 20261016_03
+Revises: 20261016_02
+Create Date: 2026-10-16
+
+unicode61 keeps an unsegmented CJK run ("一只可爱的猫咪在草地上") as one token, so a
+query like "猫咪" never matches and search fell back to LIKE. The trigram tokenizer
+indexes every 3-character window: any substring of 3+ characters is an index lookup,
+with LIKE '%q%' semantics (case-insensitive). Shorter queries are answered by a scan
+of items_fts_docs (see services/fts.py).
+
+Needs SQLite >= 3.34; older libraries keep the unicode61 index.
+"""
+from __future__ import annotations
+
+import logging
+
+from alembic import op
+
+
+revision = "20261016_03"
+down_revision = "20261016_02"
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger("alembic.runtime.migration")
+
+
+def _create(tokenize: str) -> None:
+    op.execute("DROP TABLE IF EXISTS items_fts;")
+    op.execute(
+        "CREATE VIRTUAL TABLE items_fts USING fts5("
+        " item_id UNINDEXED,"
+        " title,"
+        " series,"
+        " prompt,"
+        " tags,"
+        " content='items_fts_docs',"
+        " content_rowid='id'"
+        f"{tokenize}"
+        ");"
+    )
+    # reindex from the documents (the items_fts_docs triggers keep it in sync afterwards)
+    op.execute("INSERT INTO items_fts (items_fts) VALUES ('rebuild');")
+    op.execute("INSERT INTO items_fts (items_fts) VALUES ('optimize');")
+
+
+def upgrade() -> None:
+    version = op.get_bind().exec_driver_sql("SELECT sqlite_version()").scalar()
+    if tuple(int(x) for x in version.split(".")[:2]) < (3, 34):
+        log.warning("items_fts: SQLite %s has no trigram tokenizer; keeping unicode61", version)
+        return
+    _create(", tokenize='trigram'")
+
+
+def downgrade() -> None:
+    _create("")
@@ -0,0 +1,80 @@
+"""items_fts: deferrable document sync for bulk writes
+
+Revision ID: 20261017_01
+Revises: 20261016_03
+Create Date: 2026-10-17
+
+The source -> items_fts_docs triggers recompute an item's document on every row they
+see: a bulk tag change over 10k items recomputed (and reindexed) each document once per
+link inserted or deleted, ~90% of the statement time.
+
+While items_fts_defer holds a row, the item_tags and items update triggers only record
+the item in items_fts_pending; services/fts.deferred_sync() sets the flag inside a write
+transaction and, before the commit, syncs the pending documents with one set-based
+statement and clears the flag again. The flag is never committed, so other connections
+(and every other write path) keep the immediate triggers.
+"""
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "20261017_01"
+down_revision = "20261016_03"
+branch_labels = None
+depends_on = None
+
+
+_DEFERRED = "EXISTS (SELECT 1 FROM items_fts_defer)"
+
+
+def _sync_sql(item_id_expr: str) -> str:
+    # same statement as 20261016_02
+    return f"""
+        INSERT INTO items_fts_docs (item_id, title, series, prompt, tags)
+        SELECT item_id, title, series, prompt, tags FROM items_fts_source WHERE item_id = {item_id_expr}
+        ON CONFLICT(item_id) DO UPDATE SET
+            title = excluded.title, series = excluded.series,
+            prompt = excluded.prompt, tags = excluded.tags
+        WHERE title IS NOT excluded.title OR series IS NOT excluded.series
+           OR prompt IS NOT excluded.prompt OR tags IS NOT excluded.tags;
+    """
+
+
+# name -> (trigger event, item id expression)
+DEFERRABLE = {
+    "items_fts_items_au": ("AFTER UPDATE OF title, series_name_snapshot, current_version_id ON items", "new.id"),
+    "items_fts_item_tags_ai": ("AFTER INSERT ON item_tags", "new.item_id"),
+    "items_fts_item_tags_ad": ("AFTER DELETE ON item_tags", "old.item_id"),
+}
+
+
+def upgrade() -> None:
+    op.execute("CREATE TABLE items_fts_defer (id INTEGER PRIMARY KEY CHECK (id = 1));")
+    op.execute("CREATE TABLE items_fts_pending (item_id TEXT PRIMARY KEY) WITHOUT ROWID;")
+
+    for name, (on, item_id) in DEFERRABLE.items():
+        op.execute(f"DROP TRIGGER IF EXISTS {name};")
+        op.execute(f"""
+            CREATE TRIGGER {name} {on} WHEN NOT {_DEFERRED} BEGIN
+                {_sync_sql(item_id)}
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {name}_deferred {on} WHEN {_DEFERRED} BEGIN
+                INSERT OR IGNORE INTO items_fts_pending (item_id) VALUES ({item_id});
+            END
+        """)
+
+
+def downgrade() -> None:
+    for name, (on, item_id) in DEFERRABLE.items():
+        op.execute(f"DROP TRIGGER IF EXISTS {name}_deferred;")
+        op.execute(f"DROP TRIGGER IF EXISTS {name};")
+        op.execute(f"""
+            CREATE TRIGGER {name} {on} BEGIN
+                {_sync_sql(item_id)}
+            END
+        """)
+    op.execute("DROP TABLE IF EXISTS items_fts_pending;")
+    op.execute("DROP TABLE IF EXISTS items_fts_defer;")
@@ -0,0 +1,34 @@
+"""purge_files: outbox of files to remove after a purge
+
+Revision ID: 20261017_02
+Revises: 20261017_01
+Create Date: 2026-10-17
+
+The purge engine (services/purge.py) records the files of the items it deletes in the
+same transaction as the row deletes, and removes a row once its file is gone. Files
+of a purge interrupted between the two steps are still listed here and get removed
+on the next start / purge.
+"""
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "20261017_02"
+down_revision = "20261017_01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE TABLE purge_files ("
+        " path TEXT PRIMARY KEY,"  # storage-relative, posix
+        " item_id TEXT,"
+        " created_at DATETIME NOT NULL"
+        ") WITHOUT ROWID;"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS purge_files;")
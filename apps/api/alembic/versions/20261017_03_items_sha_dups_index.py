@@ -0,0 +1,28 @@
+"""items: covering index for the duplicates grouping
+
+Revision ID: 20261017_03
+Revises: 20261017_02
+Create Date: 2026-10-17
+
+GET /items/duplicates groups items by media_sha256 (and tool_id), skipping trashed
+ones. With only ix_items_media_sha256 SQLite reads every item row for is_deleted /
+tool_id and sorts the groups in a temp b-tree; (media_sha256, tool_id, is_deleted)
+answers the grouping, the count and the keyset from the index alone, in key order.
+"""
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "20261017_03"
+down_revision = "20261017_02"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_items_media_sha256_dups", "items", ["media_sha256", "tool_id", "is_deleted"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_items_media_sha256_dups", table_name="items")
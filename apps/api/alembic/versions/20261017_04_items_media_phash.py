@@ -0,0 +1,28 @@
+"""items.media_phash: 64-bit perceptual hash for near-duplicate search
+
+Revision ID: 20261017_04
+Revises: 20261017_03
+Create Date: 2026-10-17
+
+Set at ingest from the item's thumbnail (services/phash.py) and backfilled by
+POST /_maintenance/backfill_phash. Stored as a signed 64-bit INTEGER; searched in
+memory (services/phash_index.py), so no index.
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_04"
+down_revision = "20261017_03"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("items", sa.Column("media_phash", sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("items", "media_phash")
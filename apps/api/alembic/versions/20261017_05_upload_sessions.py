@@ -0,0 +1,43 @@
+"""upload_sessions: resumable chunked uploads
+
+Revision ID: 20261017_05
+Revises: 20261017_04
+Create Date: 2026-10-17
+
+One row per chunked upload (services/upload_sessions.py): the announced size and item
+meta, and the byte ranges received so far, so a client can resume after a dropped
+connection. The bytes themselves are assembled in <storage>/.staging/uploads.
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261017_05"
+down_revision = "20261017_04"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "upload_sessions",
+        sa.Column("id", sa.String(length=64), primary_key=True),
+        sa.Column("filename", sa.Text(), nullable=False),
+        sa.Column("content_type", sa.String(length=255), nullable=True),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("sha256", sa.String(length=64), nullable=True),
+        sa.Column("meta_json", sa.Text(), nullable=False),
+        sa.Column("received_json", sa.Text(), nullable=False, server_default="[]"),
+        sa.Column("status", sa.String(length=16), nullable=False, server_default="open"),
+        sa.Column("item_id", sa.String(length=64), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_upload_sessions_expires_at", "upload_sessions", ["expires_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_upload_sessions_expires_at", table_name="upload_sessions")
+    op.drop_table("upload_sessions")
@@ -0,0 +1,28 @@
+"""items.renditions: multi-size WebP/JPEG grid renditions next to the thumb
+
+Revision ID: 20261017_06
+Revises: 20261017_05
+Create Date: 2026-10-17
+
+Written by upload post-processing (services/thumbs.py) and backfilled by
+POST /_maintenance/backfill_renditions: the formats and [width, height] sizes made, as
+compact JSON. File paths follow from thumb_path, so NULL just means "thumb only".
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_06"
+down_revision = "20261017_05"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("items", sa.Column("renditions", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("items", "renditions")
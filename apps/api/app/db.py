@@ -1,25 +1,45 @@
 from __future__ import annotations
 
 from contextlib import contextmanager
+from typing import Optional
+
 from sqlmodel import SQLModel, Session, create_engine
+from sqlalchemy import event
 from sqlalchemy.engine import Engine
 
 from app.settings import settings
+from app.util import generation
+from app.util.sqlite import apply_pragmas, is_file_url
 
 
-def make_engine() -> Engine:
-    # SQLite needs check_same_thread=False for typical FastAPI usage
-    connect_args = {}
-    if settings.database_url.startswith("sqlite"):
-        connect_args = {"check_same_thread": False}
+def make_engine(database_url: Optional[str] = None) -> Engine:
+    url = database_url or settings.database_url
+    if not is_file_url(url):
+        engine = create_engine(url, echo=False, pool_pre_ping=True)
+        generation.install(engine)
+        return engine
 
-    return create_engine(
-        settings.database_url,
+    # SQLite file: check_same_thread=False for typical FastAPI usage; WAL + pragmas on
+    # every new connection, and a warm pool (a local file never goes stale, so no pre-ping)
+    engine = create_engine(
+        url,
         echo=False,
-        connect_args=connect_args,
-        pool_pre_ping=True,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": int(settings.sqlite_busy_timeout_ms) / 1000.0,
+        },
+        pool_size=max(1, int(settings.sqlite_pool_size)),
+        max_overflow=int(settings.sqlite_pool_size) * 2,
     )
 
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        apply_pragmas(dbapi_conn)
+
+    # read caches are keyed on the data generation (util/generation.py)
+    generation.install(engine)
+    return engine
+
 
 engine = make_engine()
 
@@ -98,6 +98,37 @@ def _startup():
     from library.db import init_db as init_library_db
     init_library_db()
 
+    # upload post-processing workers (re-queues jobs interrupted by a restart)
+    from app.services import jobs
+    jobs.start_workers()
+
+    # files left behind by a purge that was interrupted after its DB commit
+    from app.services import purge
+    purge.resume_files_async()
+
+    # upload staging files of requests killed mid-way
+    from app.services import ingest
+    from library.routes.assets import STORAGE_ROOT as library_storage_root
+    ingest.sweep(settings.storage_root)
+    ingest.sweep(library_storage_root)
+
+    # chunked upload sessions past their TTL
+    from sqlmodel import Session
+    from app.db import engine
+    from app.services import upload_sessions
+    with Session(engine) as session:
+        upload_sessions.sweep(session, startup=True)
+
+
+@app.on_event("shutdown")
+def _shutdown():
+    from app.services import jobs
+    jobs.stop_workers()
+
+    # persist face matches ingested since the last snapshot
+    from library.services import face_index
+    face_index.save_snapshot()
+
 
 # Routers
 app.include_router(items_router, tags=["items"])
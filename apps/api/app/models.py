@@ -102,6 +102,12 @@ class Item(SQLModel, table=True):
     deleted_at: Optional[datetime] = Field(default=None, index=True)
 
     media_sha256: Optional[str] = Field(default=None, index=True)
+    media_phash: Optional[int] = Field(default=None)  # signed 64-bit pHash, see services/phash.py
+    renditions: Optional[str] = None  # grid renditions next to the thumb, see services/thumbs.py
+
+    # upload post-processing: processing / ready / failed
+    status: str = Field(default="ready", index=True)
+    status_error: Optional[str] = None
 
 
 class ItemVersion(SQLModel, table=True):
@@ -132,3 +138,39 @@ class ItemEmbedding(SQLModel, table=True):
     dim: int
     vector_blob: bytes
     created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# ---- Background jobs ----
+
+class Job(SQLModel, table=True):
+    __tablename__ = "jobs"
+    id: str = Field(primary_key=True)
+    kind: str
+    item_id: Optional[str] = Field(default=None, index=True)
+    payload_json: Optional[str] = None
+    status: str = Field(default="queued")  # queued / running / done / failed
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=3)
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+# ---- Resumable chunked uploads (see services/upload_sessions.py) ----
+
+class UploadSession(SQLModel, table=True):
+    __tablename__ = "upload_sessions"
+    id: str = Field(primary_key=True)
+    filename: str
+    content_type: Optional[str] = None
+    size: int  # announced total, bytes
+    sha256: Optional[str] = None  # expected by the client, checked at finalize
+    meta_json: str  # ItemCreateMeta of the item to create
+    received_json: str = Field(default="[]")  # merged [start, end) byte ranges on disk
+    status: str = Field(default="open")  # open / finalizing / done
+    item_id: Optional[str] = None  # set by finalize
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(index=True)
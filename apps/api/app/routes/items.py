@@ -4,51 +4,59 @@ import json
 import mimetypes
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 
-from fastapi import APIRouter, Depends, File, Form, UploadFile, Request, Query
+from fastapi import APIRouter, Depends, File, Form, UploadFile, Request, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
 
 from app.db import get_session
 from app.settings import settings
-from sqlalchemy import func, text as sa_text
+from sqlalchemy import and_, func, tuple_, text as sa_text, insert as sa_insert, delete as sa_delete, update as sa_update
 from app.models import (
-    Tool, Category, Series,
+    Series,
     Item, ItemVersion,
     Tag, ItemTag,
+    UploadSession,
 )
 from app.schemas import (
     ItemCreateMeta, ItemDTO, PageDTO,
     ToolDTO, CategoryDTO, SeriesSnapshotDTO,
     ItemVersionDTO, AutoCategoryDTO, AutoCandidateDTO,
     ItemPatch, ItemVersionCreate,
+    SimilarHitDTO, SimilarPageDTO,
+    UploadSessionCreate, UploadSessionDTO,
 )
-from app.services.auto_category import classify_item, serialize_candidates
+from app.services import ref_cache, centroids, jobs, item_pipeline, vector_index, clip_batcher, items_cache, file_stat
+from app.services import artifacts, ingest, phash_index, thumbs, upload_sessions
+from app.services.phash import to_hex as phash_to_hex
+from app.services.classify import MODEL_KEY_DEFAULT, _open_clip_available
+from app.services.ref_cache import ToolRef, CategoryRef
+from app.util import generation as data_generation
 from app.util.ids import new_id
 from app.util.errors import raise_api_error
+from app.util.cursor import encode_cursor, decode_cursor
 from app.services.storage import save_uploadfile_streaming, safe_unlink
-from app.services.thumbs import make_image_thumb, make_video_poster
-from app.services.classify import classify_and_store_item_embedding
-from app.services.fts import fts_upsert_item, fts_search_ids_join_items
+from app.services.fts import fts_search_ids_join_items, fts_bm25_scores, record_like_fallback
+from app.services.fts import deferred_sync as fts_deferred_sync
+from app.services import semantic as semantic_service
+from app.services import purge as purge_service
 from app.util.text import normalize_text, normalize_list
 from app.schemas import ItemsBulkPatch
 from app.models import Series
-from app.services.fts import fts_upsert_item
 from app.util.text import normalize_list
-from app.services.fts import fts_delete_item, fts_upsert_item
 from app.schemas import ItemsBulkIds
 
 
 from pathlib import Path
 from app.schemas import ItemsBulkPurgeRequest
-from app.models import ItemVersion, ItemTag, ItemEmbedding
-from app.services.fts import fts_delete_item
+from app.models import ItemVersion, ItemTag
 from app.services.storage import safe_unlink
 from app.settings import settings
 
 from sqlalchemy import func
 from app.schemas import DuplicatePageDTO, DuplicateGroupDTO, DuplicateItemLiteDTO
-from app.models import Tool
+from app.schemas import ItemsExistRequest, ItemsExistDTO
 
 
 
@@ -64,13 +72,13 @@ def _file_url(rel_path: str) -> str:
     return f"/files/{rel_path}"
 
 
-def _guess_media_type(upload: UploadFile, filename: str) -> tuple[str, str]:
+def _guess_media_type(content_type: Optional[str], filename: str) -> tuple[str, str]:
     """
     Returns (media_type, ext_with_dot).
     media_type: "image" or "video"
     """
     name = (filename or "").lower()
-    ct = (upload.content_type or "").lower()
+    ct = (content_type or "").lower()
 
     # Prefer explicit content_type
     if ct.startswith("image/"):
@@ -87,81 +95,117 @@ def _guess_media_type(upload: UploadFile, filename: str) -> tuple[str, str]:
     if ext in (".mp4", ".mov", ".webm", ".mkv"):
         return "video", ext
 
-    raise ValueError(f"unsupported file type: content_type={upload.content_type} filename={filename}")
+    raise ValueError(f"unsupported file type: content_type={content_type} filename={filename}")
+
+
+_IN_CHUNK = 500  # ids per IN (...) list
+
+
+def _chunks(ids: list[str], n: int = _IN_CHUNK):
+    for i in range(0, len(ids), n):
+        yield ids[i : i + n]
+
+
+def _existing_tag_ids(session: Session, names: list[str]) -> dict[str, str]:
+    # committed tags resolve from the in-process cache; only unknown names hit the
+    # session (which also sees tags created earlier in this transaction)
+    out = ref_cache.tag_ids_by_names(names)
+    unknown = [n for n in names if n not in out]
+    for chunk in _chunks(unknown):
+        out.update({name: tid for tid, name in session.exec(select(Tag.id, Tag.name).where(Tag.name.in_(chunk))).all()})
+    return out
 
 
 def _upsert_tags(session: Session, names: list[str]) -> list[str]:
-    out_ids: list[str] = []
-    for raw in names:
-        name = (raw or "").strip()
-        if not name:
-            continue
+    """
+    Tag ids for `names` (input order, de-duplicated), creating missing tags with one
+    INSERT OR IGNORE.
+    """
+    names = [n for n in dict.fromkeys((raw or "").strip() for raw in names) if n]
+    if not names:
+        return []
+    known = _existing_tag_ids(session, names)
+    missing = [n for n in names if n not in known]
+    if missing:
+        now = datetime.utcnow()
+        session.exec(
+            sa_insert(Tag.__table__).prefix_with("OR IGNORE"),
+            params=[{"id": new_id(), "name": n, "created_at": now} for n in missing],
+        )
+        known.update(_existing_tag_ids(session, missing))
+    return [known[n] for n in names]
 
-        existing = session.exec(select(Tag).where(Tag.name == name)).first()
-        if existing:
-            out_ids.append(existing.id)
-            continue
 
-        tid = new_id()
-        session.add(Tag(id=tid, name=name, created_at=datetime.utcnow()))
-        session.flush()
-        out_ids.append(tid)
-    return out_ids
+def _link_tags(session: Session, item_ids: list[str], tag_ids: list[str]) -> None:
+    if not item_ids or not tag_ids:
+        return
+    now = datetime.utcnow()
+    for chunk in _chunks(item_ids):
+        session.exec(
+            sa_insert(ItemTag.__table__).prefix_with("OR IGNORE"),
+            params=[{"item_id": iid, "tag_id": tid, "created_at": now} for iid in chunk for tid in tag_ids],
+        )
+
 
+def _unlink_tags(session: Session, item_ids: list[str], tag_ids: Optional[list[str]] = None, keep: bool = False) -> None:
+    # drop links of item_ids to tag_ids (keep=False) / to every tag except tag_ids (keep=True)
+    t = ItemTag.__table__
+    if not item_ids or (tag_ids is not None and not tag_ids and not keep):
+        return
+    for chunk in _chunks(item_ids):
+        stmt = sa_delete(t).where(t.c.item_id.in_(chunk))
+        if tag_ids:
+            stmt = stmt.where(t.c.tag_id.not_in(tag_ids) if keep else t.c.tag_id.in_(tag_ids))
+        session.exec(stmt)
 
-def _set_item_tags_replace_all(session: Session, item_id: str, tag_names: list[str]) -> list[str]:
-    # delete all links then insert
-    links = session.exec(select(ItemTag).where(ItemTag.item_id == item_id)).all()
-    for lk in links:
-        session.delete(lk)
 
+def _set_item_tags_replace_all(session: Session, item_id: str, tag_names: list[str]) -> list[str]:
+    # diff against the current links: unchanged links (and their FTS documents) stay untouched
     tag_ids = _upsert_tags(session, tag_names)
-    now = datetime.utcnow()
-    for tid in tag_ids:
-        session.add(ItemTag(item_id=item_id, tag_id=tid, created_at=now))
+    _unlink_tags(session, [item_id], tag_ids, keep=True)
+    _link_tags(session, [item_id], tag_ids)
     return tag_ids
 
 
-def _load_item_tags(session: Session, item_id: str) -> list[str]:
-    # join item_tags -> tags
-    tag_ids = [r.tag_id for r in session.exec(select(ItemTag).where(ItemTag.item_id == item_id)).all()]
-    if not tag_ids:
-        return []
-    tags = session.exec(select(Tag).where(Tag.id.in_(tag_ids))).all()
-    # preserve input order loosely by name
-    return sorted([t.name for t in tags])
+def _load_tags_by_item(session: Session, item_ids: list[str]) -> dict[str, list[str]]:
+    """
+    Batched tag loader: one join query for a whole page of items.
+    Returns {item_id: sorted tag names}; items without tags are absent.
+    """
+    if not item_ids:
+        return {}
+    rows = session.exec(
+        select(ItemTag.item_id, ItemTag.tag_id).where(ItemTag.item_id.in_(item_ids))
+    ).all()
+    names = ref_cache.tag_names_by_ids(tid for _, tid in rows)
+    out: dict[str, list[str]] = {}
+    for iid, tid in rows:
+        if tid in names:
+            out.setdefault(iid, []).append(names[tid])
+    for names in out.values():
+        # preserve input order loosely by name
+        names.sort()
+    return out
 
 
-def _build_item_dto(session: Session, item: Item) -> ItemDTO:
-    tool = session.get(Tool, item.tool_id)
-    if not tool:
-        raise RuntimeError("item.tool not found")
+def _load_item_tags(session: Session, item_id: str) -> list[str]:
+    return _load_tags_by_item(session, [item_id]).get(item_id, [])
 
-    category = session.get(Category, item.category_id)
-    if not category:
-        raise RuntimeError("item.category not found")
 
+def _item_to_dto(
+    item: Item,
+    tool: ToolRef,
+    category: CategoryRef,
+    auto_category: Optional[CategoryRef],
+    version: ItemVersion,
+    tags: list[str],
+) -> ItemDTO:
     auto_cat = None
-    if item.auto_category_id:
-        ac = session.get(Category, item.auto_category_id)
-        if ac:
-            auto_cat = AutoCategoryDTO(
-                category=CategoryDTO.model_validate(ac),
-                confidence=item.auto_confidence,
-            )
-
-    v = None
-    if item.current_version_id:
-        v = session.get(ItemVersion, item.current_version_id)
-    if not v:
-        # fallback: pick latest by v
-        v = session.exec(
-            select(ItemVersion).where(ItemVersion.item_id == item.id).order_by(ItemVersion.v.desc())
-        ).first()
-    if not v:
-        raise RuntimeError("item.version not found")
-
-    tags = _load_item_tags(session, item.id)
+    if auto_category:
+        auto_cat = AutoCategoryDTO(
+            category=CategoryDTO.model_validate(auto_category),
+            confidence=item.auto_confidence,
+        )
 
     series_snap = SeriesSnapshotDTO(
         id=item.series_id,
@@ -188,20 +232,84 @@ def _build_item_dto(session: Session, item: Item) -> ItemDTO:
         media_url=_file_url(item.media_path),
         thumb_url=_file_url(item.thumb_path),
         poster_url=_file_url(item.poster_path) if item.poster_path else None,
+        srcset=thumbs.srcsets(item.thumb_path, item.renditions, _file_url),
         series=series_snap,
         category=CategoryDTO.model_validate(category),
         auto_category=auto_cat,
         auto_candidates=auto_candidates,
         tags=tags,
-        current_version=ItemVersionDTO.model_validate(v),
+        current_version=ItemVersionDTO.model_validate(version),
         created_at=item.created_at,
         updated_at=item.updated_at,
         is_deleted=bool(item.is_deleted),
         deleted_at=item.deleted_at,
         media_sha256=item.media_sha256,
+        status=item.status or "ready",
+        status_error=item.status_error,
     )
 
 
+def _build_item_dtos(session: Session, items: list[Item]) -> list[ItemDTO]:
+    """
+    Batched DTO assembler for a page of items.
+    Tools/categories/tag names come from the reference cache; current versions and
+    tag links are loaded with a constant number of queries, then DTOs are built in
+    input order.
+    """
+    if not items:
+        return []
+
+    version_ids = {it.current_version_id for it in items if it.current_version_id}
+    versions_by_id = {}
+    if version_ids:
+        versions_by_id = {
+            v.id: v for v in session.exec(select(ItemVersion).where(ItemVersion.id.in_(version_ids))).all()
+        }
+
+    versions: dict[str, ItemVersion] = {}
+    need_fallback: list[str] = []
+    for it in items:
+        v = versions_by_id.get(it.current_version_id) if it.current_version_id else None
+        if v:
+            versions[it.id] = v
+        else:
+            need_fallback.append(it.id)
+
+    if need_fallback:
+        # fallback: pick latest by v
+        rows = session.exec(
+            select(ItemVersion)
+            .where(ItemVersion.item_id.in_(need_fallback))
+            .order_by(ItemVersion.item_id, ItemVersion.v.desc())
+        ).all()
+        for v in rows:
+            versions.setdefault(v.item_id, v)
+
+    tags_by_item = _load_tags_by_item(session, [it.id for it in items])
+
+    out: list[ItemDTO] = []
+    for it in items:
+        tool = ref_cache.get_tool(it.tool_id)
+        if not tool:
+            raise RuntimeError("item.tool not found")
+
+        category = ref_cache.get_category(it.category_id)
+        if not category:
+            raise RuntimeError("item.category not found")
+
+        v = versions.get(it.id)
+        if not v:
+            raise RuntimeError("item.version not found")
+
+        auto_category = ref_cache.get_category(it.auto_category_id) if it.auto_category_id else None
+        out.append(_item_to_dto(it, tool, category, auto_category, v, tags_by_item.get(it.id, [])))
+    return out
+
+
+def _build_item_dto(session: Session, item: Item) -> ItemDTO:
+    return _build_item_dtos(session, [item])[0]
+
+
 def _normalize_scalar_ids(raw_list):
     """
     SQLModel may return scalars (str) or rows (tuple/Row).
@@ -218,6 +326,33 @@ def _normalize_scalar_ids(raw_list):
     return out
 
 
+def _item_keyset_cursor(it: Item) -> str:
+    return encode_cursor({"c": it.created_at.isoformat(), "i": it.id})
+
+
+def _parse_cursor(cursor: str) -> dict:
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise_api_error(400, "INVALID_CURSOR", str(e), {"cursor": cursor})
+
+
+def _parse_item_keyset(cursor: str) -> tuple[datetime, str]:
+    payload = _parse_cursor(cursor)
+    try:
+        return datetime.fromisoformat(payload["c"]), str(payload["i"])
+    except Exception:
+        raise_api_error(400, "INVALID_CURSOR", "cursor is not a keyset cursor for /items", {"cursor": cursor})
+
+
+def _parse_offset_cursor(cursor: str) -> int:
+    payload = _parse_cursor(cursor)
+    try:
+        return max(0, int(payload["o"]))
+    except Exception:
+        raise_api_error(400, "INVALID_CURSOR", "cursor is not a search cursor for /items", {"cursor": cursor})
+
+
 @router.get("/items", response_model=PageDTO)
 def list_items(
     session: Session = Depends(get_session),
@@ -231,7 +366,68 @@ def list_items(
     tag: Optional[list[str]] = Query(None),  # repeatable: ?tag=a&tag=b
     include_deleted: int = Query(0),
     only_deleted: int = Query(0),
+    cursor: Optional[str] = Query(None),  # opaque next_cursor from a previous page; replaces page/OFFSET
+    with_total: Optional[int] = Query(None, ge=0, le=1),  # default: 1 in page mode, 0 in cursor mode
+    semantic: Optional[str] = Query(None),  # CLIP text -> image search; takes precedence over q
+    semantic_mode: str = Query("vector", pattern="^(vector|hybrid)$"),  # hybrid: blend with FTS bm25
 ):
+    if with_total is None:
+        with_total = 0 if cursor else 1
+
+    args = dict(
+        page=page, page_size=page_size, q=q, category_id=category_id, tool_id=tool_id,
+        series_id=series_id, media_type=media_type, tag=tag, include_deleted=include_deleted,
+        only_deleted=only_deleted, cursor=cursor, with_total=with_total,
+        semantic=semantic, semantic_mode=semantic_mode,
+    )
+    # semantic results depend on the embedding index, which has its own caches
+    if (semantic and semantic.strip()) or not items_cache.enabled():
+        return _list_items_page(session, **args)
+
+    key = _list_cache_key(args)
+    body = items_cache.get(key)
+    if body is None:
+        gen = data_generation.current()
+        body = _list_items_page(session, **args).model_dump_json().encode("utf-8")
+        items_cache.put(key, body, gen)
+    return Response(content=body, media_type="application/json")
+
+
+def _list_cache_key(args: dict) -> tuple:
+    tags = tuple(sorted({t.strip() for t in (args["tag"] or []) if t and t.strip()}))
+    return (
+        args["page"],
+        args["page_size"],
+        (args["q"] or "").strip() or None,
+        args["category_id"] or None,
+        args["tool_id"] or None,
+        args["series_id"] or None,
+        args["media_type"] or None,
+        tags,
+        bool(args["include_deleted"]),
+        bool(args["include_deleted"] and args["only_deleted"]),
+        args["cursor"] or None,
+        bool(args["with_total"]),
+    )
+
+
+def _list_items_page(
+    session: Session,
+    page: int,
+    page_size: int,
+    q: Optional[str],
+    category_id: Optional[str],
+    tool_id: Optional[str],
+    series_id: Optional[str],
+    media_type: Optional[str],
+    tag: Optional[list[str]],
+    include_deleted: int,
+    only_deleted: int,
+    cursor: Optional[str],
+    with_total: int,
+    semantic: Optional[str],
+    semantic_mode: str,
+) -> PageDTO:
     def apply_filters(stmt):
         if category_id:
             stmt = stmt.where(Item.category_id == category_id)
@@ -263,10 +459,8 @@ def list_items(
                 .having(func.count(func.distinct(Tag.name)) == len(tags))
             )
 
-    # ----------------------------
-    # q path: try FTS first
-    # ----------------------------
-    if q and q.strip():
+    def sql_filters() -> tuple[str, dict]:
+        # raw-SQL equivalent of apply_filters + tag filter, for the FTS queries
         filters = []
         params = {}
 
@@ -305,32 +499,96 @@ def list_items(
                 )"""
             )
 
-        filters_sql = " AND ".join(filters)
+        return " AND ".join(filters), params
 
-        total_fts, ids_fts = fts_search_ids_join_items(
+    # ranked results (search paths) have no stable keyset; their cursors carry the offset
+    def search_offset() -> int:
+        return _parse_offset_cursor(cursor) if cursor else (page - 1) * page_size
+
+    def ordered_page(ids: list[str]) -> list[Item]:
+        rows = session.exec(select(Item).where(Item.id.in_(ids))).all()
+        by_id = {r.id: r for r in rows}
+        return [by_id[i] for i in ids if i in by_id]
+
+    # ----------------------------
+    # semantic path: CLIP text embedding vs item embedding index
+    # ----------------------------
+    if semantic and semantic.strip():
+        if not _open_clip_available():
+            raise_api_error(503, "CLIP_UNAVAILABLE", "open_clip/torch are not installed; semantic search is unavailable")
+
+        qvec = semantic_service.encode_query(semantic)
+        hits = semantic_service.vector_hits(
+            session, MODEL_KEY_DEFAULT, qvec,
+            category_id=category_id, tool_id=tool_id, include_deleted=bool(include_deleted),
+        )
+        if semantic_mode == "hybrid":
+            filters_sql, params = sql_filters()
+            bm25 = fts_bm25_scores(
+                session, (q or semantic).strip(), filters_sql, params, limit=int(settings.semantic_max_results),
+            )
+            hits = semantic_service.blend(session, MODEL_KEY_DEFAULT, qvec, hits, bm25)
+
+        # filters the index does not know about (series, media type, tags, only_deleted)
+        ranked = [h.item_id for h in hits]
+        allowed: set[str] = set()
+        for i in range(0, len(ranked), 500):
+            chunk_stmt = apply_filters(select(Item.id).where(Item.id.in_(ranked[i : i + 500])))
+            if tag_ids_filter is not None:
+                chunk_stmt = chunk_stmt.where(Item.id.in_(tag_ids_filter))
+            allowed.update(_normalize_scalar_ids(session.exec(chunk_stmt).all()))
+        ranked = [iid for iid in ranked if iid in allowed]
+
+        offset = search_offset()
+        page_ids = ranked[offset : offset + page_size]
+        return PageDTO(
+            items=_build_item_dtos(session, ordered_page(page_ids)),
+            page=page,
+            page_size=page_size,
+            total=len(ranked),
+            next_cursor=(encode_cursor({"o": offset + len(page_ids)}) if page_ids and offset + len(page_ids) < len(ranked) else None),
+        )
+
+    # ----------------------------
+    # q path: try FTS first
+    # ----------------------------
+    if q and q.strip():
+        filters_sql, params = sql_filters()
+
+        offset = search_offset()
+
+        def next_search_cursor(total: int, n: int) -> Optional[str]:
+            return encode_cursor({"o": offset + n}) if n and offset + n < total else None
+
+        res_fts = fts_search_ids_join_items(
             session=session,
             q=q,
             filters_sql=filters_sql,
             params=params,
             limit=page_size,
-            offset=(page - 1) * page_size,
+            offset=offset,
         )
 
-        # FTS hit: preserve FTS order
-        if total_fts > 0 and ids_fts:
+        # served by FTS: preserve FTS order
+        if res_fts is not None:
+            total_fts, ids_fts = res_fts
+            if not ids_fts:
+                return PageDTO(items=[], page=page, page_size=page_size, total=total_fts)
             rows = session.exec(select(Item).where(Item.id.in_(ids_fts))).all()
             by_id = {r.id: r for r in rows}
             ordered = [by_id[i] for i in ids_fts if i in by_id]
             return PageDTO(
-                items=[_build_item_dto(session, it) for it in ordered],
+                items=_build_item_dtos(session, ordered),
                 page=page,
                 page_size=page_size,
                 total=total_fts,
+                next_cursor=next_search_cursor(total_fts, len(ids_fts)),
             )
 
         # ----------------------------
         # FTS fallback: LIKE search across title/series/prompt/tags
         # ----------------------------
+        record_like_fallback()
         qq = f"%{q.strip()}%"
 
         # total (distinct items)
@@ -363,7 +621,7 @@ def list_items(
             (ItemVersion.prompt_blob.like(qq)) |
             (Tag.name.like(qq))
         )
-        ids_stmt = ids_stmt.order_by(Item.created_at.desc()).offset((page - 1) * page_size).limit(page_size)
+        ids_stmt = ids_stmt.order_by(Item.created_at.desc()).offset(offset).limit(page_size)
 
         page_ids = _normalize_scalar_ids(session.exec(ids_stmt).all())
 
@@ -375,10 +633,11 @@ def list_items(
         ordered = [by_id[i] for i in page_ids if i in by_id]
 
         return PageDTO(
-            items=[_build_item_dto(session, it) for it in ordered],
+            items=_build_item_dtos(session, ordered),
             page=page,
             page_size=page_size,
             total=total_fb,
+            next_cursor=next_search_cursor(total_fb, len(page_ids)),
         )
 
     # ----------------------------
@@ -388,164 +647,267 @@ def list_items(
     if tag_ids_filter is not None:
         stmt = stmt.where(Item.id.in_(tag_ids_filter))
 
-    count_stmt = select(func.count()).select_from(stmt.subquery())
-    total = int(session.exec(count_stmt).one())
-
-    stmt = stmt.order_by(Item.created_at.desc()).offset((page - 1) * page_size).limit(page_size)
-    rows = session.exec(stmt).all()
+    total = None
+    if with_total:
+        count_stmt = select(func.count()).select_from(stmt.subquery())
+        total = int(session.exec(count_stmt).one())
+
+    # (created_at, id) ordering is served by ix_items_created_at_id
+    stmt = stmt.order_by(Item.created_at.desc(), Item.id.desc())
+    if cursor:
+        # keyset: seek past the last row of the previous page instead of OFFSET
+        c_at, c_id = _parse_item_keyset(cursor)
+        stmt = stmt.where(tuple_(Item.created_at, Item.id) < tuple_(c_at, c_id))
+    else:
+        stmt = stmt.offset((page - 1) * page_size)
+
+    # fetch one extra row to know whether a next page exists
+    rows = session.exec(stmt.limit(page_size + 1)).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
 
     return PageDTO(
-        items=[_build_item_dto(session, it) for it in rows],
+        items=_build_item_dtos(session, rows),
         page=page,
         page_size=page_size,
         total=total,
+        next_cursor=(_item_keyset_cursor(rows[-1]) if has_more else None),
     )
 
-def _item_lite(session: Session, it: Item, tool_label: str) -> DuplicateItemLiteDTO:
-    def to_url(rel: str) -> str:
-        relp = (rel or "").replace("\\", "/").lstrip("/")
-        return f"/files/{relp}" if relp else ""
-
-    root = Path(settings.storage_root).resolve()
+def _to_url(rel: Optional[str]) -> str:
+    relp = (rel or "").replace("\\", "/").lstrip("/")
+    return f"/files/{relp}" if relp else ""
 
-    rel_media = (it.media_path or "").replace("\\", "/").lstrip("/")
-    rel_thumb = (it.thumb_path or "").replace("\\", "/").lstrip("/")
-    rel_poster = (it.poster_path or "").replace("\\", "/").lstrip("/") if it.poster_path else None
 
-    p_media = (root / rel_media).resolve() if rel_media else None
-    p_thumb = (root / rel_thumb).resolve() if rel_thumb else None
-    p_poster = (root / rel_poster).resolve() if rel_poster else None
-
-    media_exists = bool(p_media and p_media.exists())
-    thumb_exists = bool(p_thumb and p_thumb.exists())
-    poster_exists = (bool(p_poster and p_poster.exists()) if it.media_type == "video" and rel_poster else None)
+def _item_lite(r, tool_label: str, exists: Optional[dict]) -> DuplicateItemLiteDTO:
+    # r: a row of the duplicates page query; exists: file_stat.exists_many() of the page,
+    # None when the file checks were not asked for
+    media_exists = thumb_exists = poster_exists = None
+    if exists is not None:
+        media_exists = bool(r.media_path and exists.get(r.media_path))
+        thumb_exists = bool(r.thumb_path and exists.get(r.thumb_path))
+        if r.media_type == "video" and r.poster_path:
+            poster_exists = bool(exists.get(r.poster_path))
 
     return DuplicateItemLiteDTO(
-        id=it.id,
-        title=it.title,
-        media_type=it.media_type,
-        thumb_url=to_url(it.thumb_path),
-        media_url=to_url(it.media_path),
+        id=r.id,
+        title=r.title,
+        media_type=r.media_type,
+        thumb_url=_to_url(r.thumb_path),
+        media_url=_to_url(r.media_path),
         tool_label=tool_label,
-        created_at=it.created_at,
-        is_deleted=bool(it.is_deleted),
+        created_at=r.created_at,
+        is_deleted=bool(r.is_deleted),
         media_exists=media_exists,
         thumb_exists=thumb_exists,
         poster_exists=poster_exists,
     )
 
 
+def _phash_duplicates(
+    session: Session, page: int, page_size: int, min_count: int, include_deleted: bool, items_limit: int,
+    q: Optional[str], cursor: Optional[str], after, with_total: bool, check_files: bool, max_distance: int,
+) -> DuplicatePageDTO:
+    # near-duplicate groups come from the in-memory pHash index; keyset (count desc, hash asc)
+    key_after = None
+    if after is not None:
+        try:
+            key_after = (after[0], int(after[1], 16))
+        except ValueError:
+            raise_api_error(400, "INVALID_CURSOR", "cursor is not a phash duplicates cursor", {"cursor": cursor})
+    total_groups, page_groups, last = phash_index.groups_page(
+        session, max_distance, include_deleted,
+        min_count=min_count, page=page, page_size=page_size, items_limit=items_limit,
+        after=key_after, key_filter=((q or "").strip().lower() or None),
+    )
+
+    ids = [iid for _, _, group_ids in page_groups for iid in group_ids]
+    by_id = {}
+    for chunk in _chunks(ids):
+        for r in session.exec(
+            select(
+                Item.id, Item.tool_id, Item.title, Item.media_type, Item.media_path, Item.thumb_path,
+                Item.poster_path, Item.created_at, Item.is_deleted,
+            ).where(Item.id.in_(chunk))
+        ).all():
+            by_id[r.id] = r
+
+    tool_labels = {}
+    for tid in {r.tool_id for r in by_id.values()}:
+        tool = ref_cache.get_tool(tid)
+        tool_labels[tid] = tool.label if tool else tid
+
+    exists = None
+    if check_files:
+        exists = file_stat.exists_many(p for r in by_id.values() for p in (r.media_path, r.thumb_path, r.poster_path))
+
+    groups: list[DuplicateGroupDTO] = []
+    for key, count, group_ids in page_groups:
+        rows = [by_id[iid] for iid in group_ids if iid in by_id]  # purged since the last index sync
+        groups.append(
+            DuplicateGroupDTO(
+                key=key,
+                media_sha256="",
+                phash=key,
+                count=count,
+                items=[_item_lite(r, tool_labels.get(r.tool_id, r.tool_id), exists) for r in rows],
+            )
+        )
+
+    return DuplicatePageDTO(
+        page=page, page_size=page_size, total_groups=(total_groups if with_total else None), groups=groups,
+        next_cursor=(encode_cursor({"n": last[0], "k": phash_to_hex(last[1]), "t": None}) if last else None),
+    )
+
+
 @router.get("/items/duplicates", response_model=DuplicatePageDTO)
 def list_duplicates(
     session: Session = Depends(get_session),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=200),
     min_count: int = Query(2, ge=2, le=999),
-    scope: str = Query("media_sha256"),  # media_sha256 | media_sha256_tool
+    scope: str = Query("media_sha256"),  # media_sha256 | media_sha256_tool | phash
     include_deleted: int = Query(0, ge=0, le=1),
     items_limit: int = Query(12, ge=1, le=50),
-    q: Optional[str] = Query(None),  # optional sha prefix/substring filter
+    q: Optional[str] = Query(None),  # optional sha (phash: group hash) prefix/substring filter
+    cursor: Optional[str] = Query(None),  # opaque next_cursor from a previous page; replaces page/OFFSET
+    with_total: Optional[int] = Query(None, ge=0, le=1),  # default: 1 in page mode, 0 in cursor mode
+    check_files: int = Query(1, ge=0, le=1),  # 0: skip the *_exists flags (returned as null)
+    max_distance: Optional[int] = Query(None, ge=0, le=12),  # phash: Hamming radius, default PHASH_MAX_DISTANCE
 ):
     scope = (scope or "media_sha256").strip().lower()
-    if scope not in ("media_sha256", "media_sha256_tool"):
-        raise_api_error(400, "INVALID_SCOPE", "scope must be media_sha256 or media_sha256_tool", {"scope": scope})
+    if scope not in ("media_sha256", "media_sha256_tool", "phash"):
+        raise_api_error(
+            400, "INVALID_SCOPE", "scope must be media_sha256, media_sha256_tool or phash", {"scope": scope},
+        )
+    if with_total is None:
+        with_total = 0 if cursor else 1
+    by_tool = scope == "media_sha256_tool"
+
+    # keyset on the group ordering: (count desc, sha asc[, tool_id asc])
+    after = None
+    if cursor:
+        payload = _parse_cursor(cursor)
+        try:
+            after = (int(payload["n"]), str(payload["k"]), payload.get("t"))
+        except Exception:
+            raise_api_error(400, "INVALID_CURSOR", "cursor is not a duplicates cursor", {"cursor": cursor})
+
+    if scope == "phash":
+        return _phash_duplicates(
+            session, page=page, page_size=page_size, min_count=min_count, include_deleted=bool(include_deleted),
+            items_limit=items_limit, q=q, cursor=cursor, after=after, with_total=bool(with_total),
+            check_files=bool(check_files),
+            max_distance=(settings.phash_max_distance if max_distance is None else max_distance),
+        )
 
     # base filter
-    base = select(Item).where(Item.media_sha256.is_not(None)).where(Item.media_sha256 != "")
+    conds = [Item.media_sha256.is_not(None), Item.media_sha256 != ""]
     if not include_deleted:
-        base = base.where(Item.is_deleted == False)
+        # IS NOT 1 rather than = 0: the planner would pick ix_items_is_deleted for the
+        # equality and read every live row; this way grouping runs on the covering
+        # ix_items_media_sha256_dups and the page's items are looked up by sha
+        conds.append(Item.is_deleted.is_not(True))
     if q and q.strip():
-        qq = f"%{q.strip()}%"
-        base = base.where(Item.media_sha256.like(qq))
+        conds.append(Item.media_sha256.like(f"%{q.strip()}%"))
 
     # group query
-    sub = base.subquery()
-    if scope == "media_sha256":
-        g_stmt = (
-            select(sub.c.media_sha256, func.count().label("cnt"))
-            .group_by(sub.c.media_sha256)
-            .having(func.count() >= min_count)
-            .order_by(func.count().desc(), sub.c.media_sha256.asc())
-        )
-        # total groups
-        total_stmt = select(func.count()).select_from(g_stmt.subquery())
-        total_groups = int(session.exec(total_stmt).one())
-
-        rows = session.exec(
-            g_stmt.offset((page - 1) * page_size).limit(page_size)
-        ).all()
-
-        # fetch items for each sha
-        groups: list[DuplicateGroupDTO] = []
-        for sha, cnt in rows:
-            if not sha:
-                continue
-            it_stmt = select(Item).where(Item.media_sha256 == sha)
-            if not include_deleted:
-                it_stmt = it_stmt.where(Item.is_deleted == False)
-
-            items = session.exec(
-                it_stmt.order_by(Item.created_at.desc()).limit(items_limit)
-            ).all()
-
-            # tool labels
-            tool_ids = sorted({it.tool_id for it in items})
-            tool_map = {t.id: t.label for t in session.exec(select(Tool).where(Tool.id.in_(tool_ids))).all()} if tool_ids else {}
-
-            groups.append(
-                DuplicateGroupDTO(
-                    key=sha,
-                    media_sha256=sha,
-                    tool_id=None,
-                    tool_label=None,
-                    count=int(cnt),
-                    items=[_item_lite(session, it, tool_map.get(it.tool_id, it.tool_id)) for it in items],
-                )
-            )
-
-        return DuplicatePageDTO(page=page, page_size=page_size, total_groups=total_groups, groups=groups)
-
-    # scope == media_sha256_tool
+    sub = select(Item).where(*conds).subquery()
+    key_cols = [sub.c.media_sha256, sub.c.tool_id] if by_tool else [sub.c.media_sha256]
     g_stmt = (
-        select(sub.c.media_sha256, sub.c.tool_id, func.count().label("cnt"))
-        .group_by(sub.c.media_sha256, sub.c.tool_id)
+        select(*key_cols, func.count().label("cnt"))
+        .group_by(*key_cols)
         .having(func.count() >= min_count)
-        .order_by(func.count().desc(), sub.c.media_sha256.asc(), sub.c.tool_id.asc())
+        .order_by(func.count().desc(), *[c.asc() for c in key_cols])
     )
-    total_stmt = select(func.count()).select_from(g_stmt.subquery())
-    total_groups = int(session.exec(total_stmt).one())
 
+    g_all = g_stmt
+    # page mode: the number of groups comes with the page (COUNT(*) OVER () is evaluated
+    # after GROUP BY / HAVING and before OFFSET / LIMIT)
+    total_in_page = bool(with_total) and after is None
+    if total_in_page:
+        g_stmt = g_stmt.add_columns(func.count().over().label("total_groups"))
+    if after is not None:
+        n, k, t = after
+        keys = (k, t) if by_tool else (k,)
+        g_stmt = g_stmt.having(
+            (func.count() < n) | ((func.count() == n) & (tuple_(*key_cols) > tuple_(*keys)))
+        )
+    else:
+        g_stmt = g_stmt.offset((page - 1) * page_size)
+    # one extra group tells whether a next page exists
+    pg = g_stmt.limit(page_size + 1).subquery("pg")
+
+    # the page's groups and their newest items_limit items in one statement: the items
+    # of each group are ranked with ROW_NUMBER() over the group key
+    part = [Item.media_sha256, Item.tool_id] if by_tool else [Item.media_sha256]
+    ranked = (
+        select(
+            pg.c.cnt,
+            *([pg.c.total_groups] if total_in_page else []),
+            Item.media_sha256, Item.tool_id, Item.id, Item.title, Item.media_type,
+            Item.media_path, Item.thumb_path, Item.poster_path, Item.created_at, Item.is_deleted,
+            func.row_number().over(
+                partition_by=part, order_by=(Item.created_at.desc(), Item.id.desc()),
+            ).label("rn"),
+        )
+        .select_from(Item)
+        .join(pg, and_(*(c == pg.c[c.name] for c in part)))
+        .where(*conds)
+        .subquery("r")
+    )
+    order = [ranked.c.cnt.desc(), ranked.c.media_sha256.asc()]
+    if by_tool:
+        order.append(ranked.c.tool_id.asc())
     rows = session.exec(
-        g_stmt.offset((page - 1) * page_size).limit(page_size)
+        select(*ranked.c).where(ranked.c.rn <= items_limit).order_by(*order, ranked.c.rn.asc())
     ).all()
 
-    groups: list[DuplicateGroupDTO] = []
-    for sha, tool_id, cnt in rows:
-        if not sha or not tool_id:
-            continue
-        it_stmt = select(Item).where(Item.media_sha256 == sha, Item.tool_id == tool_id)
-        if not include_deleted:
-            it_stmt = it_stmt.where(Item.is_deleted == False)
-
-        items = session.exec(
-            it_stmt.order_by(Item.created_at.desc()).limit(items_limit)
-        ).all()
-
-        tool = session.get(Tool, tool_id)
-        tool_label = tool.label if tool else tool_id
+    total_groups = None
+    if total_in_page and rows:
+        total_groups = int(rows[0].total_groups)
+    elif with_total:
+        # cursor mode, or a page past the end
+        total_groups = int(session.exec(select(func.count()).select_from(g_all.subquery())).one())
+
+    grouped: dict = {}  # key -> rows, page order
+    for r in rows:
+        grouped.setdefault((r.media_sha256, r.tool_id) if by_tool else r.media_sha256, []).append(r)
+    next_cursor = None
+    if len(grouped) > page_size:
+        grouped.pop(list(grouped)[-1])
+        last = grouped[list(grouped)[-1]][0]
+        next_cursor = encode_cursor({"n": int(last.cnt), "k": last.media_sha256, "t": (last.tool_id if by_tool else None)})
+
+    # one lookup for every tool on the page (served by ref_cache)
+    tool_labels = {}
+    for tid in {r.tool_id for r in rows}:
+        tool = ref_cache.get_tool(tid)
+        tool_labels[tid] = tool.label if tool else tid
+
+    exists = None
+    if check_files:
+        exists = file_stat.exists_many(
+            p for g in grouped.values() for r in g for p in (r.media_path, r.thumb_path, r.poster_path)
+        )
 
+    groups: list[DuplicateGroupDTO] = []
+    for key, g in grouped.items():
+        first = g[0]
         groups.append(
             DuplicateGroupDTO(
-                key=f"{sha}|{tool_id}",
-                media_sha256=sha,
-                tool_id=tool_id,
-                tool_label=tool_label,
-                count=int(cnt),
-                items=[_item_lite(session, it, tool_label) for it in items],
+                key=(f"{first.media_sha256}|{first.tool_id}" if by_tool else first.media_sha256),
+                media_sha256=first.media_sha256,
+                tool_id=(first.tool_id if by_tool else None),
+                tool_label=(tool_labels.get(first.tool_id) if by_tool else None),
+                count=int(first.cnt),
+                items=[_item_lite(r, tool_labels.get(r.tool_id, r.tool_id), exists) for r in g],
             )
         )
 
-    return DuplicatePageDTO(page=page, page_size=page_size, total_groups=total_groups, groups=groups)
+    return DuplicatePageDTO(
+        page=page, page_size=page_size, total_groups=total_groups, groups=groups, next_cursor=next_cursor,
+    )
 
 
 @router.get("/items/{item_id}", response_model=ItemDTO)
@@ -556,6 +918,83 @@ def get_item(item_id: str, session: Session = Depends(get_session)):
     return _build_item_dto(session, it)
 
 
+def _similar_page(session: Session, hits: list[vector_index.Hit], k: int) -> SimilarPageDTO:
+    by_id = {it.id: it for it in session.exec(select(Item).where(Item.id.in_([h.item_id for h in hits]))).all()}
+    found = [(h, by_id[h.item_id]) for h in hits if h.item_id in by_id]
+    dtos = _build_item_dtos(session, [it for _, it in found])
+    return SimilarPageDTO(
+        model_key=MODEL_KEY_DEFAULT,
+        k=k,
+        items=[SimilarHitDTO(score=h.score, item=dto) for (h, _), dto in zip(found, dtos)],
+    )
+
+
+@router.get("/items/{item_id}/similar", response_model=SimilarPageDTO)
+def similar_items(
+    item_id: str,
+    k: int = Query(20, ge=1, le=200),
+    category_id: Optional[str] = Query(None),
+    tool_id: Optional[str] = Query(None),
+    include_deleted: int = Query(0, ge=0, le=1),
+    session: Session = Depends(get_session),
+):
+    """
+    Exact top-k items by CLIP embedding cosine similarity (the item itself excluded).
+    """
+    if not session.get(Item, item_id):
+        raise_api_error(404, "NOT_FOUND", "Item not found", {"item_id": item_id})
+
+    idx = vector_index.get_index(session, MODEL_KEY_DEFAULT)
+    vec = idx.get_vector(item_id) if idx else None
+    if vec is None:
+        raise_api_error(404, "EMBEDDING_NOT_FOUND", "Item has no embedding yet", {"item_id": item_id})
+
+    hits = vector_index.search(
+        session, MODEL_KEY_DEFAULT, vec, k=k,
+        category_id=category_id, tool_id=tool_id,
+        include_deleted=bool(include_deleted), exclude_ids=[item_id],
+    )
+    return _similar_page(session, hits, k)
+
+
+@router.post("/items/search_by_image", response_model=SimilarPageDTO)
+async def search_by_image(
+    file: UploadFile = File(...),
+    k: int = Query(20, ge=1, le=200),
+    category_id: Optional[str] = Query(None),
+    tool_id: Optional[str] = Query(None),
+    include_deleted: int = Query(0, ge=0, le=1),
+    session: Session = Depends(get_session),
+):
+    """
+    Exact top-k items for an uploaded query image (nothing is stored).
+    """
+    if not _open_clip_available():
+        raise_api_error(503, "CLIP_UNAVAILABLE", "open_clip/torch are not installed; cannot embed the query image")
+
+    try:
+        _, ext = _guess_media_type(file.content_type, file.filename or "query")
+    except Exception as e:
+        raise_api_error(400, "UNSUPPORTED_MEDIA", str(e))
+
+    tmp = settings.storage_root / "tmp" / f"query_{new_id()}{ext}"
+    try:
+        await save_uploadfile_streaming(file, tmp, compute_sha256=False)
+        vec = await run_in_threadpool(clip_batcher.encode_image, tmp)
+    except ValueError as e:
+        raise_api_error(413, "FILE_TOO_LARGE", str(e))
+    except Exception as e:
+        raise_api_error(400, "QUERY_IMAGE_FAILED", f"Failed to embed query image: {e}")
+    finally:
+        safe_unlink(tmp)
+
+    hits = await run_in_threadpool(
+        vector_index.search, session, MODEL_KEY_DEFAULT, vec, k,
+        category_id, tool_id, bool(include_deleted),
+    )
+    return _similar_page(session, hits, k)
+
+
 @router.patch("/items/{item_id}", response_model=ItemDTO)
 def patch_item(item_id: str, patch: ItemPatch, session: Session = Depends(get_session)):
     it = session.get(Item, item_id)
@@ -580,8 +1019,9 @@ def patch_item(item_id: str, patch: ItemPatch, session: Session = Depends(get_se
             it.series_name_snapshot = s.name
             it.delimiter_snapshot = s.delimiter
 
+    prev_category_id = it.category_id
     if patch.category_id is not None:
-        c = session.get(Category, patch.category_id)
+        c = ref_cache.get_category(patch.category_id)
         if not c:
             raise_api_error(400, "CATEGORY_NOT_FOUND", "Category not found", {"category_id": patch.category_id})
         it.category_id = c.id
@@ -593,7 +1033,8 @@ def patch_item(item_id: str, patch: ItemPatch, session: Session = Depends(get_se
     session.add(it)
     session.commit()
     session.refresh(it)
-    fts_upsert_item(session, it.id)
+    if it.category_id != prev_category_id:
+        centroids.invalidate_categories([prev_category_id, it.category_id])
     return _build_item_dto(session, it)
 
 @router.delete("/items/{item_id}")
@@ -610,12 +1051,7 @@ def soft_delete_item(item_id: str, session: Session = Depends(get_session)):
 
     session.add(it)
     session.commit()
-
-    # remove from FTS so normal search doesn't match it (when include_deleted=0)
-    try:
-        fts_delete_item(session, item_id)
-    except Exception:
-        pass
+    centroids.invalidate_categories([it.category_id])
 
     return {"status": "ok", "deleted": True}
 
@@ -634,12 +1070,7 @@ def restore_item(item_id: str, session: Session = Depends(get_session)):
 
     session.add(it)
     session.commit()
-
-    # re-index into FTS
-    try:
-        fts_upsert_item(session, item_id)
-    except Exception:
-        pass
+    centroids.invalidate_categories([it.category_id])
 
     return {"status": "ok", "restored": True}
 
@@ -686,32 +1117,34 @@ def create_item_version(item_id: str, body: ItemVersionCreate, session: Session
     session.add(it)
     session.commit()
     session.refresh(it)
-    fts_upsert_item(session, it.id)
     return _build_item_dto(session, it)
 
 
-@router.post("/items", response_model=ItemDTO)
-async def create_item(
-    request: Request,
-    file: UploadFile = File(...),
-    meta: str = Form(...),
-    session: Session = Depends(get_session),
-):
-    # Parse meta JSON
-    try:
-        meta_obj = ItemCreateMeta.model_validate(json.loads(meta))
-        meta_obj.title = normalize_text(meta_obj.title)
-        meta_obj.prompt_blob = normalize_text(meta_obj.prompt_blob)
-        meta_obj.tags = normalize_list(meta_obj.tags)
-    except Exception as e:
-        raise_api_error(400, "INVALID_META", f"Invalid meta JSON: {e}")
+def _stored_media(session: Session, sha256_hex: str):
+    """
+    Storage paths of media already stored with this sha256: gallery items (newest first),
+    then the library asset with the same bytes (see services/artifacts.py).
+    """
+    return artifacts.gallery_media(session, sha256_hex) + artifacts.library_media(sha256_hex)
+
+
+def _normalize_create_meta(meta_obj: ItemCreateMeta) -> ItemCreateMeta:
+    meta_obj.title = normalize_text(meta_obj.title)
+    meta_obj.prompt_blob = normalize_text(meta_obj.prompt_blob)
+    meta_obj.tags = normalize_list(meta_obj.tags)
+    return meta_obj
 
+
+def _resolve_create_refs(session: Session, meta_obj: ItemCreateMeta):
+    """
+    (tool, series, manual_category) of upload meta; raises the 400s of create_item.
+    """
     # Resolve tool
-    tool: Optional[Tool] = None
+    tool: Optional[ToolRef] = None
     if meta_obj.tool_id:
-        tool = session.get(Tool, meta_obj.tool_id)
+        tool = ref_cache.get_tool(meta_obj.tool_id)
     elif meta_obj.tool_key:
-        tool = session.exec(select(Tool).where(Tool.key == meta_obj.tool_key)).first()
+        tool = ref_cache.get_tool_by_key(meta_obj.tool_key)
 
     if not tool:
         raise_api_error(400, "TOOL_NOT_FOUND", "Tool not found (provide tool_id or tool_key)", {
@@ -727,16 +1160,33 @@ async def create_item(
 
     # Resolve optional manual category
     manual_category = None
-    is_category_locked = False
     if meta_obj.category_id:
-        manual_category = session.get(Category, meta_obj.category_id)
+        manual_category = ref_cache.get_category(meta_obj.category_id)
         if not manual_category:
             raise_api_error(400, "CATEGORY_NOT_FOUND", "Category not found", {"category_id": meta_obj.category_id})
-        is_category_locked = True
+
+    return tool, series, manual_category
+
+
+async def _create_item_with_media(
+    session: Session,
+    meta_obj: ItemCreateMeta,
+    content_type: Optional[str],
+    filename: str,
+    store: Callable[[str, Path], Awaitable[str]],
+) -> ItemDTO:
+    """
+    Item creation shared by POST /items and chunked uploads (POST /items/uploads/...):
+    validates meta and media type, lets `store(item_id, abs_media)` put the bytes in place
+    (it returns their sha256; whatever it adds to the session is committed with the item),
+    writes the rows and queues post-processing.
+    """
+    tool, series, manual_category = _resolve_create_refs(session, meta_obj)
+    is_category_locked = manual_category is not None
 
     # Determine media type & ext
     try:
-        media_type, ext = _guess_media_type(file, file.filename or "upload")
+        media_type, ext = _guess_media_type(content_type, filename)
     except Exception as e:
         raise_api_error(400, "UNSUPPORTED_MEDIA", str(e))
 
@@ -753,38 +1203,11 @@ async def create_item(
     rel_poster = Path("poster") / yyyy / mm / f"{item_id}.jpg" if media_type == "video" else None
 
     abs_media = settings.storage_root / rel_media
-    abs_thumb = settings.storage_root / rel_thumb
-    abs_poster = (settings.storage_root / rel_poster) if rel_poster else None
 
     # Save upload to disk
-    try:
-        _, sha256_hex = await save_uploadfile_streaming(file, abs_media, compute_sha256=True)
-    except ValueError as e:
-        raise_api_error(413, "FILE_TOO_LARGE", str(e))
-    except Exception as e:
-        # cleanup best-effort
-        safe_unlink(abs_media)
-        raise_api_error(500, "SAVE_FAILED", f"Failed to save file: {e}")
+    sha256_hex = await store(item_id, abs_media)
 
     try:
-        # Generate thumb/poster
-        if media_type == "image":
-            make_image_thumb(abs_media, abs_thumb, max_w=768)
-            embed_src = abs_media
-        else:
-            if not abs_poster:
-                raise RuntimeError("poster path missing")
-            make_video_poster(abs_media, abs_poster, ss=0.5)
-            if abs_poster.exists():
-                make_image_thumb(abs_poster, abs_thumb, max_w=768)
-                embed_src = abs_poster
-            else:
-                # ffmpeg failed or not installed.
-                # Skip thumb generation from poster.
-                # Embedding will fail if we pass None or non-existent path.
-                # We can try to use a placeholder or better yet, handle 'embed_src' being None gracefully below.
-                embed_src = None
-
         # Determine initial category_id and auto_category_id
         # If manual category is provided, use it; otherwise will be set after auto-classification
         if manual_category:
@@ -811,13 +1234,13 @@ async def create_item(
         tag_ids = _upsert_tags(session, meta_obj.tags)
 
         # item (initial create with placeholder category if needed)
-        # We'll update category after auto-classification if not manually set
+        # The post-processing job updates category after auto-classification if not manually set
         if not category_id:
             # Need a placeholder category for now, will update after auto-classification
-            unc = session.exec(select(Category).where(Category.name == "未分类")).first()
+            unc = ref_cache.get_category_by_name("未分类")
             if not unc:
                 # Last resort: pick first category
-                any_cat = session.exec(select(Category)).first()
+                any_cat = next(iter(ref_cache.list_categories(active_only=False)), None)
                 if not any_cat:
                     raise_api_error(500, "NO_CATEGORY", "No categories available in database")
                 category_id = any_cat.id
@@ -843,59 +1266,293 @@ async def create_item(
             created_at=now,
             updated_at=now,
             media_sha256=sha256_hex,
+            status="processing",
         )
         session.add(it)
 
         for tid in tag_ids:
             session.add(ItemTag(item_id=item_id, tag_id=tid, created_at=now))
 
+        # thumb/poster, embedding, classification and FTS run off the request path
+        job = jobs.enqueue(session, item_pipeline.JOB_KIND, item_id=item_id)
         session.commit()
 
-        # Generate embedding first (needed for classify_item)
-        if embed_src and embed_src.exists():
-            classify_and_store_item_embedding(session, item_id=item_id, image_or_poster_path=embed_src)
-
-        # Run auto-classification to get candidates and auto_category_id
-        # This always runs for reference, even if manual category is set
-        unc, best, top = classify_item(
-            session,
-            it.id,
-            topk=settings.auto_cat_topk,
-            threshold=settings.auto_cat_threshold,
-            include_deleted_for_prototypes=True,
-        )
-
-        # Update auto_* fields (always)
-        it.auto_candidates_json = serialize_candidates(top) if top else None
-        it.auto_category_id = best.category_id if best else None
-        it.auto_confidence = best.score if best else None
-
-        # Update final category_id only if NOT manually locked
-        if not is_category_locked:
-            # Threshold gate: if best score is low, fall back to "Uncategorized"
-            if best and best.score >= settings.auto_cat_threshold:
-                it.category_id = best.category_id
-            else:
-                it.category_id = unc.id
-
-        it.updated_at = datetime.utcnow()
-        session.add(it)
-        session.commit()
-
-        # Final index and DTO
-        fts_upsert_item(session, item_id)
-        return _build_item_dto(session, it)
-
     except Exception as e:
-        # Cleanup files if any post-processing failed
+        session.rollback()
         safe_unlink(abs_media)
-        safe_unlink(abs_thumb)
-        safe_unlink(abs_poster)
         # Re-raise as API error if not already
         if hasattr(e, "status_code"):
             raise
         raise_api_error(500, "UPLOAD_PIPELINE_FAILED", f"{e}")
 
+    jobs.dispatch(job.id)  # inline when JOB_WORKERS=0
+    session.refresh(it)
+    return _build_item_dto(session, it)
+
+
+def _items_by_sha256(session: Session, shas: list[str], include_deleted: bool = False) -> dict[str, list[str]]:
+    """
+    {sha256: item ids with that media, newest first} for the given hashes (ix_items_media_sha256).
+    """
+    out: dict[str, list[str]] = {}
+    for chunk in _chunks(shas):
+        stmt = select(Item.media_sha256, Item.id).where(Item.media_sha256.in_(chunk))
+        if not include_deleted:
+            stmt = stmt.where(Item.is_deleted.is_not(True))  # keeps the planner on the sha256 index
+        stmt = stmt.order_by(Item.media_sha256, Item.created_at.desc(), Item.id.desc())
+        for sha, iid in session.exec(stmt).all():
+            out.setdefault(sha, []).append(iid)
+    return out
+
+
+def _norm_sha256(raw: str) -> Optional[str]:
+    sha = (raw or "").strip().lower()
+    if len(sha) != 64 or any(ch not in "0123456789abcdef" for ch in sha):
+        return None
+    return sha
+
+
+@router.head("/items/by_sha256/{sha256}")
+def head_item_by_sha256(
+    sha256: str,
+    include_deleted: int = Query(0, ge=0, le=1),
+    session: Session = Depends(get_session),
+):
+    """
+    200 if an item with this media sha256 exists (X-Item-Id: the newest one, X-Item-Count),
+    404 if not: a client can skip sending bytes the server already has.
+    """
+    sha = _norm_sha256(sha256)
+    if not sha:
+        raise_api_error(400, "INVALID_SHA256", "sha256 must be 64 hex characters", {"sha256": sha256})
+    ids = _items_by_sha256(session, [sha], bool(include_deleted)).get(sha)
+    if not ids:
+        raise_api_error(404, "NOT_FOUND", "No item with this media", {"sha256": sha})
+    return Response(status_code=200, headers={"X-Item-Id": ids[0], "X-Item-Count": str(len(ids))})
+
+
+@router.post("/items/exists", response_model=ItemsExistDTO)
+def items_exist(body: ItemsExistRequest, session: Session = Depends(get_session)):
+    """
+    Which of up to 5000 media sha256s the server already has (newest item per hash).
+    Hashes found can be created without a transfer: POST /items with meta.media_sha256.
+    """
+    shas: list[str] = []
+    bad: list[str] = []
+    for raw in body.sha256:
+        sha = _norm_sha256(raw)
+        if sha:
+            shas.append(sha)
+        else:
+            bad.append(raw)
+    if bad:
+        raise_api_error(400, "INVALID_SHA256", "sha256 values must be 64 hex characters", {"invalid": bad[:20]})
+    shas = list(dict.fromkeys(shas))
+
+    found = _items_by_sha256(session, shas, body.include_deleted)
+    return ItemsExistDTO(
+        found={sha: ids[0] for sha, ids in found.items()},
+        missing=[sha for sha in shas if sha not in found],
+    )
+
+
+async def _create_item_from_stored(session: Session, meta_obj: ItemCreateMeta, sha256_hex: str) -> ItemDTO:
+    """
+    Link mode of POST /items: the new item's media is a hard link of stored media with
+    this sha256, nothing is transferred (thumb/poster/embeddings follow, see services/artifacts.py).
+    """
+    sources = [p for p in _stored_media(session, sha256_hex) if p.exists()]
+    if not sources:
+        raise_api_error(404, "MEDIA_NOT_STORED", "No stored media with this sha256; upload the file", {
+            "media_sha256": sha256_hex,
+        })
+    name = sources[0].name
+
+    async def store(item_id: str, abs_media: Path) -> str:
+        if not ingest.link_stored(abs_media, sources):
+            raise_api_error(409, "MEDIA_NOT_STORED", "Stored media with this sha256 is gone; upload the file", {
+                "media_sha256": sha256_hex,
+            })
+        return sha256_hex
+
+    return await _create_item_with_media(session, meta_obj, mimetypes.guess_type(name)[0], name, store)
+
+
+@router.post("/items", response_model=ItemDTO)
+async def create_item(
+    request: Request,
+    file: Optional[UploadFile] = File(None),
+    meta: str = Form(...),
+    session: Session = Depends(get_session),
+):
+    # Parse meta JSON
+    try:
+        meta_obj = _normalize_create_meta(ItemCreateMeta.model_validate(json.loads(meta)))
+    except Exception as e:
+        raise_api_error(400, "INVALID_META", f"Invalid meta JSON: {e}")
+
+    if file is None:
+        # link mode: media already stored (POST /items/exists)
+        if not meta_obj.media_sha256:
+            raise_api_error(400, "FILE_REQUIRED", "Send a file, or meta.media_sha256 of stored media")
+        return await _create_item_from_stored(session, meta_obj, meta_obj.media_sha256.lower())
+
+    # large files: POST /items/uploads instead, received straight into storage (services/ingest.py)
+    async def store(item_id: str, abs_media: Path) -> str:
+        try:
+            _, sha256_hex = await save_uploadfile_streaming(file, abs_media, compute_sha256=True)
+        except ValueError as e:
+            raise_api_error(413, "FILE_TOO_LARGE", str(e))
+        except Exception as e:
+            # cleanup best-effort
+            safe_unlink(abs_media)
+            raise_api_error(500, "SAVE_FAILED", f"Failed to save file: {e}")
+        return sha256_hex
+
+    return await _create_item_with_media(session, meta_obj, file.content_type, file.filename or "upload", store)
+
+
+def _upload_session_dto(up: UploadSession) -> UploadSessionDTO:
+    return UploadSessionDTO(
+        id=up.id,
+        filename=up.filename,
+        content_type=up.content_type,
+        size=up.size,
+        received_bytes=upload_sessions.received_bytes(up),
+        ranges=upload_sessions.ranges(up),
+        chunk_size=settings.upload_chunk_size_mb * 1024 * 1024,
+        status=up.status,
+        item_id=up.item_id,
+        expires_at=up.expires_at,
+    )
+
+
+@router.post("/items/uploads", response_model=UploadSessionDTO)
+def create_upload_session(body: UploadSessionCreate, session: Session = Depends(get_session)):
+    """
+    Starts a resumable chunked upload: PUT the bytes to /items/uploads/{id}?offset=N (raw
+    body, any order, in parallel), GET the session to see what is missing after a dropped
+    connection, then POST /items/uploads/{id}/finalize to create the item.
+    """
+    meta_obj = _normalize_create_meta(body.meta)
+    # fail now rather than after the last chunk
+    _resolve_create_refs(session, meta_obj)
+    try:
+        _guess_media_type(body.content_type, body.filename)
+    except Exception as e:
+        raise_api_error(400, "UNSUPPORTED_MEDIA", str(e))
+
+    upload_sessions.sweep(session)
+    up = upload_sessions.create(
+        session,
+        filename=body.filename,
+        content_type=body.content_type,
+        size=body.size,
+        sha256=body.sha256,
+        meta_json=meta_obj.model_dump_json(),
+    )
+    return _upload_session_dto(up)
+
+
+@router.get("/items/uploads/{upload_id}", response_model=UploadSessionDTO)
+def get_upload_session(upload_id: str, session: Session = Depends(get_session)):
+    return _upload_session_dto(upload_sessions.get(session, upload_id))
+
+
+@router.put("/items/uploads/{upload_id}", response_model=UploadSessionDTO)
+async def put_upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    session: Session = Depends(get_session),
+):
+    up = await upload_sessions.write_chunk(session, upload_id, offset, request.stream())
+    return _upload_session_dto(up)
+
+
+@router.post("/items/uploads/{upload_id}/finalize", response_model=ItemDTO)
+async def finalize_upload_session(upload_id: str, session: Session = Depends(get_session)):
+    """
+    Creates the item from a complete upload, like POST /items. Repeating it returns the item;
+    a call while another one is still at it gets 409 UPLOAD_FINALIZING (retry to get the item).
+    """
+    up = upload_sessions.get(session, upload_id)
+    claimed = False
+    if up.status == "open":
+        gaps = upload_sessions.missing(up)
+        if gaps:
+            raise_api_error(409, "UPLOAD_INCOMPLETE", "Upload is missing byte ranges", {"missing": gaps})
+        claimed = upload_sessions.claim(session, up)  # refreshes up
+        if not claimed and up.status == "open":
+            raise_api_error(409, "UPLOAD_BUSY", "A chunk of this upload is still being written; retry", {
+                "upload_id": upload_id,
+            })
+    if up.status == "done":
+        it = session.get(Item, up.item_id) if up.item_id else None
+        if not it:
+            raise_api_error(410, "UPLOAD_ITEM_GONE", "The item of this upload no longer exists", {"upload_id": upload_id})
+        return _build_item_dto(session, it)
+    if not claimed:
+        raise_api_error(409, "UPLOAD_FINALIZING", "Upload is being finalized; retry to get the item", {
+            "upload_id": upload_id,
+        })
+
+    try:
+        if not upload_sessions.part_path(up.id).exists():
+            raise_api_error(410, "UPLOAD_GONE", "Upload data is gone; start a new upload", {"upload_id": upload_id})
+
+        sha256_hex = await run_in_threadpool(upload_sessions.finish_hash, up)
+        if up.sha256 and sha256_hex != up.sha256:
+            raise_api_error(409, "SHA256_MISMATCH", "Uploaded bytes do not match the announced sha256", {
+                "expected": up.sha256, "actual": sha256_hex,
+            })
+        meta_obj = ItemCreateMeta.model_validate_json(up.meta_json)
+
+        async def store(item_id: str, abs_media: Path) -> str:
+            try:
+                ingest.place_file(upload_sessions.part_path(up.id), abs_media, _stored_media(session, sha256_hex))
+            except Exception as e:
+                safe_unlink(abs_media)
+                raise_api_error(500, "SAVE_FAILED", f"Failed to save file: {e}")
+            upload_sessions.finalized(session, up, item_id)
+            return sha256_hex
+
+        return await _create_item_with_media(session, meta_obj, up.content_type, up.filename, store)
+    except BaseException:
+        # back to open so the client can fix it and finalize again (no-op once committed as done)
+        upload_sessions.release(session, up)
+        raise
+
+
+@router.delete("/items/uploads/{upload_id}")
+def abort_upload_session(upload_id: str, session: Session = Depends(get_session)):
+    upload_sessions.abort(session, upload_sessions.get(session, upload_id))
+    return {"ok": True}
+
+
+@router.post("/items/{item_id}/reprocess", response_model=ItemDTO)
+def reprocess_item(item_id: str, session: Session = Depends(get_session)):
+    """
+    Re-queues upload post-processing (thumb/poster, embedding, classification, FTS),
+    e.g. for items whose processing failed.
+    """
+    it = session.get(Item, item_id)
+    if not it:
+        raise_api_error(404, "NOT_FOUND", "Item not found", {"item_id": item_id})
+    if it.status == "processing":
+        raise_api_error(409, "ITEM_PROCESSING", "Item is already being processed", {"item_id": item_id})
+
+    it.status = "processing"
+    it.status_error = None
+    it.updated_at = datetime.utcnow()
+    session.add(it)
+    job = jobs.enqueue(session, item_pipeline.JOB_KIND, item_id=item_id)
+    session.commit()
+
+    jobs.dispatch(job.id)
+    session.refresh(it)
+    return _build_item_dto(session, it)
+
 @router.post("/items/bulk_patch")
 def bulk_patch_items(body: ItemsBulkPatch, session: Session = Depends(get_session)):
     # guard
@@ -905,7 +1562,7 @@ def bulk_patch_items(body: ItemsBulkPatch, session: Session = Depends(get_sessio
 
     # validate category if provided
     if body.category_id is not None:
-        c = session.get(Category, body.category_id)
+        c = ref_cache.get_category(body.category_id)
         if not c:
             raise_api_error(400, "CATEGORY_NOT_FOUND", "Category not found", {"category_id": body.category_id})
 
@@ -921,81 +1578,80 @@ def bulk_patch_items(body: ItemsBulkPatch, session: Session = Depends(get_sessio
     tags_remove = normalize_list(body.tags_remove or [])
 
     now = datetime.utcnow()
-    updated = 0
-    missing = []
+    touched_categories: set[str] = set()
+
+    values: dict = {"updated_at": now}
+    if body.category_id is not None:
+        values["category_id"] = body.category_id
+    if body.series_id is not None:
+        values["series_id"] = series_obj.id if series_obj else None
+        values["series_name_snapshot"] = series_obj.name if series_obj else None
+        values["delimiter_snapshot"] = series_obj.delimiter if series_obj else None
 
     try:
-        for iid in item_ids:
-            it = session.get(Item, iid)
-            if not it:
-                missing.append(iid)
-                continue
-
-            # apply category
-            if body.category_id is not None:
-                it.category_id = body.category_id
-
-            # apply series
-            if body.series_id is not None:
-                if body.series_id == "":
-                    it.series_id = None
-                    it.series_name_snapshot = None
-                    it.delimiter_snapshot = None
-                else:
-                    it.series_id = series_obj.id
-                    it.series_name_snapshot = series_obj.name
-                    it.delimiter_snapshot = series_obj.delimiter
-
-            # apply tags
-            if tags_set is not None:
-                _set_item_tags_replace_all(session, it.id, tags_set)
-            else:
-                if tags_add or tags_remove:
-                    cur = set(_load_item_tags(session, it.id))
-                    cur |= set(tags_add)
-                    cur -= set(tags_remove)
-                    _set_item_tags_replace_all(session, it.id, sorted(cur))
+        # existing ids (input order) and the categories they leave
+        found_set: set[str] = set()
+        for chunk in _chunks(item_ids):
+            for iid, cat_id in session.exec(select(Item.id, Item.category_id).where(Item.id.in_(chunk))).all():
+                found_set.add(iid)
+                if body.category_id is not None and cat_id != body.category_id:
+                    touched_categories.update([cat_id, body.category_id])
+        found = [iid for iid in item_ids if iid in found_set]
+        missing = [iid for iid in item_ids if iid not in found_set]
+
+        # FTS documents of the touched items are recomputed once, after all statements
+        with fts_deferred_sync(session):
+            for chunk in _chunks(found):
+                session.exec(
+                    sa_update(Item).where(Item.id.in_(chunk)).values(**values)
+                    .execution_options(synchronize_session=False)
+                )
 
-            it.updated_at = now
-            session.add(it)
-            updated += 1
+            # tags: resolve names once, then diff the links of the whole selection
+            if tags_set is not None:
+                tag_ids = _upsert_tags(session, tags_set)
+                _unlink_tags(session, found, tag_ids, keep=True)
+                _link_tags(session, found, tag_ids)
+            elif tags_add or tags_remove:
+                removed = set(tags_remove)
+                _unlink_tags(session, found, list(_existing_tag_ids(session, tags_remove).values()))
+                _link_tags(session, found, _upsert_tags(session, [t for t in tags_add if t not in removed]))
 
         session.commit()
+        centroids.invalidate_categories(touched_categories)
 
-        # refresh fts best-effort (safe no-op if FTS missing)
-        for iid in item_ids:
-            try:
-                fts_upsert_item(session, iid)
-            except Exception:
-                pass
-
-        return {"status": "ok", "requested": len(item_ids), "updated": updated, "missing_item_ids": missing}
+        return {"status": "ok", "requested": len(item_ids), "updated": len(found), "missing_item_ids": missing}
 
     except Exception as e:
         session.rollback()
         raise_api_error(500, "BULK_PATCH_FAILED", f"Bulk patch failed: {str(e)[:300]}")
 
+
+def _bulk_set_deleted(session: Session, ids: list[str], deleted: bool) -> tuple[int, set[str]]:
+    # flip is_deleted on the ids currently in the other state; (changed rows, their categories)
+    now = datetime.utcnow()
+    changed = 0
+    touched_categories: set[str] = set()
+    for chunk in _chunks(ids):
+        cond = (Item.id.in_(chunk), Item.is_deleted == (not deleted))
+        touched_categories.update(session.exec(select(Item.category_id).where(*cond).distinct()).all())
+        res = session.exec(
+            sa_update(Item).where(*cond)
+            .values(is_deleted=deleted, deleted_at=(now if deleted else None), updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        changed += int(res.rowcount or 0)
+    return changed, touched_categories
+
+
 @router.post("/items/bulk_trash")
 def bulk_trash(body: ItemsBulkIds, session: Session = Depends(get_session)):
     ids = list(dict.fromkeys([x for x in body.item_ids if x]))
-    now = datetime.utcnow()
-    updated = 0
 
     try:
-        for iid in ids:
-            it = session.get(Item, iid)
-            if not it or it.is_deleted:
-                continue
-            it.is_deleted = True
-            it.deleted_at = now
-            it.updated_at = now
-            session.add(it)
-            updated += 1
+        updated, touched_categories = _bulk_set_deleted(session, ids, True)
         session.commit()
-
-        for iid in ids:
-            try: fts_delete_item(session, iid)
-            except Exception: pass
+        centroids.invalidate_categories(touched_categories)
 
         return {"status": "ok", "requested": len(ids), "trashed": updated}
     except Exception as e:
@@ -1006,24 +1662,11 @@ def bulk_trash(body: ItemsBulkIds, session: Session = Depends(get_session)):
 @router.post("/items/bulk_restore")
 def bulk_restore(body: ItemsBulkIds, session: Session = Depends(get_session)):
     ids = list(dict.fromkeys([x for x in body.item_ids if x]))
-    now = datetime.utcnow()
-    updated = 0
 
     try:
-        for iid in ids:
-            it = session.get(Item, iid)
-            if not it or not it.is_deleted:
-                continue
-            it.is_deleted = False
-            it.deleted_at = None
-            it.updated_at = now
-            session.add(it)
-            updated += 1
+        updated, touched_categories = _bulk_set_deleted(session, ids, False)
         session.commit()
-
-        for iid in ids:
-            try: fts_upsert_item(session, iid)
-            except Exception: pass
+        centroids.invalidate_categories(touched_categories)
 
         return {"status": "ok", "requested": len(ids), "restored": updated}
     except Exception as e:
@@ -1040,96 +1683,24 @@ def bulk_purge(body: ItemsBulkPurgeRequest, session: Session = Depends(get_sessi
     if not ids:
         raise_api_error(400, "EMPTY_IDS", "item_ids is empty")
 
-    storage_root = Path(settings.storage_root).resolve()
+    # safety: only soft-deleted items are purged
+    state: dict[str, bool] = {}
+    for chunk in _chunks(ids):
+        state.update({iid: bool(d) for iid, d in session.exec(select(Item.id, Item.is_deleted).where(Item.id.in_(chunk))).all()})
+    session.rollback()  # the purge runs in its own transactions
+    missing_items = [iid for iid in ids if iid not in state]
+    not_deleted_items = [iid for iid in ids if state.get(iid) is False]
 
-    deleted_items = 0
-    deleted_versions = 0
-    deleted_tags = 0
-    deleted_embeddings = 0
-    deleted_files = 0
-    missing_files = 0
-    missing_items: list[str] = []
-    not_deleted_items: list[str] = []
-    errors: list[dict] = []
-
-    for iid in ids:
-        it = session.get(Item, iid)
-        if not it:
-            missing_items.append(iid)
-            continue
-        if not it.is_deleted:
-            # safety: only allow purging soft-deleted items
-            not_deleted_items.append(iid)
-            continue
-
-        # compute abs paths before deleting row
-        rel_media = (it.media_path or "").replace("\\", "/").lstrip("/")
-        rel_thumb = (it.thumb_path or "").replace("\\", "/").lstrip("/")
-        rel_poster = (it.poster_path or "").replace("\\", "/").lstrip("/") if it.poster_path else None
-
-        abs_media = (storage_root / rel_media).resolve() if rel_media else None
-        abs_thumb = (storage_root / rel_thumb).resolve() if rel_thumb else None
-        abs_poster = (storage_root / rel_poster).resolve() if rel_poster else None
-
-        try:
-            # DB delete (explicit, do not rely on cascade)
-            emb = session.exec(select(ItemEmbedding).where(ItemEmbedding.item_id == iid)).all()
-            for r in emb:
-                session.delete(r)
-            deleted_embeddings += len(emb)
-
-            links = session.exec(select(ItemTag).where(ItemTag.item_id == iid)).all()
-            for r in links:
-                session.delete(r)
-            deleted_tags += len(links)
-
-            vers = session.exec(select(ItemVersion).where(ItemVersion.item_id == iid)).all()
-            for r in vers:
-                session.delete(r)
-            deleted_versions += len(vers)
-
-            session.delete(it)
-            session.commit()
-            deleted_items += 1
-
-            # remove from FTS best-effort
-            try:
-                fts_delete_item(session, iid)
-            except Exception:
-                pass
-
-            # file purge after DB commit
-            if body.purge_files:
-                for p in [abs_media, abs_thumb, abs_poster]:
-                    if not p:
-                        continue
-                    try:
-                        if p.exists():
-                            safe_unlink(p)
-                            deleted_files += 1
-                        else:
-                            missing_files += 1
-                    except Exception as e:
-                        errors.append({"item_id": iid, "stage": "delete_file", "path": str(p), "err": str(e)[:300]})
-
-        except Exception as e:
-            session.rollback()
-            errors.append({"item_id": iid, "stage": "db_delete", "err": str(e)[:400]})
+    res = purge_service.purge([iid for iid in ids if state.get(iid)], purge_files=body.purge_files)
 
     return {
         "status": "ok",
         "requested": len(ids),
-        "deleted": {
-            "items": deleted_items,
-            "item_versions": deleted_versions,
-            "item_tags": deleted_tags,
-            "item_embeddings": deleted_embeddings,
-            "files_deleted": deleted_files,
-            "files_missing": missing_files,
-        },
+        "deleted": res["deleted"],
+        "seconds": res["seconds"],
         "skipped": {
             "missing_items": missing_items,
             "not_deleted_items": not_deleted_items,
         },
-        "errors_sample": errors[:20],
+        "errors_sample": res["errors"][:20],
     }
@@ -6,14 +6,17 @@ from sqlmodel import Session, select
 from sqlalchemy import text, func
 from fastapi import APIRouter, Depends, Query, UploadFile, File, BackgroundTasks
 import hashlib
+import time
 
-from app.db import get_session
+from app.db import engine, get_session
 from app.settings import settings
+from app.util.sqlite import pool_stats as sqlite_pool_stats
 from app.util.text import normalize_text
 from app.util.errors import raise_api_error
-from app.models import Item, ItemVersion, Series, SeriesVersion, Tag, ItemTag, ItemEmbedding, SeriesTag
-from app.services.fts import fts_rebuild_all, fts_delete_item
-from app.services.thumbs import make_image_thumb, make_video_poster
+from app.models import Item, ItemVersion, Series, SeriesVersion, Tag, ItemEmbedding, SeriesTag
+from app.services.fts import fts_rebuild_all, fts_tokenizer, search_stats as fts_search_stats
+from app.services.thumbs import ImageTooLarge, make_image_renditions, make_image_thumb, make_video_poster, rendition_rels
+from app.services.thumbs import stats as thumbs_stats
 from app.services.storage import safe_unlink
 from pydantic import BaseModel, Field
 
@@ -37,7 +40,14 @@ from typing import Optional, List
 from datetime import datetime
 from sqlmodel import select
 from app.models import Item, Category
-from app.services.auto_category import classify_item, serialize_candidates
+from app.services import reclassify as reclassify_service
+from app.services import artifacts, clip_batcher, file_stat, ingest, items_cache, jobs, phash_index, upload_sessions, vector_index
+from app.services.phash import phash_file, to_db as phash_to_db
+from app.services import semantic as semantic_service
+from app.services import purge as purge_service
+from app.services.classify import MODEL_KEY_DEFAULT, _open_clip_available
+from app.services.embeddings import pack_f32
+from app.services import ref_cache, centroids
 
 
 router = APIRouter()
@@ -72,7 +82,7 @@ def diag(session: Session = Depends(get_session)):
     fts_rows = 0
     if fts_ok:
         try:
-            fts_rows = int(session.exec(text("SELECT COUNT(*) FROM items_fts")).one())
+            fts_rows = int(session.exec(text("SELECT COUNT(*) FROM items_fts")).one()[0])
         except Exception:
             fts_rows = -1
 
@@ -107,7 +117,12 @@ def diag(session: Session = Depends(get_session)):
     return {
         "status": "ok",
         "now_utc": datetime.utcnow().isoformat(),
-        "db": {"url": settings.database_url},
+        "db": {
+            "url": settings.database_url,
+            "journal_mode": session.exec(text("PRAGMA journal_mode")).one()[0],
+            "pool": engine.pool.status(),
+            "raw_pools": sqlite_pool_stats(),
+        },
         "storage": {"root": str(storage_root)},
         "counts": {
             "items": items_total,
@@ -115,16 +130,42 @@ def diag(session: Session = Depends(get_session)):
             "item_versions": item_versions_total,
             "series_versions": series_versions_total,
         },
-        "fts": {"exists": fts_ok, "rows": fts_rows},
+        "fts": {
+            "exists": fts_ok,
+            "rows": fts_rows,
+            "tokenizer": fts_tokenizer(session),
+            "search": fts_search_stats(),
+        },
+        "ref_cache": ref_cache.stats(),
+        "centroids": centroids.stats(),
+        "clip_batcher": clip_batcher.stats(),
+        "jobs": jobs.stats(session),
+        "vector_index": vector_index.stats(),
+        "phash_index": phash_index.stats(),
+        "semantic_query_cache": semantic_service.cache_stats(),
+        "items_cache": items_cache.stats(),
+        "purge": purge_service.progress(),
+        "file_stat": file_stat.stats(),
+        "artifacts": artifacts.stats(),
+        "ingest": ingest.stats(),
+        "thumbs": thumbs_stats(),
+        "upload_sessions": upload_sessions.stats(),
         "recent_sample": sample,
         "recent_missing_files": missing_count,
     }
 
 
 @router.post("/_maintenance/fts_rebuild")
-def fts_rebuild(session: Session = Depends(get_session)):
-    n = fts_rebuild_all(session)
-    return {"status": "ok", "rebuilt": n}
+def fts_rebuild(
+    reindex: int = Query(0, ge=0, le=1),
+    chunk_size: Optional[int] = Query(None, ge=100, le=200000),
+    session: Session = Depends(get_session),
+):
+    try:
+        res = fts_rebuild_all(session, chunk_size=chunk_size, reindex=bool(reindex))
+    except Exception as e:
+        raise_api_error(500, "FTS_REBUILD_FAILED", f"{str(e)[:300]}")
+    return {"status": "ok", "rebuilt": res["documents"], **res}
 
 
 @router.post("/_maintenance/repair_media")
@@ -184,101 +225,41 @@ def purge_deleted(req: PurgeDeletedRequest, session: Session = Depends(get_sessi
     if req.confirm != "PURGE":
         return {"status": "error", "code": "CONFIRM_REQUIRED", "message": 'confirm must be exactly "PURGE"'}
 
-    storage_root = Path(settings.storage_root).resolve()
-
     # pick oldest deleted first (stable)
-    items = session.exec(
-        select(Item)
+    ids = list(session.exec(
+        select(Item.id)
         .where(Item.is_deleted == True)
         .order_by(Item.deleted_at.asc().nulls_last(), Item.created_at.asc())
         .limit(req.limit)
-    ).all()
-
-    deleted_items = 0
-    deleted_versions = 0
-    deleted_tags = 0
-    deleted_embeddings = 0
-    deleted_files = 0
-    missing_files = 0
-    errors: list[dict] = []
-    sample_ids: list[str] = []
+    ).all())
+    session.rollback()  # the purge runs in its own transactions
 
-    for it in items:
-        sample_ids.append(it.id)
+    res = purge_service.purge(ids, purge_files=req.purge_files)
 
-        # prepare file paths
-        rel_media = (it.media_path or "").replace("\\", "/").lstrip("/")
-        rel_thumb = (it.thumb_path or "").replace("\\", "/").lstrip("/")
-        rel_poster = (it.poster_path or "").replace("\\", "/").lstrip("/") if it.poster_path else None
-
-        abs_media = (storage_root / rel_media).resolve() if rel_media else None
-        abs_thumb = (storage_root / rel_thumb).resolve() if rel_thumb else None
-        abs_poster = (storage_root / rel_poster).resolve() if rel_poster else None
+    return {
+        "status": "ok",
+        "scanned": len(ids),
+        "deleted": res["deleted"],
+        "seconds": res["seconds"],
+        "errors_sample": res["errors"][:20],
+        "sample_item_ids": ids[:20],
+    }
 
-        try:
-            # 1) remove from FTS (best-effort)
-            try:
-                fts_delete_item(session, it.id)
-            except Exception:
-                pass
-
-            # 2) delete child rows (explicit, no cascade assumption)
-            # item_embeddings
-            emb = session.exec(select(ItemEmbedding).where(ItemEmbedding.item_id == it.id)).all()
-            for r in emb:
-                session.delete(r)
-            deleted_embeddings += len(emb)
-
-            # item_tags
-            links = session.exec(select(ItemTag).where(ItemTag.item_id == it.id)).all()
-            for r in links:
-                session.delete(r)
-            deleted_tags += len(links)
-
-            # item_versions
-            vers = session.exec(select(ItemVersion).where(ItemVersion.item_id == it.id)).all()
-            for r in vers:
-                session.delete(r)
-            deleted_versions += len(vers)
-
-            # 3) delete item
-            session.delete(it)
 
-            session.commit()
-            deleted_items += 1
-
-            # 4) delete files after DB commit (so DB state is consistent even if fs fails)
-            if req.purge_files:
-                for p in [abs_media, abs_thumb, abs_poster]:
-                    if not p:
-                        continue
-                    try:
-                        if p.exists():
-                            safe_unlink(p)
-                            deleted_files += 1
-                        else:
-                            missing_files += 1
-                    except Exception as e:
-                        errors.append({"item_id": it.id, "stage": "delete_file", "path": str(p), "err": str(e)[:300]})
+@router.get("/_maintenance/purge/progress")
+def purge_progress():
+    """
+    Progress of the running (or last) purge: rows phase, then files phase.
+    """
+    return purge_service.progress()
 
-        except Exception as e:
-            session.rollback()
-            errors.append({"item_id": it.id, "stage": "db_delete", "err": str(e)[:400]})
 
-    return {
-        "status": "ok",
-        "scanned": len(items),
-        "deleted": {
-            "items": deleted_items,
-            "item_versions": deleted_versions,
-            "item_tags": deleted_tags,
-            "item_embeddings": deleted_embeddings,
-            "files_deleted": deleted_files,
-            "files_missing": missing_files,
-        },
-        "errors_sample": errors[:20],
-        "sample_item_ids": sample_ids[:20],
-    }
+@router.post("/_maintenance/purge/resume")
+def purge_resume():
+    """
+    Removes files left behind by an interrupted purge (also done on startup).
+    """
+    return {"status": "ok", "files": purge_service.resume_files()}
 
 def _posix_rel(p: Optional[str]) -> Optional[str]:
     if not p:
@@ -541,6 +522,8 @@ def repair_mojibake(req: RepairMojibakeRequest, session: Session = Depends(get_s
 
         if apply_fix:
             session.commit()
+            # tag names may have changed
+            ref_cache.invalidate_tags()
         else:
             session.rollback()
 
@@ -600,6 +583,136 @@ def backfill_media_sha256(req: BackfillShaRequest, session: Session = Depends(ge
     session.commit()
     return {"status": "ok", "updated": updated, "missing_media": missing_media, "errors_sample": errors[:20]}
 
+class BackfillPhashRequest(BaseModel):
+    limit: int = Field(20000, ge=1, le=1000000)
+    include_deleted: bool = True
+    commit_every: int = Field(1000, ge=1, le=20000)
+
+@router.post("/_maintenance/backfill_phash")
+def backfill_phash(req: BackfillPhashRequest, session: Session = Depends(get_session)):
+    """
+    Computes items.media_phash for items that have none: from the thumbnail, like ingest,
+    else from the image itself / the video poster. Items without a readable picture stay
+    NULL and are reported.
+    """
+    root = Path(settings.storage_root).resolve()
+
+    stmt = (
+        select(Item.id, Item.media_type, Item.media_path, Item.thumb_path, Item.poster_path)
+        .where(Item.media_phash == None)
+        .order_by(Item.created_at.desc())
+        .limit(req.limit)
+    )
+    if not req.include_deleted:
+        stmt = stmt.where(Item.is_deleted == False)
+    rows = session.exec(stmt).all()
+
+    updated = 0
+    missing_file: list[str] = []
+    failed: list[str] = []
+    t0 = time.perf_counter()
+
+    for i in range(0, len(rows), req.commit_every):
+        batch = []
+        for iid, media_type, media_path, thumb_path, poster_path in rows[i : i + req.commit_every]:
+            srcs = [_safe_under_root(root, thumb_path), _safe_under_root(root, media_path if media_type == "image" else poster_path)]
+            srcs = [p for p in srcs if p is not None and p.exists()]
+            if not srcs:
+                missing_file.append(iid)
+                continue
+            h = None
+            for src in srcs:
+                h = phash_file(src)
+                if h is not None:
+                    break
+            if h is None:
+                failed.append(iid)
+                continue
+            batch.append({"h": phash_to_db(h), "i": iid})
+        if batch:
+            # updated_at is left alone: hashing is not an edit
+            session.exec(text("UPDATE items SET media_phash = :h WHERE id = :i"), params=batch)
+            updated += len(batch)
+        session.commit()
+
+    elapsed = time.perf_counter() - t0
+    if updated:
+        phash_index.invalidate()
+
+    return {
+        "status": "ok",
+        "scanned": len(rows),
+        "updated": updated,
+        "failed": len(failed),
+        "failed_sample": failed[:20],
+        "missing_file": len(missing_file),
+        "missing_file_sample": missing_file[:20],
+        "elapsed_sec": round(elapsed, 3),
+        "items_per_sec": (round(updated / elapsed, 1) if elapsed > 0 else None),
+    }
+
+class BackfillRenditionsRequest(BaseModel):
+    limit: int = Field(5000, ge=1, le=1000000)
+    include_deleted: bool = False
+    commit_every: int = Field(200, ge=1, le=5000)
+
+@router.post("/_maintenance/backfill_renditions")
+def backfill_renditions(req: BackfillRenditionsRequest, session: Session = Depends(get_session)):
+    """
+    Makes the grid renditions (THUMB_RENDITIONS x THUMB_FORMATS) of processed items that
+    have none: from the image itself / the video poster, the thumb is left as it is.
+    """
+    root = Path(settings.storage_root).resolve()
+
+    stmt = (
+        select(Item.id, Item.media_type, Item.media_path, Item.thumb_path, Item.poster_path)
+        .where(Item.renditions == None, Item.status == "ready")
+        .order_by(Item.created_at.desc())
+        .limit(req.limit)
+    )
+    if not req.include_deleted:
+        stmt = stmt.where(Item.is_deleted == False)
+    rows = session.exec(stmt).all()
+
+    updated = 0
+    missing_file: list[str] = []
+    failed: list[dict] = []
+    t0 = time.perf_counter()
+
+    for i in range(0, len(rows), req.commit_every):
+        batch = []
+        for iid, media_type, media_path, thumb_path, poster_path in rows[i : i + req.commit_every]:
+            src = _safe_under_root(root, media_path if media_type == "image" else poster_path)
+            thumb = _safe_under_root(root, thumb_path)
+            if src is None or thumb is None or not src.exists():
+                missing_file.append(iid)
+                continue
+            try:
+                raw = make_image_renditions(src, thumb, write_thumb=False)
+            except (OSError, ImageTooLarge) as e:
+                failed.append({"item_id": iid, "err": str(e)[:200]})
+                continue
+            if raw:
+                batch.append({"r": raw, "i": iid})
+        if batch:
+            # updated_at is left alone: new files, not an edit
+            session.exec(text("UPDATE items SET renditions = :r WHERE id = :i"), params=batch)
+            updated += len(batch)
+        session.commit()
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "status": "ok",
+        "scanned": len(rows),
+        "updated": updated,
+        "failed": len(failed),
+        "failed_sample": failed[:20],
+        "missing_file": len(missing_file),
+        "missing_file_sample": missing_file[:20],
+        "elapsed_sec": round(elapsed, 3),
+        "items_per_sec": (round(updated / elapsed, 1) if elapsed > 0 else None),
+    }
+
 class TrashMissingFilesRequest(BaseModel):
     limit: int = Field(5000, ge=1, le=200000)
     include_deleted: bool = False          # 默认只处理 active
@@ -683,6 +796,7 @@ def trash_missing_files(req: TrashMissingFilesRequest, session: Session = Depend
     ids = list(dict.fromkeys(ids))
 
     trashed = 0
+    touched_categories: set[str] = set()
     for iid in ids:
         it = session.get(Item, iid)
         if not it or it.is_deleted:
@@ -691,16 +805,11 @@ def trash_missing_files(req: TrashMissingFilesRequest, session: Session = Depend
         it.deleted_at = now
         it.updated_at = now
         session.add(it)
+        touched_categories.add(it.category_id)
         trashed += 1
 
     session.commit()
-
-    # remove from FTS best-effort
-    for iid in ids:
-        try:
-            fts_delete_item(session, iid)
-        except Exception:
-            pass
+    centroids.invalidate_categories(touched_categories)
 
     return {
         "status": "ok",
@@ -732,21 +841,16 @@ def _rel_norm(p: Optional[str]) -> Optional[str]:
 
 def _build_referenced_set(session: Session, include_deleted: bool) -> set[str]:
     """
-    Build a set of referenced relative paths from DB (media/thumb/poster only).
+    Build a set of referenced relative paths from DB (media/thumb/poster/renditions only).
     """
-    stmt = select(Item.media_path, Item.thumb_path, Item.poster_path)
+    stmt = select(Item.media_path, Item.thumb_path, Item.poster_path, Item.renditions)
     if not include_deleted:
         stmt = stmt.where(Item.is_deleted == False)
     rows = session.exec(stmt).all()
 
     ref = set()
-    for r in rows:
-        # SQLModel may return tuple-like
-        media = r[0] if isinstance(r, (tuple, list)) else None
-        thumb = r[1] if isinstance(r, (tuple, list)) else None
-        poster = r[2] if isinstance(r, (tuple, list)) else None
-
-        for x in (media, thumb, poster):
+    for media, thumb, poster, renditions in rows:
+        for x in (media, thumb, poster, *rendition_rels(thumb, renditions)):
             rr = _rel_norm(x)
             if rr:
                 ref.add(rr)
@@ -889,100 +993,105 @@ class ReclassifyRequest(BaseModel):
 
 @router.post("/_maintenance/reclassify_items")
 def reclassify_items(req: ReclassifyRequest, session: Session = Depends(get_session)):
-    thr = float(req.threshold) if req.threshold is not None else float(settings.auto_cat_threshold)
+    return reclassify_service.reclassify_items(
+        session,
+        limit=req.limit,
+        threshold=req.threshold,
+        dry_run=req.dry_run,
+        include_deleted=req.include_deleted,
+        force=req.force,
+        only_uncategorized=req.only_uncategorized,
+    )
+
+class EmbedMissingRequest(BaseModel):
+    limit: int = Field(5000, ge=1, le=200000)
+    include_deleted: bool = False
+    dry_run: bool = False
+    commit_every: int = Field(256, ge=1, le=10000)
 
-    # ensure uncategorized exists
-    from app.services.auto_category import ensure_uncategorized
-    unc = ensure_uncategorized(session)
 
-    stmt = select(Item).order_by(Item.created_at.desc()).limit(req.limit)
+@router.post("/_maintenance/embed_missing")
+def embed_missing(req: EmbedMissingRequest, session: Session = Depends(get_session)):
+    """
+    Computes CLIP image embeddings for items that have no ItemEmbedding row yet
+    (image -> media file, video -> poster), through the shared batched encoder.
+    """
+    model_key = MODEL_KEY_DEFAULT
+    root = Path(settings.storage_root).resolve()
+
+    stmt = (
+        select(Item.id, Item.media_type, Item.media_path, Item.poster_path, Item.category_id)
+        .join(
+            ItemEmbedding,
+            (ItemEmbedding.item_id == Item.id) & (ItemEmbedding.model_key == model_key),
+            isouter=True,
+        )
+        .where(ItemEmbedding.item_id == None)
+        .order_by(Item.created_at.desc())
+        .limit(req.limit)
+    )
     if not req.include_deleted:
         stmt = stmt.where(Item.is_deleted == False)
+    rows = session.exec(stmt).all()
 
-    items = session.exec(stmt).all()
-
-    scanned = 0
-    would_update = 0
-    applied = 0
-    samples = []
-
-    now = datetime.utcnow()
-
-    for it in items:
-        scanned += 1
-
-        # Skip items with manually locked categories (unless force=True)
-        if it.is_category_locked and not req.force:
-            continue
-
-        prev_cat = it.category_id
-        prev_auto = it.auto_category_id
-        prev_conf = it.auto_confidence
-
-        unc2, best, top = classify_item(session, it.id, topk=3, threshold=thr, include_deleted_for_prototypes=req.include_deleted)
-
-        # compute next fields
-        next_auto_id = best.category_id if best else None
-        next_conf = best.score if best else None
-        next_candidates_json = serialize_candidates(top) if top else None
-        next_cat = (best.category_id if (best and best.score >= thr) else unc.id)
-
-        # decide whether to change final category_id
-        # If category is locked, never change category_id (but can still update auto_* fields)
-        allow_change = req.force and not it.is_category_locked
-        if not allow_change and not it.is_category_locked:
-            # safe mode:
-            # 1) only_uncategorized: only change if current category is uncategorized
-            if req.only_uncategorized and prev_cat == unc.id:
-                allow_change = True
-            # 2) or if current category equals previous auto_category_id (not manually overridden)
-            elif (not req.only_uncategorized) and prev_auto and prev_cat == prev_auto:
-                allow_change = True
-
-        will_change = False
-        # always refresh auto_* fields if we have candidates
-        will_change = will_change or (next_candidates_json != (it.auto_candidates_json or None)) \
-                      or (next_auto_id != prev_auto) \
-                      or (next_conf != prev_conf)
-
-        if allow_change and next_cat != prev_cat:
-            will_change = True
-
-        if will_change:
-            would_update += 1
-            if len(samples) < 50:
-                samples.append({
-                    "item_id": it.id,
-                    "title": it.title,
-                    "prev": {"category_id": prev_cat, "auto_category_id": prev_auto, "auto_conf": prev_conf},
-                    "next": {"category_id": (next_cat if allow_change else prev_cat), "auto_category_id": next_auto_id, "auto_conf": next_conf},
-                })
-
-        if req.dry_run:
+    todo: list[tuple[str, Path, str]] = []
+    missing_file: list[str] = []
+    for iid, media_type, media_path, poster_path, category_id in rows:
+        src = _safe_under_root(root, media_path if media_type == "image" else poster_path)
+        if src is None or not src.exists():
+            missing_file.append(iid)
             continue
+        todo.append((iid, src, category_id))
 
-        # apply changes
-        it.auto_candidates_json = next_candidates_json
-        it.auto_category_id = next_auto_id
-        it.auto_confidence = next_conf
-        if allow_change:
-            it.category_id = next_cat
-        it.updated_at = now
-        session.add(it)
-        applied += 1
+    if req.dry_run:
+        return {
+            "status": "ok",
+            "dry_run": True,
+            "model_key": model_key,
+            "scanned": len(rows),
+            "would_embed": len(todo),
+            "missing_file": len(missing_file),
+            "missing_file_sample": missing_file[:20],
+        }
 
-    if not req.dry_run:
+    if not _open_clip_available():
+        raise_api_error(503, "CLIP_UNAVAILABLE", "open_clip/torch are not installed; cannot compute embeddings")
+
+    embedded = 0
+    failed: list[str] = []
+    touched_categories: set[str] = set()
+    t0 = time.perf_counter()
+
+    for i in range(0, len(todo), req.commit_every):
+        chunk = todo[i : i + req.commit_every]
+        vecs = clip_batcher.encode_images([src for _, src, _ in chunk])
+        now = datetime.utcnow()
+        for (iid, _, category_id), vec in zip(chunk, vecs):
+            if vec is None:
+                failed.append(iid)
+                continue
+            blob, dim = pack_f32(vec)
+            session.add(ItemEmbedding(item_id=iid, model_key=model_key, dim=dim, vector_blob=blob, created_at=now))
+            touched_categories.add(category_id)
+            embedded += 1
         session.commit()
 
+    elapsed = time.perf_counter() - t0
+    centroids.invalidate_categories(touched_categories)
+
     return {
         "status": "ok",
-        "dry_run": req.dry_run,
-        "threshold": thr,
-        "scanned": scanned,
-        "would_update": would_update,
-        "applied": (0 if req.dry_run else applied),
-        "sample": samples,
-        "uncategorized_id": unc.id,
+        "dry_run": False,
+        "model_key": model_key,
+        "scanned": len(rows),
+        "embedded": embedded,
+        "failed": len(failed),
+        "failed_sample": failed[:20],
+        "missing_file": len(missing_file),
+        "missing_file_sample": missing_file[:20],
+        "elapsed_sec": round(elapsed, 3),
+        "items_per_sec": (round(embedded / elapsed, 1) if elapsed > 0 else None),
+        "encoder": clip_batcher.stats(),
     }
 
 @router.get("/_maintenance/config")
@@ -16,16 +16,21 @@ from app.schemas import (
 from app.util.ids import new_id
 from app.util.errors import raise_api_error
 from app.util.text import normalize_text, normalize_list
+from app.services import ref_cache
 
 router = APIRouter()
 
 
 def _upsert_tags(session: Session, names: list[str]) -> list[str]:
+    known = ref_cache.tag_ids_by_names([(raw or "").strip() for raw in names if (raw or "").strip()])
     out_ids: list[str] = []
     for raw in names:
         name = (raw or "").strip()
         if not name:
             continue
+        if name in known:
+            out_ids.append(known[name])
+            continue
         existing = session.exec(select(Tag).where(Tag.name == name)).first()
         if existing:
             out_ids.append(existing.id)
@@ -53,9 +58,9 @@ def _load_series_tags(session: Session, series_id: str) -> list[str]:
     tag_ids = [r.tag_id for r in session.exec(select(SeriesTag).where(SeriesTag.series_id == series_id)).all()]
     if not tag_ids:
         return []
-    tags = session.exec(select(Tag).where(Tag.id.in_(tag_ids))).all()
+    names = ref_cache.tag_names_by_ids(tag_ids)
     # preserve input order loosely by name
-    return sorted([t.name for t in tags])
+    return sorted(names.values())
 
 
 def _build_series_dto(session: Session, s: Series) -> SeriesDTO:
@@ -1,16 +1,14 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select
+from fastapi import APIRouter
 
-from app.db import get_session
-from app.models import Tool
 from app.schemas import ToolListDTO, ToolDTO
+from app.services import ref_cache
 
 router = APIRouter()
 
 
 @router.get("/tools", response_model=ToolListDTO)
-def list_tools(session: Session = Depends(get_session)):
-    rows = session.exec(select(Tool).order_by(Tool.created_at.asc())).all()
+def list_tools():
+    rows = ref_cache.list_tools()
     return ToolListDTO(items=[ToolDTO.model_validate(r) for r in rows])
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional, List, Literal
+from typing import Dict, Optional, List, Literal
 
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -32,6 +32,10 @@ class ItemCreateMeta(BaseModel):
     category_id: Optional[str] = None  # Manual category selection (will lock category)
     tags: List[str] = Field(default_factory=list)
 
+    # POST /items without a file part: create the item from media already stored with
+    # this sha256 (see POST /items/exists); ignored when a file is sent
+    media_sha256: Optional[str] = Field(default=None, pattern=r"^[0-9a-fA-F]{64}$")
+
 
 class ItemPatch(BaseModel):
     title: Optional[str] = None
@@ -95,6 +99,9 @@ class ItemDTO(BaseModel):
     media_url: str
     thumb_url: str
     poster_url: Optional[str] = None
+    # grid renditions, {mime type: "url 256w, url 512w, ..."} in preference order:
+    # <picture><source type=... srcset=...>; empty until processed (thumb_url always works)
+    srcset: Dict[str, str] = Field(default_factory=dict)
 
     series: SeriesSnapshotDTO
 
@@ -113,12 +120,28 @@ class ItemDTO(BaseModel):
 
     media_sha256: Optional[str] = None
 
+    # upload post-processing state; thumb/poster files exist only once "ready"
+    status: Literal["processing", "ready", "failed"] = "ready"
+    status_error: Optional[str] = None
+
 
 class PageDTO(BaseModel):
     items: List[ItemDTO]
     page: int
     page_size: int
-    total: int
+    total: Optional[int] = None  # None when skipped (with_total=0, default in cursor mode)
+    next_cursor: Optional[str] = None  # opaque; pass back as ?cursor= for the next page
+
+
+class SimilarHitDTO(BaseModel):
+    score: float  # cosine similarity of CLIP image embeddings
+    item: ItemDTO
+
+
+class SimilarPageDTO(BaseModel):
+    model_key: str
+    k: int
+    items: List[SimilarHitDTO]
 
 
 class CategoryListDTO(BaseModel):
@@ -178,7 +201,7 @@ class SeriesPurgeDeletedRequest(BaseModel):
 
 
 class ItemsBulkPatch(BaseModel):
-    item_ids: List[str] = Field(min_length=1, max_length=500)
+    item_ids: List[str] = Field(min_length=1, max_length=10000)
 
     # optional operations (apply if provided)
     category_id: Optional[str] = None
@@ -193,16 +216,26 @@ class ItemsBulkPatch(BaseModel):
 
 
 class ItemsBulkIds(BaseModel):
-    item_ids: List[str] = Field(min_length=1, max_length=2000)
+    item_ids: List[str] = Field(min_length=1, max_length=10000)
 
 
 
 
 class ItemsBulkPurgeRequest(BaseModel):
     confirm: str = Field(..., description='Must be exactly "PURGE"')
-    item_ids: List[str] = Field(min_length=1, max_length=2000)
+    item_ids: List[str] = Field(min_length=1, max_length=10000)
     purge_files: bool = True
 
+class ItemsExistRequest(BaseModel):
+    sha256: List[str] = Field(min_length=1, max_length=5000)
+    include_deleted: bool = False
+
+
+class ItemsExistDTO(BaseModel):
+    found: Dict[str, str]  # sha256 -> id of the newest item with that media
+    missing: List[str]
+
+
 class DuplicateItemLiteDTO(BaseModel):
     id: str
     title: str
@@ -213,13 +246,15 @@ class DuplicateItemLiteDTO(BaseModel):
     created_at: datetime
     is_deleted: bool
 
-    media_exists: bool
-    thumb_exists: bool
+    # None when the page was asked for with check_files=0
+    media_exists: Optional[bool] = None
+    thumb_exists: Optional[bool] = None
     poster_exists: Optional[bool] = None
 
 class DuplicateGroupDTO(BaseModel):
-    key: str  # sha or sha|tool_id
-    media_sha256: str
+    key: str  # sha, sha|tool_id, or the group's pHash (scope=phash)
+    media_sha256: str  # "" for scope=phash groups
+    phash: Optional[str] = None  # scope=phash: smallest pHash in the group, 16 hex
     tool_id: Optional[str] = None
     tool_label: Optional[str] = None
     count: int
@@ -228,5 +263,29 @@ class DuplicateGroupDTO(BaseModel):
 class DuplicatePageDTO(BaseModel):
     page: int
     page_size: int
-    total_groups: int
+    total_groups: Optional[int] = None  # None when skipped (with_total=0)
     groups: List[DuplicateGroupDTO]
+    next_cursor: Optional[str] = None
+
+
+# ---------- Resumable chunked uploads ----------
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    content_type: Optional[str] = None
+    size: int = Field(ge=1)
+    sha256: Optional[str] = Field(default=None, pattern=r"^[0-9a-fA-F]{64}$")  # checked at finalize
+    meta: ItemCreateMeta
+
+
+class UploadSessionDTO(BaseModel):
+    id: str
+    filename: str
+    content_type: Optional[str] = None
+    size: int
+    received_bytes: int
+    ranges: List[List[int]]  # [start, end) byte ranges received, merged and sorted
+    chunk_size: int  # suggested PUT size
+    status: str  # open / finalizing / done
+    item_id: Optional[str] = None
+    expires_at: datetime
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import os
+import shutil
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+from app.models import Item
+from app.services.thumbs import rendition_rels
+from app.settings import settings
+
+
+# Reuse of derived artifacts across uploads of the same bytes.
+#
+# Thumb, renditions, poster, pHash and CLIP embeddings are functions of the media content, so an upload
+# whose media_sha256 already belongs to a processed item ("donor") takes them over instead
+# of regenerating: files are hard-linked (copied when the filesystem refuses a link), the
+# pHash is copied, and item_embeddings rows are copied for every model_key the donor has.
+#
+# The items table is the cache index (media_sha256 is indexed, see ix_items_media_sha256_dups):
+# nothing to fill or invalidate. Trashed donors count too; a donor purged meanwhile simply
+# fails the link and the next candidate (or a regular regeneration) is used, and links keep
+# a reused file alive when its donor is purged later.
+#
+# Across the two stores only the media bytes are shared: an upload to the gallery whose
+# sha256 is a library asset's (assets.sha256), or the reverse (items.media_sha256), is
+# hard-linked from the other store's file (gallery_media() / library_media() list the
+# candidates for services/ingest.py). Derived artifacts are not: gallery thumbs,
+# renditions and CLIP embeddings have nothing in common with library thumbs and faces.
+
+_MAX_CANDIDATES = 5
+
+_lock = threading.Lock()
+_stats = {"lookups": 0, "hits": 0, "misses": 0, "files_linked": 0, "files_copied": 0, "embeddings_copied": 0}
+
+
+def _abs(rel: Optional[str]) -> Optional[Path]:
+    if not rel:
+        return None
+    return settings.storage_root / rel.replace("\\", "/").lstrip("/")
+
+
+def _bump(**kw: int) -> None:
+    with _lock:
+        for k, v in kw.items():
+            _stats[k] += v
+
+
+def _place(src: Path, dst: Path) -> str:
+    """
+    Hard-links src to dst (replacing dst), falls back to a copy. Returns "linked" / "copied".
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if dst.exists():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+        return "linked"
+    except FileNotFoundError:
+        raise
+    except OSError:
+        # cross-device, or a filesystem without hard links
+        shutil.copyfile(src, dst)
+        return "copied"
+
+
+def gallery_media(session: Session, sha256_hex: str, limit: int = _MAX_CANDIDATES) -> List[Path]:
+    """
+    Storage paths of gallery media with this sha256 (newest first).
+    """
+    rows = session.exec(
+        select(Item.media_path).where(Item.media_sha256 == sha256_hex).order_by(Item.created_at.desc()).limit(limit)
+    ).all()
+    return [p for p in (_abs(rel) for rel in rows) if p]
+
+
+def library_media(sha256_hex: str) -> List[Path]:
+    """
+    Path of the library asset original with this sha256 ([] if none, or no library DB).
+    """
+    # lazy: the library package imports app.services
+    from library.db import LIBRARY_DB_PATH, get_db
+    from library.routes.assets import STORAGE_ROOT
+
+    if not LIBRARY_DB_PATH.exists():
+        return []
+    try:
+        with get_db() as conn:
+            row = conn.execute("SELECT storage_path FROM assets WHERE sha256 = ?", (sha256_hex,)).fetchone()
+    except sqlite3.Error:
+        return []  # library schema not initialized
+    if not row or not row[0]:
+        return []
+    return [STORAGE_ROOT / row[0].split("/library-files/", 1)[-1].lstrip("/")]
+
+
+def reuse(session: Session, it: Item) -> Optional[List[str]]:
+    """
+    Gives `it` the thumb/renditions/poster/pHash/embeddings of an earlier, processed upload of the same
+    bytes. Returns the model_keys whose embedding was copied, or None when nothing was
+    reused (no donor) and the caller has to generate everything.
+
+    Embedding rows are added to the session (flushed, not committed).
+    """
+    if not settings.artifact_reuse or not it.media_sha256:
+        return None
+    _bump(lookups=1)
+    donors = session.exec(
+        select(Item)
+        .where(
+            Item.media_sha256 == it.media_sha256,
+            Item.id != it.id,
+            Item.media_type == it.media_type,
+            Item.status == "ready",
+        )
+        .order_by(Item.created_at.desc())
+        .limit(_MAX_CANDIDATES)
+    ).all()
+
+    for d in donors:
+        files = [(_abs(d.thumb_path), _abs(it.thumb_path))]
+        if it.media_type == "video":
+            files.append((_abs(d.poster_path), _abs(it.poster_path)))
+        files += [
+            (_abs(src), _abs(dst))
+            for src, dst in zip(rendition_rels(d.thumb_path, d.renditions), rendition_rels(it.thumb_path, d.renditions))
+        ]
+        if any(src is None or dst is None or not src.exists() for src, dst in files):
+            continue  # donor never got its thumb/poster (e.g. no ffmpeg), or lost them
+        try:
+            placed = [_place(src, dst) for src, dst in files]
+        except FileNotFoundError:
+            continue  # purged under us
+
+        it.media_phash = d.media_phash
+        it.renditions = d.renditions
+        session.exec(text("DELETE FROM item_embeddings WHERE item_id = :id"), params={"id": it.id})
+        session.exec(
+            text(
+                "INSERT INTO item_embeddings (item_id, model_key, dim, vector_blob, created_at)"
+                " SELECT :id, model_key, dim, vector_blob, :now FROM item_embeddings WHERE item_id = :donor"
+            ),
+            params={"id": it.id, "donor": d.id, "now": datetime.utcnow()},
+        )
+        keys = list(
+            session.exec(
+                text("SELECT model_key FROM item_embeddings WHERE item_id = :id"), params={"id": it.id}
+            ).scalars()
+        )
+        _bump(
+            hits=1,
+            files_linked=placed.count("linked"),
+            files_copied=placed.count("copied"),
+            embeddings_copied=len(keys),
+        )
+        return keys
+
+    _bump(misses=1)
+    return None
+
+
+def stats() -> dict:
+    with _lock:
+        out = dict(_stats)
+    out["enabled"] = bool(settings.artifact_reuse)
+    out["hit_rate"] = round(out["hits"] / out["lookups"], 4) if out["lookups"] else None
+    return out
@@ -5,13 +5,20 @@ from dataclasses import dataclass
 from typing import Optional, List, Dict, Tuple
 from datetime import datetime
 from pathlib import Path
-import math
 
+import numpy as np
+from sqlalchemy import func
 from sqlmodel import Session, select
 from app.models import Item, Category, ItemEmbedding
 from app.settings import settings
+from app.services import ref_cache, centroids
+from app.services.ref_cache import CategoryRef
+from app.services.classify import MODEL_KEY_DEFAULT
+from app.services.embeddings import unpack_f32
 
-from app.settings import settings
+
+# ids per IN (...) query; stays well below SQLite's bound-variable limit
+_IN_CHUNK = 500
 
 
 @dataclass
@@ -27,45 +34,17 @@ def _split_keywords(s: str) -> tuple[str, ...]:
     return tuple(x.strip().lower() for x in s.split(",") if x.strip())
 
 
-def _load_embedding(session: Session, item_id: str) -> Optional[List[float]]:
-    emb = session.exec(select(ItemEmbedding).where(ItemEmbedding.item_id == item_id)).first()
-    if not emb:
+def _load_embedding(session: Session, item_id: str, model_key: str = MODEL_KEY_DEFAULT) -> Optional[np.ndarray]:
+    emb = session.exec(
+        select(ItemEmbedding).where(ItemEmbedding.item_id == item_id, ItemEmbedding.model_key == model_key)
+    ).first()
+    if not emb or not emb.vector_blob:
         return None
-
-    blob = getattr(emb, "embedding_blob", None)
-    if blob is None:
-        blob = getattr(emb, "embedding", None)
-    if blob is None:
-        return None
-
     try:
-        import numpy as np
-        v = np.frombuffer(blob, dtype=np.float32)
-        if v.size == 0:
-            return None
-        return v.astype(float).tolist()
-    except Exception:
-        # no numpy: fallback
-        import struct
-        n = len(blob) // 4
-        if n <= 0:
-            return None
-        return list(struct.unpack("<" + "f" * n, blob[: n * 4]))
-
-
-def _cosine(a: List[float], b: List[float]) -> float:
-    # cosine similarity
-    dot = 0.0
-    na = 0.0
-    nb = 0.0
-    for i in range(min(len(a), len(b))):
-        x = float(a[i]); y = float(b[i])
-        dot += x * y
-        na += x * x
-        nb += y * y
-    if na <= 0.0 or nb <= 0.0:
-        return 0.0
-    return dot / (math.sqrt(na) * math.sqrt(nb))
+        v = unpack_f32(emb.vector_blob, emb.dim)
+    except ValueError:
+        return None
+    return v if v.size else None
 
 
 def _face_present_for_item(session: Session, item_id: str) -> bool:
@@ -126,134 +105,95 @@ def _normalize_text_for_match(s: str) -> str:
     return s.strip().lower()
 
 
-def _person_text_present(session: Session, item_id: str, person_text_keywords: tuple[str, ...]) -> bool:
+def _person_text_hits(session: Session, item_ids: List[str], person_text_keywords: tuple[str, ...]) -> set[str]:
     """
-    Cheap text hint: looks at item title, tags, prompt_blob, series name/base prompt.
-    Returns True if any PERSON_TEXT_KEYWORDS is present.
+    Cheap text hint for many items at once: looks at item title, tags, latest prompt_blob,
+    series name/base prompt. Returns the ids where any PERSON_TEXT_KEYWORDS is present.
     """
-    it = session.get(Item, item_id)
-    if not it:
-        return False
-
-    parts: list[str] = []
-
-    # title
-    if it.title:
-        parts.append(it.title)
-
-    # tags (stored in tag table; reuse your tag loader if exists, else best-effort)
-    try:
-        from app.routes.items import _load_item_tags  # if accessible
-        tags = _load_item_tags(session, it.id)
-        parts.extend(tags or [])
-    except Exception:
-        # ignore if circular import
-        pass
-
-    # prompt blob (current version)
-    try:
-        from app.models import ItemVersion
-        from sqlmodel import select
-        v = session.exec(
-            select(ItemVersion)
-            .where(ItemVersion.item_id == it.id)
-            .order_by(ItemVersion.v.desc())
-        ).first()
-        if v and v.prompt_blob:
-            parts.append(v.prompt_blob)
-    except Exception:
-        pass
-
-    # series name + base prompt (if any)
-    try:
-        if it.series_id:
-            from app.models import Series, SeriesVersion
-            srow = session.get(Series, it.series_id)
-            if srow and srow.name:
-                parts.append(srow.name)
-            if srow and srow.current_version_id:
-                sv = session.get(SeriesVersion, srow.current_version_id)
-                if sv and sv.base_prompt_blob:
-                    parts.append(sv.base_prompt_blob)
-    except Exception:
-        pass
-
-    blob = _normalize_text_for_match(" ".join(parts))
-    if not blob:
-        return False
+    from app.models import ItemTag, Tag, ItemVersion, Series, SeriesVersion
+
+    if not item_ids or not person_text_keywords:
+        return set()
+
+    hits: set[str] = set()
+    for i in range(0, len(item_ids), _IN_CHUNK):
+        chunk = item_ids[i : i + _IN_CHUNK]
+        parts: Dict[str, List[str]] = {iid: [] for iid in chunk}
+        series_of: Dict[str, str] = {}
+
+        for iid, title, sid in session.exec(
+            select(Item.id, Item.title, Item.series_id).where(Item.id.in_(chunk))
+        ).all():
+            if title:
+                parts[iid].append(title)
+            if sid:
+                series_of[iid] = sid
+
+        for iid, name in session.exec(
+            select(ItemTag.item_id, Tag.name).join(Tag, Tag.id == ItemTag.tag_id).where(ItemTag.item_id.in_(chunk))
+        ).all():
+            parts[iid].append(name)
+
+        # prompt blob of the latest version per item
+        latest = (
+            select(ItemVersion.item_id, func.max(ItemVersion.v).label("v"))
+            .where(ItemVersion.item_id.in_(chunk))
+            .group_by(ItemVersion.item_id)
+            .subquery()
+        )
+        for iid, blob in session.exec(
+            select(ItemVersion.item_id, ItemVersion.prompt_blob).join(
+                latest, (latest.c.item_id == ItemVersion.item_id) & (latest.c.v == ItemVersion.v)
+            )
+        ).all():
+            if blob:
+                parts[iid].append(blob)
+
+        # series name + base prompt (if any)
+        if series_of:
+            series_text: Dict[str, List[str]] = {}
+            for sid, name, base in session.exec(
+                select(Series.id, Series.name, SeriesVersion.base_prompt_blob)
+                .join(SeriesVersion, SeriesVersion.id == Series.current_version_id, isouter=True)
+                .where(Series.id.in_(set(series_of.values())))
+            ).all():
+                series_text[sid] = [x for x in (name, base) if x]
+            for iid, sid in series_of.items():
+                parts[iid].extend(series_text.get(sid, []))
+
+        for iid, ps in parts.items():
+            blob = _normalize_text_for_match(" ".join(ps))
+            if blob and any(kw in blob for kw in person_text_keywords):
+                hits.add(iid)
+
+    return hits
 
-    for kw in person_text_keywords:
-        if kw in blob:
-            return True
 
-    return False
+def _person_text_present(session: Session, item_id: str, person_text_keywords: tuple[str, ...]) -> bool:
+    return item_id in _person_text_hits(session, [item_id], person_text_keywords)
 
 
-def ensure_uncategorized(session: Session) -> Category:
+def ensure_uncategorized(session: Session) -> CategoryRef:
+    cached = ref_cache.get_category_by_name("未分类")
+    if cached:
+        return cached
     c = session.exec(select(Category).where(Category.name == "未分类")).first()
-    if c:
-        return c
-    # create on the fly (safe even if migration not seeded)
-    now = datetime.utcnow()
-    from app.util.ids import new_id  # same helper you used elsewhere
-    c = Category(
-        id=new_id(),
-        name="未分类",
-        sort_order=0,
-        is_active=True,
-        created_at=now,
-        updated_at=now,
-    )
-    session.add(c)
-    session.commit()
-    return c
-
-
-def _build_centroids(session: Session, include_deleted: bool) -> Dict[str, Tuple[str, List[float], int]]:
-    """
-    Returns {category_id: (category_name, centroid_vec, n_samples)} using existing labeled items.
-    """
-    cats = session.exec(select(Category).where(Category.is_active == True)).all()
-    cat_map = {c.id: c.name for c in cats if c.name != "未分类"}
-
-    sample_per_cat = settings.auto_cat_sample_per_cat
-    min_samples = settings.auto_cat_min_samples_per_cat
-
-    centroids: Dict[str, Tuple[str, List[float], int]] = {}
-    # for each category, collect sample embeddings from items already labeled with that category
-    for cid, cname in cat_map.items():
-        stmt = select(Item.id).where(Item.category_id == cid)
-        if not include_deleted:
-            stmt = stmt.where(Item.is_deleted == False)
-        stmt = stmt.order_by(Item.created_at.desc()).limit(sample_per_cat)
-        ids = session.exec(stmt).all()
-        ids = [r if isinstance(r, str) else r[0] for r in ids]
-
-        vecs = []
-        for iid in ids:
-            v = _load_embedding(session, iid)
-            if v is not None:
-                vecs.append(v)
-
-        if len(vecs) < min_samples:
-            continue
-
-        # centroid = mean
-        dim = len(vecs[0])
-        acc = [0.0] * dim
-        n = 0
-        for v in vecs:
-            if len(v) != dim:
-                continue
-            for i in range(dim):
-                acc[i] += float(v[i])
-            n += 1
-        if n < min_samples:
-            continue
-        centroid = [x / n for x in acc]
-        centroids[cid] = (cname, centroid, n)
-
-    return centroids
+    if not c:
+        # create on the fly (safe even if migration not seeded)
+        now = datetime.utcnow()
+        from app.util.ids import new_id  # same helper you used elsewhere
+        c = Category(
+            id=new_id(),
+            name="未分类",
+            sort_order=0,
+            is_active=True,
+            created_at=now,
+            updated_at=now,
+        )
+        session.add(c)
+        session.commit()
+        ref_cache.invalidate_categories()
+    return CategoryRef(id=c.id, name=c.name, sort_order=int(c.sort_order or 0), is_active=bool(c.is_active))
 
 
 def classify_item(
@@ -262,7 +202,8 @@ def classify_item(
     topk: Optional[int] = None,
     threshold: Optional[float] = None,
     include_deleted_for_prototypes: bool = True,
-) -> Tuple[Category, Optional[Candidate], List[Candidate]]:
+    model_key: str = MODEL_KEY_DEFAULT,
+) -> Tuple[CategoryRef, Optional[Candidate], List[Candidate]]:
     """
     Returns (uncategorized_category, best_candidate_or_None, topk_candidates).
     If no embedding/prototypes, candidates will be empty.
@@ -283,18 +224,19 @@ def classify_item(
 
     unc = ensure_uncategorized(session)
 
-    emb = _load_embedding(session, item_id)
+    emb = _load_embedding(session, item_id, model_key=model_key)
     if emb is None:
         return unc, None, []
 
-    centroids = _build_centroids(session, include_deleted=include_deleted_for_prototypes)
-    if not centroids:
+    cm = centroids.get_centroids(session, model_key, include_deleted=include_deleted_for_prototypes)
+    if cm.empty:
         return unc, None, []
 
-    cands: List[Candidate] = []
-    for cid, (cname, centroid, n) in centroids.items():
-        score = _cosine(emb, centroid)
-        cands.append(Candidate(category_id=cid, category_name=cname, score=float(score)))
+    scores = cm.score(emb)
+    cands: List[Candidate] = [
+        Candidate(category_id=cid, category_name=cname, score=float(sc))
+        for cid, cname, sc in zip(cm.category_ids, cm.category_names, scores)
+    ]
 
     cands.sort(key=lambda x: x.score, reverse=True)
     top = cands[: max(1, topk)]
@@ -326,6 +268,127 @@ def classify_item(
     return unc, best, top
 
 
+def _load_embedding_matrix(
+    session: Session,
+    item_ids: List[str],
+    model_key: str,
+    dim: int,
+) -> Tuple[List[str], np.ndarray]:
+    """
+    Stacks the embeddings of `item_ids` into one (n, dim) float32 matrix.
+    Items without an embedding (or with another dim) are left out.
+    """
+    ids: List[str] = []
+    blobs: List[bytes] = []
+    for i in range(0, len(item_ids), _IN_CHUNK):
+        chunk = item_ids[i : i + _IN_CHUNK]
+        for iid, d, blob in session.exec(
+            select(ItemEmbedding.item_id, ItemEmbedding.dim, ItemEmbedding.vector_blob).where(
+                ItemEmbedding.model_key == model_key, ItemEmbedding.item_id.in_(chunk)
+            )
+        ).all():
+            if blob and int(d) == dim and len(blob) == dim * 4:
+                ids.append(iid)
+                blobs.append(blob)
+    if not ids:
+        return [], np.zeros((0, dim), dtype=np.float32)
+    return ids, np.frombuffer(b"".join(blobs), dtype=np.float32).reshape(len(ids), dim)
+
+
+def _face_detector_available() -> bool:
+    try:
+        import cv2  # type: ignore  # noqa: F401
+    except Exception:
+        return False
+    return True
+
+
+def classify_items_batch(
+    session: Session,
+    item_ids: List[str],
+    topk: Optional[int] = None,
+    threshold: Optional[float] = None,
+    include_deleted_for_prototypes: bool = True,
+    model_key: str = MODEL_KEY_DEFAULT,
+    chunk_size: int = 8192,
+) -> Tuple[CategoryRef, Dict[str, Tuple[Optional[Candidate], List[Candidate]]]]:
+    """
+    Same scoring as classify_item, for many items:
+    centroids are fetched once, embeddings are stacked chunk_size rows at a time and
+    scored with one matmul per chunk; text/face hints only run for items near the threshold.
+
+    Returns (uncategorized_category, {item_id: (best_or_None, topk_candidates)}).
+    Items without an embedding are absent from the dict.
+    """
+    if topk is None:
+        topk = int(settings.auto_cat_topk)
+    if threshold is None:
+        threshold = float(settings.auto_cat_threshold)
+    topk = max(1, int(topk))
+
+    face_keywords = _split_keywords(settings.auto_cat_face_keywords)
+    person_text_keywords = _split_keywords(settings.auto_cat_person_text_keywords)
+
+    face_boost = float(settings.auto_cat_face_boost)
+    face_band = float(settings.auto_cat_face_near_band)
+
+    text_boost = float(settings.auto_cat_text_boost)
+    text_band = float(settings.auto_cat_text_near_band)
+
+    unc = ensure_uncategorized(session)
+    out: Dict[str, Tuple[Optional[Candidate], List[Candidate]]] = {}
+
+    cm = centroids.get_centroids(session, model_key, include_deleted=include_deleted_for_prototypes)
+    if cm.empty or not item_ids:
+        return unc, out
+
+    dim = int(cm.matrix.shape[1])
+    # categories that receive the text/face boost (name matches face_keywords)
+    boostable = np.array(
+        [any(k in (name or "").lower() for k in face_keywords) for name in cm.category_names],
+        dtype=bool,
+    )
+    can_boost = bool(boostable.any())
+    face_ok = can_boost and _face_detector_available()
+
+    for start in range(0, len(item_ids), chunk_size):
+        ids, m = _load_embedding_matrix(session, item_ids[start : start + chunk_size], model_key, dim)
+        if not ids:
+            continue
+        scores = cm.score_many(m)
+
+        if can_boost:
+            # ---- text hint boost ----
+            near = np.flatnonzero(scores.max(axis=1) < (threshold + text_band))
+            if near.size:
+                hits = _person_text_hits(session, [ids[i] for i in near], person_text_keywords)
+                rows = np.array([i for i in near if ids[i] in hits], dtype=np.int64)
+                if rows.size:
+                    sub = scores[np.ix_(rows, np.flatnonzero(boostable))]
+                    scores[np.ix_(rows, np.flatnonzero(boostable))] = np.minimum(1.0, sub + text_boost)
+
+            # ---- face hint boost ----
+            if face_ok:
+                for i in np.flatnonzero(scores.max(axis=1) < (threshold + face_band)):
+                    if _face_present_for_item(session, ids[i]):
+                        scores[i, boostable] = np.minimum(1.0, scores[i, boostable] + face_boost)
+
+        # stable descending order, same tie-breaking as list.sort(reverse=True)
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :topk]
+        for i, iid in enumerate(ids):
+            top = [
+                Candidate(
+                    category_id=cm.category_ids[j],
+                    category_name=cm.category_names[j],
+                    score=float(scores[i, j]),
+                )
+                for j in order[i]
+            ]
+            out[iid] = (top[0] if top else None, top)
+
+    return unc, out
+
+
 def serialize_candidates(cands: List[Candidate]) -> str:
     return json.dumps(
         [{"category_id": c.category_id, "category_name": c.category_name, "score": c.score} for c in cands],
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.models import Item, ItemEmbedding
+from app.settings import settings
+from app.services import ref_cache
+
+
+UNCATEGORIZED_NAME = "未分类"
+
+
+# Category prototypes (centroids) for auto-category, kept in memory per
+# (model_key, include_deleted) and refreshed per category:
+#   - the first request loads every category with one windowed query
+#   - writes that change an item's category / embedding / deletion state call
+#     invalidate_categories(); only those categories are reloaded next time
+#   - scoring is a single (k, d) @ (d,) product against L2-normalized rows
+
+
+@dataclass
+class CentroidMatrix:
+    category_ids: List[str]
+    category_names: List[str]
+    counts: np.ndarray  # (k,) samples behind each centroid
+    matrix: np.ndarray  # (k, d) float32, rows L2-normalized
+
+    @property
+    def empty(self) -> bool:
+        return len(self.category_ids) == 0
+
+    def score(self, vec: np.ndarray) -> np.ndarray:
+        """
+        Cosine similarity of one vector against every centroid.
+        """
+        v = np.asarray(vec, dtype=np.float32).reshape(-1)
+        if self.empty or v.shape[0] != self.matrix.shape[1]:
+            return np.zeros((len(self.category_ids),), dtype=np.float32)
+        n = float(np.linalg.norm(v))
+        if n <= 0.0:
+            return np.zeros((len(self.category_ids),), dtype=np.float32)
+        return self.matrix @ (v / n)
+
+    def score_many(self, vecs: np.ndarray) -> np.ndarray:
+        """
+        Cosine similarity of (n, d) vectors against every centroid -> (n, k).
+        """
+        m = np.asarray(vecs, dtype=np.float32)
+        if self.empty or m.ndim != 2 or m.shape[1] != self.matrix.shape[1]:
+            return np.zeros((m.shape[0] if m.ndim == 2 else 0, len(self.category_ids)), dtype=np.float32)
+        norms = np.linalg.norm(m, axis=1, keepdims=True)
+        norms[norms <= 0.0] = 1.0
+        return (m / norms) @ self.matrix.T
+
+
+_EMPTY = CentroidMatrix(category_ids=[], category_names=[], counts=np.zeros((0,)), matrix=np.zeros((0, 0), np.float32))
+
+
+@dataclass
+class _CentroidState:
+    rows: Dict[str, Tuple[np.ndarray, int]] = field(default_factory=dict)  # cid -> (mean vec, n)
+    loaded: Set[str] = field(default_factory=set)
+    dirty: Set[str] = field(default_factory=set)
+    matrix: Optional[CentroidMatrix] = None
+    matrix_key: Optional[tuple] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+_states: Dict[Tuple[str, bool], _CentroidState] = {}
+_states_lock = threading.Lock()
+
+_stats = {"builds": 0, "category_loads": 0, "invalidations": 0}
+
+
+def _state(model_key: str, include_deleted: bool) -> _CentroidState:
+    key = (model_key, bool(include_deleted))
+    with _states_lock:
+        st = _states.get(key)
+        if st is None:
+            st = _states[key] = _CentroidState()
+        return st
+
+
+def _load_rows(
+    session: Session,
+    model_key: str,
+    include_deleted: bool,
+    category_ids: List[str],
+) -> Dict[str, Tuple[np.ndarray, int]]:
+    """
+    Mean embedding of the newest `auto_cat_sample_per_cat` embedded items per category,
+    for all requested categories in one query.
+    """
+    if not category_ids:
+        return {}
+
+    rn = func.row_number().over(
+        partition_by=Item.category_id,
+        order_by=(Item.created_at.desc(), Item.id.desc()),
+    ).label("rn")
+    inner = (
+        select(Item.category_id, ItemEmbedding.dim, ItemEmbedding.vector_blob, rn)
+        .join(ItemEmbedding, (ItemEmbedding.item_id == Item.id) & (ItemEmbedding.model_key == model_key))
+        .where(Item.category_id.in_(category_ids))
+    )
+    if not include_deleted:
+        inner = inner.where(Item.is_deleted == False)
+    sub = inner.subquery()
+    stmt = select(sub.c.category_id, sub.c.dim, sub.c.vector_blob).where(
+        sub.c.rn <= int(settings.auto_cat_sample_per_cat)
+    )
+
+    blobs: Dict[str, List[bytes]] = {}
+    dims: Dict[str, int] = {}
+    for cid, dim, blob in session.exec(stmt).all():
+        if not blob:
+            continue
+        # keep the dim of the first (newest) vector, skip mismatches
+        if dims.setdefault(cid, int(dim)) != int(dim):
+            continue
+        blobs.setdefault(cid, []).append(blob)
+
+    out: Dict[str, Tuple[np.ndarray, int]] = {}
+    for cid, bl in blobs.items():
+        dim = dims[cid]
+        buf = np.frombuffer(b"".join(bl), dtype=np.float32)
+        if dim <= 0 or buf.shape[0] != dim * len(bl):
+            continue
+        m = buf.reshape(len(bl), dim)
+        out[cid] = (m.mean(axis=0, dtype=np.float64).astype(np.float32), len(bl))
+    return out
+
+
+def _assemble(st: _CentroidState, cats: List[Tuple[str, str]]) -> CentroidMatrix:
+    min_samples = int(settings.auto_cat_min_samples_per_cat)
+    ids: List[str] = []
+    names: List[str] = []
+    counts: List[int] = []
+    vecs: List[np.ndarray] = []
+    dim = None
+    for cid, cname in cats:
+        row = st.rows.get(cid)
+        if row is None or row[1] < min_samples:
+            continue
+        vec, n = row
+        if dim is None:
+            dim = vec.shape[0]
+        if vec.shape[0] != dim:
+            continue
+        ids.append(cid)
+        names.append(cname)
+        counts.append(n)
+        vecs.append(vec)
+    if not ids:
+        return _EMPTY
+
+    m = np.stack(vecs).astype(np.float32)
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms <= 0.0] = 1.0
+    return CentroidMatrix(category_ids=ids, category_names=names, counts=np.asarray(counts), matrix=m / norms)
+
+
+def get_centroids(session: Session, model_key: str, include_deleted: bool = True) -> CentroidMatrix:
+    """
+    Current centroid matrix for active categories (excluding "未分类").
+    Reloads only categories that were invalidated (or never loaded).
+    """
+    cats = [
+        (c.id, c.name)
+        for c in ref_cache.list_categories(active_only=True)
+        if c.name != UNCATEGORIZED_NAME
+    ]
+    st = _state(model_key, include_deleted)
+    with st.lock:
+        stale = [cid for cid, _ in cats if cid in st.dirty or cid not in st.loaded]
+        if stale:
+            fresh = _load_rows(session, model_key, include_deleted, stale)
+            for cid in stale:
+                if cid in fresh:
+                    st.rows[cid] = fresh[cid]
+                else:
+                    st.rows.pop(cid, None)
+                st.loaded.add(cid)
+                st.dirty.discard(cid)
+            st.matrix = None
+            _stats["category_loads"] += len(stale)
+
+        key = tuple(cats)
+        if st.matrix is None or st.matrix_key != key:
+            st.matrix = _assemble(st, cats)
+            st.matrix_key = key
+            _stats["builds"] += 1
+        return st.matrix
+
+
+def invalidate_categories(category_ids: Iterable[Optional[str]]) -> None:
+    """
+    Mark categories whose membership/embeddings changed; they are reloaded lazily.
+    """
+    ids = {c for c in category_ids if c}
+    if not ids:
+        return
+    with _states_lock:
+        states = list(_states.values())
+    for st in states:
+        with st.lock:
+            st.dirty |= ids
+    _stats["invalidations"] += 1
+
+
+def invalidate_all() -> None:
+    with _states_lock:
+        _states.clear()
+    _stats["invalidations"] += 1
+
+
+def stats() -> dict:
+    with _states_lock:
+        states = {f"{k[0]}|include_deleted={int(k[1])}": v for k, v in _states.items()}
+    return {
+        **_stats,
+        "indexes": {
+            k: {
+                "categories": (len(st.matrix.category_ids) if st.matrix is not None else None),
+                "dirty": len(st.dirty),
+            }
+            for k, st in states.items()
+        },
+    }
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import threading
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional, List, Tuple
@@ -8,6 +9,7 @@ import numpy as np
 from sqlmodel import Session, select
 
 from app.models import Category, CategoryEmbedding, ItemEmbedding
+from app.settings import settings
 from app.services.embeddings import pack_f32, unpack_f32, cosine
 
 
@@ -47,14 +49,24 @@ def _open_clip_available() -> bool:
 
 # Lazy singleton cache to avoid reloading model for each request
 _CLIP = {"ready": False, "model": None, "preprocess": None, "tokenizer": None, "device": None}
+_CLIP_LOCK = threading.Lock()
 
 
 def _ensure_clip_loaded():
     if _CLIP["ready"]:
         return
+    with _CLIP_LOCK:
+        if not _CLIP["ready"]:
+            _load_clip()
+
+
+def _load_clip():
     import torch
     import open_clip
 
+    if settings.clip_torch_threads > 0:
+        torch.set_num_threads(int(settings.clip_torch_threads))
+
     device = "cpu"
     model_name = "ViT-B-32"
     pretrained = "laion2b_s34b_b79k"
@@ -66,11 +78,11 @@ def _ensure_clip_loaded():
 
     model.eval()
 
-    _CLIP["ready"] = True
     _CLIP["model"] = model
     _CLIP["preprocess"] = preprocess
     _CLIP["tokenizer"] = tokenizer
     _CLIP["device"] = device
+    _CLIP["ready"] = True
 
 
 def _encode_texts(texts: List[str]) -> np.ndarray:
@@ -87,20 +99,36 @@ def _encode_texts(texts: List[str]) -> np.ndarray:
     return feats.cpu().numpy().astype(np.float32)
 
 
-def _encode_image(image_path: Path) -> np.ndarray:
-    import torch
+def _preprocess_image(image_path: Path):
+    """
+    Decode + CLIP preprocess one image -> (3, H, W) tensor. Safe to call from worker threads.
+    """
     from PIL import Image
     _ensure_clip_loaded()
+    with Image.open(image_path) as im:
+        return _CLIP["preprocess"](im.convert("RGB"))
+
+
+def _encode_image_batch(tensors: list) -> np.ndarray:
+    """
+    One forward pass for a list of preprocessed tensors -> (n, d) L2-normalized float32.
+    """
+    import torch
+    _ensure_clip_loaded()
     model = _CLIP["model"]
-    preprocess = _CLIP["preprocess"]
     device = _CLIP["device"]
 
-    im = Image.open(image_path).convert("RGB")
-    x = preprocess(im).unsqueeze(0).to(device)
+    x = torch.stack(tensors).to(device)
     with torch.no_grad():
         feats = model.encode_image(x)
         feats = feats / feats.norm(dim=-1, keepdim=True)
-    return feats.cpu().numpy().astype(np.float32).reshape(-1)
+    return feats.cpu().numpy().astype(np.float32)
+
+
+def _encode_image(image_path: Path) -> np.ndarray:
+    # goes through the shared batcher so concurrent uploads share forward passes
+    from app.services import clip_batcher
+    return clip_batcher.encode_image(image_path)
 
 
 def ensure_category_embeddings(session: Session, model_key: str = MODEL_KEY_DEFAULT) -> None:
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.settings import settings
+
+
+# Batched CLIP image encoder shared by uploads and backfills.
+#
+# Callers enqueue image paths and get Futures back. One daemon thread drains the
+# queue: it waits up to clip_batch_wait_ms for a batch to fill to clip_batch_size,
+# decodes + preprocesses the images on a small thread pool, then runs them through
+# model.encode_image in a single forward pass. A failing image only fails its own
+# Future.
+
+
+_queue: "queue.Queue[tuple[Path, Future]]" = queue.Queue()
+_worker: Optional[threading.Thread] = None
+_pool: Optional[ThreadPoolExecutor] = None
+_start_lock = threading.Lock()
+
+_stats = {
+    "images": 0,
+    "failed": 0,
+    "batches": 0,
+    "max_batch": 0,
+    "encode_sec": 0.0,
+    "preprocess_sec": 0.0,
+}
+
+
+def _ensure_worker() -> None:
+    global _worker, _pool
+    if _worker is not None and _worker.is_alive():
+        return
+    with _start_lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=max(1, int(settings.clip_preprocess_workers)),
+                thread_name_prefix="clip-preprocess",
+            )
+        _worker = threading.Thread(target=_run, name="clip-batcher", daemon=True)
+        _worker.start()
+
+
+def _next_batch() -> List[tuple[Path, Future]]:
+    batch = [_queue.get()]
+    max_n = max(1, int(settings.clip_batch_size))
+    deadline = time.monotonic() + max(0, int(settings.clip_batch_wait_ms)) / 1000.0
+    while len(batch) < max_n:
+        remaining = deadline - time.monotonic()
+        try:
+            batch.append(_queue.get(timeout=remaining) if remaining > 0 else _queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _run() -> None:
+    while True:
+        batch = _next_batch()
+        try:
+            _process(batch)
+        except Exception as e:  # never let the worker die
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+
+
+def _process(batch: List[tuple[Path, Future]]) -> None:
+    from app.services.classify import _preprocess_image, _encode_image_batch
+
+    t0 = time.perf_counter()
+    pending = [(p, fut) for p, fut in batch if fut.set_running_or_notify_cancel()]
+    loaded = [_pool.submit(_preprocess_image, p) for p, _ in pending]
+
+    ok_futs: List[Future] = []
+    tensors = []
+    for (p, fut), job in zip(pending, loaded):
+        try:
+            tensors.append(job.result())
+            ok_futs.append(fut)
+        except Exception as e:
+            _stats["failed"] += 1
+            fut.set_exception(e)
+    t1 = time.perf_counter()
+    _stats["preprocess_sec"] += t1 - t0
+
+    if not tensors:
+        return
+    try:
+        vecs = _encode_image_batch(tensors)
+    except Exception as e:
+        _stats["failed"] += len(ok_futs)
+        for fut in ok_futs:
+            fut.set_exception(e)
+        return
+
+    _stats["encode_sec"] += time.perf_counter() - t1
+    _stats["batches"] += 1
+    _stats["images"] += len(ok_futs)
+    _stats["max_batch"] = max(_stats["max_batch"], len(ok_futs))
+    for fut, v in zip(ok_futs, vecs):
+        fut.set_result(v.reshape(-1))
+
+
+def submit(paths: Sequence[Path]) -> List[Future]:
+    """
+    Enqueue images for encoding. Each Future resolves to a (d,) float32 vector.
+    """
+    _ensure_worker()
+    futs: List[Future] = []
+    for p in paths:
+        fut: Future = Future()
+        _queue.put((Path(p), fut))
+        futs.append(fut)
+    return futs
+
+
+def encode_image(image_path: Path) -> np.ndarray:
+    """
+    Encode one image (blocking); shares forward passes with concurrent callers.
+    """
+    return submit([image_path])[0].result()
+
+
+def encode_images(paths: Sequence[Path]) -> List[Optional[np.ndarray]]:
+    """
+    Encode many images (blocking). Failed images come back as None.
+    """
+    out: List[Optional[np.ndarray]] = []
+    for fut in submit(paths):
+        try:
+            out.append(fut.result())
+        except Exception:
+            out.append(None)
+    return out
+
+
+def stats() -> dict:
+    n = _stats["images"]
+    return {
+        **_stats,
+        "queued": _queue.qsize(),
+        "avg_batch": (round(n / _stats["batches"], 2) if _stats["batches"] else None),
+        "encode_images_per_sec": (round(n / _stats["encode_sec"], 1) if _stats["encode_sec"] > 0 else None),
+        "batch_size": int(settings.clip_batch_size),
+        "torch_threads": int(settings.clip_torch_threads),
+    }
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from app.settings import settings
+
+
+# Cached "does this storage file exist" answers for listing pages (GET /items/duplicates).
+#
+# Only hits are cached (FILE_STAT_TTL_SEC, LRU of FILE_STAT_CACHE_SIZE paths): a missing
+# file is stat'ed again on every call, so a thumbnail regenerated after the fact shows up
+# right away. Deletes through the app (storage.safe_unlink, the purge engine) forget their
+# paths; files removed behind the app's back are noticed once their entry expires.
+#
+# Keys are storage-relative posix paths, as stored on items.
+
+_cache: "OrderedDict[str, float]" = OrderedDict()  # rel -> checked at (monotonic)
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stats": 0, "evictions": 0, "forgets": 0}
+
+
+def _root() -> str:
+    return os.path.realpath(settings.storage_root)
+
+
+def _norm(rel: Optional[str]) -> Optional[str]:
+    rel = (rel or "").replace("\\", "/").lstrip("/")
+    if not rel:
+        return None
+    rel = os.path.normpath(rel).replace("\\", "/")
+    if rel == ".." or rel.startswith("../"):
+        return None  # never answer for paths outside the storage root
+    return rel
+
+
+def exists_many(rels: Iterable[Optional[str]]) -> Dict[str, bool]:
+    """
+    {rel: exists} for the given storage-relative paths (empty / invalid ones map to False).
+    """
+    ttl = float(settings.file_stat_ttl_sec)
+    cap = int(settings.file_stat_cache_size)
+    now = time.monotonic()
+    out: Dict[str, bool] = {}
+    todo: Dict[str, str] = {}
+    with _lock:
+        for raw in rels:
+            if raw is None or raw in out or raw in todo:
+                continue
+            rel = _norm(raw)
+            if rel is None:
+                out[raw] = False
+                continue
+            at = _cache.get(rel)
+            if at is not None and now - at < ttl:
+                _cache.move_to_end(rel)
+                _stats["hits"] += 1
+                out[raw] = True
+            else:
+                _stats["misses"] += 1
+                todo[raw] = rel
+    if not todo:
+        return out
+
+    root = _root()
+    found = []
+    for raw, rel in todo.items():
+        ok = os.path.exists(os.path.join(root, rel))
+        out[raw] = ok
+        if ok:
+            found.append(rel)
+    with _lock:
+        _stats["stats"] += len(todo)
+        if ttl > 0 and cap > 0:
+            for rel in found:
+                _cache[rel] = now
+                _cache.move_to_end(rel)
+            while len(_cache) > cap:
+                _cache.popitem(last=False)
+                _stats["evictions"] += 1
+    return out
+
+
+def forget(rels: Iterable[Optional[str]]) -> None:
+    with _lock:
+        for raw in rels:
+            rel = _norm(raw)
+            if rel is not None and _cache.pop(rel, None) is not None:
+                _stats["forgets"] += 1
+
+
+def forget_path(p: Optional[Path]) -> None:
+    # absolute path under the storage root -> forget its relative key
+    if not p:
+        return
+    try:
+        rel = os.path.relpath(os.path.realpath(p), _root())
+    except ValueError:
+        return
+    forget([rel])
+
+
+def clear() -> None:
+    with _lock:
+        _cache.clear()
+
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "size": len(_cache), "ttl_sec": float(settings.file_stat_ttl_sec)}
@@ -1,10 +1,30 @@
 from __future__ import annotations
 
-from typing import Optional, Tuple, List
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple, List, Dict
 from sqlalchemy import text
-from sqlmodel import Session, select
+from sqlmodel import Session
 
-from app.models import Item, ItemVersion, ItemTag, Tag
+from app.settings import settings
+
+# items_fts is an external-content FTS5 table over items_fts_docs, kept in sync with
+# items / item_versions / item_tags / tags by triggers (migration 20261016_02).
+#
+# Since 20261016_03 it uses the trigram tokenizer: a query of 3+ characters is a
+# substring match served by the index (CJK included, no word segmentation needed).
+# Trigrams cannot match shorter queries, so those scan items_fts_docs (one table, no
+# joins). The LIKE join fallback in routes/items.py is only used without a usable index.
+
+# how q searches were served (reported in /_maintenance/diag)
+_search_stats = {
+    "fts": 0,          # MATCH on items_fts
+    "short_scan": 0,   # < 3 characters: LIKE over items_fts_docs
+    "like_fallback": 0,  # caller fell back to the LIKE join over items/versions/tags
+    "errors": 0,
+}
+
+TRIGRAM_MIN_CHARS = 3
 
 
 def _fts_phrase(q: str) -> str:
@@ -14,93 +34,168 @@ def _fts_phrase(q: str) -> str:
 
 
 def _fts_available(session: Session) -> bool:
+    return fts_tokenizer(session) is not None
+
+
+def fts_tokenizer(session: Session) -> Optional[str]:
+    """
+    'trigram' / 'unicode61' for the current items_fts, None when there is no FTS table.
+    """
     try:
         row = session.exec(
-            text("SELECT name FROM sqlite_master WHERE type='table' AND name='items_fts' LIMIT 1")
+            text("SELECT sql FROM sqlite_master WHERE type='table' AND name='items_fts' LIMIT 1")
         ).first()
-        return bool(row)
     except Exception:
-        return False
+        return None
+    if not row:
+        return None
+    return "trigram" if "trigram" in (row[0] or "").lower() else "unicode61"
 
 
-def fts_upsert_item(session: Session, item_id: str) -> None:
-    if not _fts_available(session):
-        return
+def _like_pattern(q: str) -> str:
+    q = (q or "").strip()
+    q = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{q}%"
 
-    it = session.get(Item, item_id)
-    if not it:
-        return
 
-    v = None
-    if it.current_version_id:
-        v = session.get(ItemVersion, it.current_version_id)
-    if not v:
-        v = session.exec(
-            select(ItemVersion).where(ItemVersion.item_id == it.id).order_by(ItemVersion.v.desc())
-        ).first()
+def record_like_fallback() -> None:
+    _search_stats["like_fallback"] += 1
 
-    prompt = v.prompt_blob if v else ""
 
-    tag_ids = [r.tag_id for r in session.exec(select(ItemTag).where(ItemTag.item_id == it.id)).all()]
-    tags = []
-    if tag_ids:
-        tags = [t.name for t in session.exec(select(Tag).where(Tag.id.in_(tag_ids))).all()]
-    tags_text = " ".join(sorted(set(tags)))
+def search_stats() -> dict:
+    served = _search_stats["fts"] + _search_stats["short_scan"] + _search_stats["like_fallback"]
+    return {
+        **_search_stats,
+        "like_fallback_ratio": (round(_search_stats["like_fallback"] / served, 4) if served else None),
+    }
 
-    title = it.title or ""
-    series = it.series_name_snapshot or ""
 
-    try:
-        session.exec(text("DELETE FROM items_fts WHERE item_id = :item_id"), {"item_id": it.id})
-        session.exec(
-            text(
-                "INSERT INTO items_fts(item_id, title, series, prompt, tags) "
-                "VALUES (:item_id, :title, :series, :prompt, :tags)"
-            ),
-            {"item_id": it.id, "title": title, "series": series, "prompt": prompt, "tags": tags_text},
-        )
-        session.commit()
-    except Exception:
-        # do not break core flows
-        session.rollback()
+_UPSERT_DOCS_RANGE = text(
+    "INSERT INTO items_fts_docs (item_id, title, series, prompt, tags) "
+    "SELECT item_id, title, series, prompt, tags FROM items_fts_source "
+    "WHERE item_id IN (SELECT id FROM items WHERE rowid > :lo AND rowid <= :hi) "
+    "ON CONFLICT(item_id) DO UPDATE SET "
+    "title = excluded.title, series = excluded.series, prompt = excluded.prompt, tags = excluded.tags "
+    "WHERE title IS NOT excluded.title OR series IS NOT excluded.series "
+    "OR prompt IS NOT excluded.prompt OR tags IS NOT excluded.tags"
+)
 
 
-def fts_delete_item(session: Session, item_id: str) -> None:
-    if not _fts_available(session):
+# UPDATE ... FROM (SQLite >= 3.33) is several times faster than the per-row upsert for
+# a whole batch; documents missing altogether are inserted separately
+_SYNC_PENDING_DOCS = (
+    text(
+        "UPDATE items_fts_docs SET title = s.title, series = s.series, prompt = s.prompt, tags = s.tags "
+        "FROM items_fts_source s "
+        "WHERE s.item_id = items_fts_docs.item_id "
+        "AND items_fts_docs.item_id IN (SELECT item_id FROM items_fts_pending) "
+        "AND (items_fts_docs.title IS NOT s.title OR items_fts_docs.series IS NOT s.series "
+        "OR items_fts_docs.prompt IS NOT s.prompt OR items_fts_docs.tags IS NOT s.tags)"
+    ),
+    text(
+        "INSERT INTO items_fts_docs (item_id, title, series, prompt, tags) "
+        "SELECT item_id, title, series, prompt, tags FROM items_fts_source "
+        "WHERE item_id IN (SELECT item_id FROM items_fts_pending) "
+        "AND item_id NOT IN (SELECT item_id FROM items_fts_docs)"
+    ),
+)
+
+
+def _deferral_available(session: Session) -> bool:
+    row = session.exec(
+        text("SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name IN ('items_fts_defer', 'items_fts_pending')")
+    ).one()
+    return int(row[0]) == 2
+
+
+@contextmanager
+def deferred_sync(session: Session) -> Iterator[None]:
+    """
+    Batch the FTS document maintenance of a bulk write (migration 20261017_01).
+
+    Inside the block, item_tags inserts/deletes and items title/series updates only
+    record the item; on exit every recorded document is recomputed with one statement.
+    Use within a single write transaction and commit after the block (on error, roll
+    back: the flag row must never be committed).
+    """
+    if not _deferral_available(session):
+        yield
         return
-    try:
-        session.exec(text("DELETE FROM items_fts WHERE item_id = :item_id"), {"item_id": item_id})
-        session.commit()
-    except Exception:
-        session.rollback()
+    session.exec(text("INSERT OR IGNORE INTO items_fts_defer (id) VALUES (1)"))
+    yield
+    session.exec(text("DELETE FROM items_fts_defer"))
+    for stmt in _SYNC_PENDING_DOCS:
+        session.exec(stmt)
+    session.exec(text("DELETE FROM items_fts_pending"))
 
 
-def fts_rebuild_all(session: Session) -> int:
+def fts_rebuild_all(session: Session, chunk_size: Optional[int] = None, reindex: bool = False) -> dict:
+    """
+    Set-based FTS rebuild (normal writes never need this: triggers keep items_fts in sync).
+
+      1. documents: one INSERT ... SELECT FROM items_fts_source per items.rowid range of
+         `chunk_size`, each in its own transaction; unchanged documents are skipped, the
+         triggers index new / changed ones
+      2. drop documents of items that no longer exist
+      3. reindex=True: also rebuild the FTS index from the documents ('rebuild'), to repair it
+      4. FTS5 'optimize' (merge index segments)
+    """
     if not _fts_available(session):
-        return 0
+        return {"documents": 0, "changed": 0, "removed": 0, "chunks": 0, "seconds": 0.0, "rows_per_sec": None}
 
+    chunk = max(1, int(chunk_size or settings.fts_rebuild_chunk_size))
+    t0 = time.perf_counter()
+    phases: Dict[str, float] = {}
+    changed = chunks = 0
     try:
-        session.exec(text("DELETE FROM items_fts"))
+        if _deferral_available(session):
+            # a stray deferral flag would leave every later write unindexed
+            session.exec(text("DELETE FROM items_fts_defer"))
+            session.exec(text("DELETE FROM items_fts_pending"))
+            session.commit()
+        max_rowid = session.exec(text("SELECT COALESCE(MAX(rowid), 0) FROM items")).one()[0]
+        session.rollback()  # don't hold a read snapshot across the chunk commits
+        lo = 0
+        while lo < max_rowid:
+            res = session.exec(_UPSERT_DOCS_RANGE, params={"lo": lo, "hi": lo + chunk})
+            changed += int(res.rowcount or 0)
+            session.commit()
+            chunks += 1
+            lo += chunk
+        phases["documents"] = time.perf_counter() - t0
+
+        t = time.perf_counter()
+        res = session.exec(text("DELETE FROM items_fts_docs WHERE item_id NOT IN (SELECT id FROM items)"))
+        removed = int(res.rowcount or 0)
         session.commit()
+        phases["cleanup"] = time.perf_counter() - t
+
+        if reindex:
+            t = time.perf_counter()
+            session.exec(text("INSERT INTO items_fts (items_fts) VALUES ('rebuild')"))
+            session.commit()
+            phases["reindex"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        session.exec(text("INSERT INTO items_fts (items_fts) VALUES ('optimize')"))
+        session.commit()
+        phases["optimize"] = time.perf_counter() - t
+
+        n = int(session.exec(text("SELECT COUNT(*) FROM items_fts_docs")).one()[0])
     except Exception:
         session.rollback()
-        return 0
-
-    raw = session.exec(select(Item.id)).all()
-    ids = []
-    for r in raw:
-        if r is None:
-            continue
-        if isinstance(r, (tuple, list)):
-            ids.append(r[0])
-        else:
-            ids.append(r)
+        raise
 
-    n = 0
-    for iid in ids:
-        fts_upsert_item(session, iid)
-        n += 1
-    return n
+    dt = time.perf_counter() - t0
+    return {
+        "documents": n,
+        "changed": changed,
+        "removed": removed,
+        "chunks": chunks,
+        "seconds": round(dt, 3),
+        "rows_per_sec": (round(n / dt, 1) if dt > 0 else None),
+        "phases_sec": {k: round(v, 3) for k, v in phases.items()},
+    }
 
 
 def fts_search_ids_join_items(
@@ -110,10 +205,20 @@ def fts_search_ids_join_items(
     params: dict,
     limit: int,
     offset: int,
-) -> Tuple[int, List[str]]:
-    if not _fts_available(session):
-        # no FTS => caller should fall back; return empty
-        return 0, []
+) -> Optional[Tuple[int, List[str]]]:
+    """
+    (total, page of item ids) for q, or None when the index cannot answer and the caller
+    has to fall back to its LIKE join (no FTS table, or a unicode61 index without hits).
+
+    With the trigram index the result is final, even when empty: it has the same
+    substring semantics as the LIKE fallback.
+    """
+    tokenizer = fts_tokenizer(session)
+    if tokenizer is None:
+        return None
+
+    if tokenizer == "trigram" and len((q or "").strip()) < TRIGRAM_MIN_CHARS:
+        return _docs_scan(session, q, filters_sql, params, limit, offset)
 
     match = _fts_phrase(q)
 
@@ -128,7 +233,7 @@ def fts_search_ids_join_items(
     try:
         count_sql = "SELECT COUNT(*) " + base
         # .one() returns a Row (tuple-like), take first element
-        total = session.exec(text(count_sql), {"m": match, **params}).one()[0]
+        total = session.exec(text(count_sql), params={"m": match, **params}).one()[0]
 
         ids_sql = (
             "SELECT items.id "
@@ -136,9 +241,81 @@ def fts_search_ids_join_items(
             + " ORDER BY bm25(items_fts) ASC, items.created_at DESC "
             + " LIMIT :lim OFFSET :off"
         )
-        rows = session.exec(text(ids_sql), {"m": match, **params, "lim": limit, "off": offset}).all()
+        rows = session.exec(text(ids_sql), params={"m": match, **params, "lim": limit, "off": offset}).all()
         ids = [r[0] for r in rows]
-        return int(total), ids
     except Exception:
         session.rollback()
-        return 0, []
+        _search_stats["errors"] += 1
+        return None
+
+    if tokenizer != "trigram" and not total:
+        # unicode61 only matches whole tokens; let the caller try substrings
+        return None
+    _search_stats["fts"] += 1
+    return int(total), ids
+
+
+def _docs_scan(
+    session: Session,
+    q: str,
+    filters_sql: str,
+    params: dict,
+    limit: int,
+    offset: int,
+) -> Optional[Tuple[int, List[str]]]:
+    # queries shorter than a trigram: LIKE over the precomputed documents
+    base = (
+        " FROM items "
+        " JOIN items_fts_docs d ON d.item_id = items.id "
+        " WHERE (d.title LIKE :lk ESCAPE '\\' OR d.series LIKE :lk ESCAPE '\\'"
+        "        OR d.prompt LIKE :lk ESCAPE '\\' OR d.tags LIKE :lk ESCAPE '\\') "
+    )
+    if filters_sql:
+        base += " AND " + filters_sql
+    p = {"lk": _like_pattern(q), **params}
+
+    try:
+        total = session.exec(text("SELECT COUNT(*) " + base), params=p).one()[0]
+        rows = session.exec(
+            text("SELECT items.id " + base + " ORDER BY items.created_at DESC LIMIT :lim OFFSET :off"),
+            params={**p, "lim": limit, "off": offset},
+        ).all()
+    except Exception:
+        session.rollback()
+        _search_stats["errors"] += 1
+        return None
+
+    _search_stats["short_scan"] += 1
+    return int(total), [r[0] for r in rows]
+
+
+def fts_bm25_scores(
+    session: Session,
+    q: str,
+    filters_sql: str,
+    params: dict,
+    limit: int,
+) -> Dict[str, float]:
+    """
+    {item_id: bm25} for the best `limit` FTS matches (SQLite bm25: lower is better).
+    Empty when FTS is unavailable or nothing matches.
+    """
+    if not _fts_available(session):
+        return {}
+
+    sql = (
+        "SELECT items.id, bm25(items_fts) AS score "
+        " FROM items "
+        " JOIN items_fts ON items_fts.item_id = items.id "
+        " WHERE items_fts MATCH :m "
+    )
+    if filters_sql:
+        sql += " AND " + filters_sql
+    sql += " ORDER BY score ASC LIMIT :lim"
+
+    try:
+        rows = session.exec(text(sql), params={"m": _fts_phrase(q), **params, "lim": limit}).all()
+        return {r[0]: float(r[1]) for r in rows}
+    except Exception:
+        session.rollback()
+        return {}
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.util.errors import raise_api_error
+
+
+# Zero-copy upload ingestion.
+#
+# A multipart upload is spooled by the stock parser (memory, then TMPDIR) and read back
+# by the route to hash it and write it to storage: every byte is written twice and read
+# twice. Large files are sent as raw request bodies instead, which receive() writes to a
+# staging file on the storage filesystem as they arrive, hashing on the way. Once the
+# body is in, the sha256 is known, and placing the file is a rename, or a hard link to
+# bytes that are already stored (place()), so a duplicate costs no copy at all.
+#
+# Raw-body routes: PUT /library/assets/upload, and the chunked uploads of gallery items
+# (services/upload_sessions.py, which keeps its part files under the same staging dir and
+# places them with place_file()). Only request.stream() is used, no parser internals.
+# Staging files nobody claimed are removed by the route; ones left by a crash by sweep().
+
+STAGING_DIR = ".staging"
+_WRITE_BUFFER = 1024 * 1024  # bytes gathered from the body before each write
+
+_lock = threading.Lock()
+_stats = {
+    "staged_files": 0,
+    "staged_bytes": 0,
+    "renamed": 0,
+    "copied": 0,
+    "linked_existing": 0,
+    "bytes_not_stored": 0,  # duplicate bytes placed by link / not placed at all
+    "discarded": 0,
+    "swept": 0,
+}
+
+
+def _bump(**kw: int) -> None:
+    with _lock:
+        for k, v in kw.items():
+            _stats[k] += v
+
+
+class StagedFile:
+    """
+    A staging file being received: hashes and counts what is written to it.
+    """
+
+    def __init__(self, staging_dir: Path, max_bytes: int = 0):
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(prefix="up-", dir=staging_dir)
+        self.path = Path(name)
+        self.size = 0
+        self.claimed = False
+        self._f = os.fdopen(fd, "w+b")
+        self._sha = hashlib.sha256()
+        self._max = max_bytes
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self._max and self.size > self._max:
+            raise_api_error(413, "FILE_TOO_LARGE", f"file too large (>{self._max} bytes)")
+        self._sha.update(data)
+        return self._f.write(data)
+
+    @property
+    def sha256(self) -> str:
+        return self._sha.hexdigest()
+
+    def claim(self, dst: Path) -> str:
+        """
+        Moves the staged bytes to dst: "renamed", or "copied" if dst is on another filesystem.
+        """
+        self._f.close()
+        how = _move(self.path, dst)
+        self.claimed = True
+        return how
+
+    def close(self) -> None:
+        if not self._f.closed:
+            self._f.close()
+        if not self.claimed:
+            self.path.unlink(missing_ok=True)
+            self.claimed = True  # closed twice on error paths
+            _bump(discarded=1)
+
+
+async def receive(body: AsyncIterator[bytes], staging_root: Path, max_bytes: int = 0) -> StagedFile:
+    """
+    Writes a raw request body (request.stream()) to a staging file under
+    staging_root/.staging, hashing it on the way. max_bytes > 0 caps it (413).
+    The caller place()s or close()s the result; on error nothing is left behind.
+    """
+    f = StagedFile(staging_root / STAGING_DIR, max_bytes)
+    buf = bytearray()
+    try:
+        async for chunk in body:
+            buf += chunk
+            if len(buf) >= _WRITE_BUFFER:
+                await run_in_threadpool(f.write, bytes(buf))
+                buf.clear()
+        if buf:
+            await run_in_threadpool(f.write, bytes(buf))
+    except BaseException:
+        f.close()
+        raise
+    _bump(staged_files=1, staged_bytes=f.size)
+    return f
+
+
+def _move(src: Path, dst: Path) -> str:
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.replace(src, dst)
+        how = "renamed"
+    except OSError:
+        shutil.copyfile(src, dst)
+        src.unlink(missing_ok=True)
+        how = "copied"
+    _bump(**{how: 1})
+    return how
+
+
+def _link_existing(dst: Path, existing: Iterable[Path]) -> Optional[Path]:
+    for src in existing:
+        try:
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            os.link(src, dst)
+        except OSError:
+            continue  # gone meanwhile, or another filesystem
+        return src
+    return None
+
+
+def place(upload: StagedFile, dst: Path, existing: Iterable[Path] = ()) -> str:
+    """
+    Puts the staged bytes at dst. `existing` are stored files with the same sha256: the first
+    one that can be hard-linked becomes dst ("linked") and the staged copy is dropped;
+    otherwise the staged file is moved there ("renamed" / "copied").
+    """
+    if _link_existing(dst, existing):
+        _bump(linked_existing=1, bytes_not_stored=upload.size)
+        upload.close()
+        return "linked"
+    return upload.claim(dst)
+
+
+def link_stored(dst: Path, existing: Iterable[Path]) -> bool:
+    """
+    Hard-links the first of `existing` that can be linked to dst, for items created from
+    media already stored (no upload at all). False if none could be.
+    """
+    src = _link_existing(dst, existing)
+    if src is None:
+        return False
+    _bump(linked_existing=1, bytes_not_stored=dst.stat().st_size)
+    return True
+
+
+def place_file(src: Path, dst: Path, existing: Iterable[Path] = ()) -> str:
+    """
+    place() for a complete file already on the storage filesystem (chunked uploads).
+    """
+    if _link_existing(dst, existing):
+        _bump(linked_existing=1, bytes_not_stored=src.stat().st_size)
+        src.unlink(missing_ok=True)
+        return "linked"
+    return _move(src, dst)
+
+
+def skipped(upload: StagedFile) -> None:
+    """
+    Records a staged upload the route did not store (its bytes were already there).
+    """
+    _bump(bytes_not_stored=upload.size)
+
+
+def sweep(staging_root: Path, max_age_sec: float = 3600) -> int:
+    """
+    Removes staging files older than max_age_sec (left by a crash mid-request).
+    """
+    base = staging_root / STAGING_DIR
+    if not base.is_dir():
+        return 0
+    cutoff = time.time() - max_age_sec
+    n = 0
+    for p in base.iterdir():
+        try:
+            if p.is_file() and p.stat().st_mtime < cutoff:
+                p.unlink()
+                n += 1
+        except OSError:
+            pass
+    _bump(swept=n)
+    return n
+
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats)
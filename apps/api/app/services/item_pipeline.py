@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from sqlmodel import Session
+
+from app.models import Item, Job
+from app.settings import settings
+from app.services import artifacts, centroids
+from app.services.phash import phash_file, to_db
+from app.services.auto_category import classify_item, serialize_candidates
+from app.services.classify import MODEL_KEY_DEFAULT, classify_and_store_item_embedding
+from app.services.thumbs import make_image_renditions, make_video_poster
+
+
+# Upload post-processing, run as a background job after create_item has put the
+# media on disk: thumb/poster + renditions -> pHash -> CLIP embedding -> auto-category.
+# Re-uploads of processed bytes take the first three over (services/artifacts.py).
+# (items_fts is kept in sync by triggers, see migration 20261016_02.)
+# Items stay status="processing" until this finishes ("ready") or gives up ("failed").
+
+JOB_KIND = "item_postprocess"
+
+
+def _abs(rel: Optional[str]) -> Optional[Path]:
+    if not rel:
+        return None
+    return settings.storage_root / rel.replace("\\", "/").lstrip("/")
+
+
+def run(session: Session, job: Job) -> None:
+    it = session.get(Item, job.item_id)
+    if not it:
+        return  # purged before we got to it
+
+    abs_media = _abs(it.media_path)
+    abs_thumb = _abs(it.thumb_path)
+    abs_poster = _abs(it.poster_path)
+
+    if it.media_type == "video" and not abs_poster:
+        raise RuntimeError("poster path missing")
+    embed_src = abs_media if it.media_type == "image" else abs_poster
+
+    # Same bytes processed before: take over its thumb/poster, pHash and embeddings
+    reused = artifacts.reuse(session, it)
+    if reused is None:
+        # Generate thumb/poster
+        if it.media_type == "image":
+            it.renditions = make_image_renditions(abs_media, abs_thumb, thumb_w=768)
+        else:
+            make_video_poster(abs_media, abs_poster, ss=0.5)
+            if abs_poster.exists():
+                it.renditions = make_image_renditions(abs_poster, abs_thumb, thumb_w=768)
+            else:
+                # ffmpeg failed or not installed: no poster/thumb, no embedding
+                embed_src = None
+
+        # Perceptual hash of the thumbnail, for near-duplicate search
+        it.media_phash = to_db(phash_file(abs_thumb))
+    elif MODEL_KEY_DEFAULT in reused:
+        embed_src = None
+
+    # Generate embedding first (needed for classify_item)
+    if embed_src and embed_src.exists():
+        classify_and_store_item_embedding(session, item_id=it.id, image_or_poster_path=embed_src)
+
+    # Run auto-classification to get candidates and auto_category_id
+    # This always runs for reference, even if manual category is set
+    unc, best, top = classify_item(
+        session,
+        it.id,
+        topk=settings.auto_cat_topk,
+        threshold=settings.auto_cat_threshold,
+        include_deleted_for_prototypes=True,
+    )
+
+    # Update auto_* fields (always)
+    it.auto_candidates_json = serialize_candidates(top) if top else None
+    it.auto_category_id = best.category_id if best else None
+    it.auto_confidence = best.score if best else None
+
+    # Update final category_id only if NOT manually locked
+    prev_category_id = it.category_id
+    if not it.is_category_locked:
+        # Threshold gate: if best score is low, fall back to "Uncategorized"
+        if best and best.score >= settings.auto_cat_threshold:
+            it.category_id = best.category_id
+        else:
+            it.category_id = unc.id
+
+    it.status = "ready"
+    it.status_error = None
+    it.updated_at = datetime.utcnow()
+    session.add(it)
+    session.commit()
+    # the new embedding now counts towards its category's prototype
+    centroids.invalidate_categories([prev_category_id, it.category_id])
+
+
+def on_failure(session: Session, job: Job) -> None:
+    it = session.get(Item, job.item_id)
+    if not it:
+        return
+    it.status = "failed"
+    it.status_error = job.last_error
+    it.updated_at = datetime.utcnow()
+    session.add(it)
+    session.commit()
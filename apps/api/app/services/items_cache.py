@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from app.settings import settings
+from app.util import generation
+
+
+# GET /items response cache: serialized JSON pages in an LRU keyed on the normalized
+# query parameters, capped by size (ITEMS_CACHE_MB, 0 disables).
+#
+# Every entry carries the data generation it was computed at (util/generation.py). Any
+# committed write to gallery data bumps the generation; the whole cache is then dropped
+# on the next access. Callers read generation.current() BEFORE running their queries
+# and pass it to put(): a page computed while a write committed is never stored.
+
+_cache: "OrderedDict[Hashable, Tuple[int, bytes]]" = OrderedDict()
+_lock = threading.Lock()
+_bytes = 0
+_generation = 0  # generation of everything in _cache
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "flushes": 0, "too_large": 0}
+
+
+def _capacity() -> int:
+    return int(float(settings.items_cache_mb) * 1024 * 1024)
+
+
+def enabled() -> bool:
+    return _capacity() > 0
+
+
+def _sync_generation(gen: int) -> None:
+    # caller holds _lock
+    global _bytes, _generation
+    if gen != _generation:
+        if _cache:
+            _stats["flushes"] += 1
+        _cache.clear()
+        _bytes = 0
+        _generation = gen
+
+
+def get(key: Hashable) -> Optional[bytes]:
+    with _lock:
+        _sync_generation(generation.current())
+        entry = _cache.get(key)
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+        _cache.move_to_end(key)
+        _stats["hits"] += 1
+        return entry[1]
+
+
+def put(key: Hashable, body: bytes, gen: int) -> None:
+    """
+    Store a response body computed from data at generation `gen`.
+    """
+    global _bytes
+    cap = _capacity()
+    if cap <= 0:
+        return
+    size = len(body)
+    if size > cap // 8:
+        _stats["too_large"] += 1
+        return
+    with _lock:
+        _sync_generation(generation.current())
+        if gen != _generation:
+            return  # data changed while the page was being built
+        old = _cache.pop(key, None)
+        if old is not None:
+            _bytes -= len(old[1])
+        _cache[key] = (gen, body)
+        _bytes += size
+        _stats["stores"] += 1
+        while _bytes > cap and _cache:
+            _, (_, evicted) = _cache.popitem(last=False)
+            _bytes -= len(evicted)
+            _stats["evictions"] += 1
+
+
+def clear() -> None:
+    global _bytes
+    with _lock:
+        _cache.clear()
+        _bytes = 0
+
+
+def stats() -> dict:
+    total = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "entries": len(_cache),
+        "bytes": _bytes,
+        "capacity_bytes": _capacity(),
+        "hit_rate": (round(_stats["hits"] / total, 4) if total else None),
+        **generation.stats(),
+    }
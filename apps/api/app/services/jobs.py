@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import json
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, update
+from sqlmodel import Session, select
+
+from app.db import engine
+from app.models import Job
+from app.settings import settings
+from app.util.ids import new_id
+
+
+# Durable background jobs (table `jobs`), executed by a small pool of daemon threads.
+#
+#   queued -> running -> done
+#                     -> queued  (error, attempts < max_attempts)
+#                     -> failed  (error, attempts exhausted; kind's on_failure hook runs)
+#
+# Rows survive restarts: jobs left "running" by a dead process are re-queued when the
+# workers start. Handlers get their own Session and must be idempotent; the job's own
+# bookkeeping (claim, outcome) commits in a short transaction of its own.
+
+Handler = Callable[[Session, Job], None]
+
+_wake = threading.Event()
+_stop = threading.Event()
+_threads: List[threading.Thread] = []
+_start_lock = threading.Lock()
+
+
+def _handlers() -> Dict[str, Tuple[Handler, Optional[Handler]]]:
+    # imported lazily: handler modules import routes/services that import this module
+    from app.services import item_pipeline
+    return {
+        item_pipeline.JOB_KIND: (item_pipeline.run, item_pipeline.on_failure),
+    }
+
+
+def enqueue(session: Session, kind: str, item_id: Optional[str] = None, payload: Optional[dict] = None) -> Job:
+    """
+    Adds a job row to the caller's session; it becomes visible once the caller commits.
+    Call dispatch(job.id) after the commit.
+    """
+    now = datetime.utcnow()
+    job = Job(
+        id=new_id(),
+        kind=kind,
+        item_id=item_id,
+        payload_json=(json.dumps(payload, ensure_ascii=False) if payload is not None else None),
+        status="queued",
+        attempts=0,
+        max_attempts=max(1, int(settings.job_max_attempts)),
+        created_at=now,
+        updated_at=now,
+    )
+    session.add(job)
+    return job
+
+
+def dispatch(job_id: str) -> None:
+    """
+    Wakes the workers, or runs the job right here when JOB_WORKERS=0.
+    """
+    if int(settings.job_workers) > 0:
+        _wake.set()
+        return
+    with Session(engine) as s:
+        # no worker will pick up a retry, so use up the attempts here
+        while _claim(job_id):
+            _execute(s, job_id)
+
+
+def _claim(job_id: str) -> bool:
+    with Session(engine) as s:
+        now = datetime.utcnow()
+        res = s.exec(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "queued")
+            .values(status="running", attempts=Job.attempts + 1, started_at=now, updated_at=now)
+        )
+        s.commit()
+        return res.rowcount == 1
+
+
+def _claim_next(session: Session) -> Optional[str]:
+    while True:
+        job_id = session.exec(
+            select(Job.id).where(Job.status == "queued").order_by(Job.created_at.asc()).limit(1)
+        ).first()
+        session.rollback()  # end the read transaction before claiming
+        if job_id is None:
+            return None
+        if _claim(job_id):
+            return job_id
+        # another worker took it; try the next one
+
+
+def _finish(job_id: str, error: Optional[str]) -> Optional[str]:
+    """
+    Records the outcome; returns the job's new status.
+    """
+    with Session(engine) as s:
+        job = s.get(Job, job_id)
+        if job is None:
+            return None
+        now = datetime.utcnow()
+        job.updated_at = now
+        if error is None:
+            job.status = "done"
+            job.last_error = None
+            job.finished_at = now
+        else:
+            job.last_error = error[:2000]
+            if job.attempts < job.max_attempts:
+                job.status = "queued"
+            else:
+                job.status = "failed"
+                job.finished_at = now
+        s.add(job)
+        s.commit()
+        return job.status
+
+
+def _execute(session: Session, job_id: str) -> None:
+    job = session.get(Job, job_id)
+    if job is None:
+        return
+    handler, on_failure = _handlers().get(job.kind, (None, None))
+    try:
+        if handler is None:
+            raise RuntimeError(f"unknown job kind: {job.kind}")
+        handler(session, job)
+        session.commit()
+        _finish(job_id, None)
+    except Exception as e:
+        session.rollback()
+        status = _finish(job_id, f"{type(e).__name__}: {e}")
+        if status == "failed" and on_failure is not None:
+            try:
+                on_failure(session, session.get(Job, job_id))
+            except Exception:
+                session.rollback()
+
+
+def run_next() -> bool:
+    """
+    Claims and runs the oldest queued job. Returns False when the queue is empty.
+    """
+    with Session(engine) as s:
+        job_id = _claim_next(s)
+        if job_id is None:
+            return False
+        _execute(s, job_id)
+        return True
+
+
+def _worker_loop() -> None:
+    while not _stop.is_set():
+        try:
+            ran = run_next()
+        except Exception:
+            ran = False
+        if not ran:
+            _wake.wait(float(settings.job_poll_interval_sec))
+            _wake.clear()
+
+
+def requeue_stale() -> int:
+    """
+    Jobs left "running" by a previous process go back to the queue.
+    """
+    with Session(engine) as s:
+        res = s.exec(
+            update(Job).where(Job.status == "running").values(status="queued", updated_at=datetime.utcnow())
+        )
+        s.commit()
+        return int(res.rowcount or 0)
+
+
+def start_workers() -> None:
+    n = int(settings.job_workers)
+    if n <= 0:
+        return
+    with _start_lock:
+        if any(t.is_alive() for t in _threads):
+            return
+        _stop.clear()
+        requeue_stale()
+        _threads.clear()
+        for i in range(n):
+            t = threading.Thread(target=_worker_loop, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            _threads.append(t)
+
+
+def stop_workers(timeout: float = 5.0) -> None:
+    _stop.set()
+    _wake.set()
+    for t in _threads:
+        t.join(timeout=timeout)
+    _threads.clear()
+
+
+def stats(session: Session) -> dict:
+    counts = dict(
+        session.exec(select(Job.status, func.count()).group_by(Job.status)).all()
+    )
+    return {
+        "workers": sum(1 for t in _threads if t.is_alive()),
+        "by_status": {k: int(counts.get(k, 0)) for k in ("queued", "running", "done", "failed")},
+    }
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+
+# 64-bit perceptual hash (DCT pHash) of an item's picture, for near-duplicate search
+# (services/phash_index.py, GET /items/duplicates?scope=phash).
+#
+# The picture is reduced to 32x32 grayscale, transformed with a 2-D DCT-II, and the 8x8
+# lowest frequencies are compared with their median: one bit each, row-major, first
+# coefficient in the most significant bit. Resizing and re-encoding move a hash by
+# 0-2 bits, unrelated pictures are ~32 bits apart.
+#
+# Hashes are taken from the item's thumbnail (a JPEG <= 768px wide, made for images and
+# video posters alike): same source at ingest and in the backfill, and JPEG draft mode
+# decodes it at 1/8 scale. items.media_phash stores the hash as a signed 64-bit integer.
+
+_N = 32
+_LOW = 8
+_DCT = np.cos(np.pi * (2 * np.arange(_N)[None, :] + 1) * np.arange(_N)[:, None] / (2 * _N))
+_WEIGHTS = (1 << np.arange(_LOW * _LOW - 1, -1, -1, dtype=np.uint64)).astype(np.uint64)
+
+
+def phash_image(im: Image.Image) -> int:
+    """
+    Unsigned 64-bit pHash of a PIL image.
+    """
+    if im.format == "JPEG":
+        im.draft("L", (_N * 2, _N * 2))
+    im = im.convert("L").resize((_N, _N), Image.LANCZOS)
+    px = np.asarray(im, dtype=np.float64)
+    low = (_DCT @ px @ _DCT.T)[:_LOW, :_LOW].reshape(-1)
+    bits = (low > np.median(low)).astype(np.uint64)
+    return int((bits * _WEIGHTS).sum(dtype=np.uint64))
+
+
+def phash_file(path: Optional[Path]) -> Optional[int]:
+    """
+    pHash of an image file, None if it is missing or cannot be decoded.
+    """
+    if not path:
+        return None
+    try:
+        with Image.open(path) as im:
+            return phash_image(im)
+    except (FileNotFoundError, OSError, ValueError):
+        return None
+
+
+def to_db(h: Optional[int]) -> Optional[int]:
+    # unsigned 64-bit -> SQLite INTEGER
+    if h is None:
+        return None
+    return h - (1 << 64) if h >= (1 << 63) else h
+
+
+def from_db(v: Optional[int]) -> Optional[int]:
+    if v is None:
+        return None
+    return v + (1 << 64) if v < 0 else v
+
+
+def to_hex(h: int) -> str:
+    return f"{h & 0xFFFFFFFFFFFFFFFF:016x}"
+
+
+def distance(a: int, b: int) -> int:
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count("1")
@@ -0,0 +1,455 @@
+from __future__ import annotations
+
+import bisect
+from itertools import combinations
+from math import comb
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.services.phash import from_db, to_hex
+from app.settings import settings
+
+
+# In-memory multi-index hashing (MIH) over items.media_phash: near-duplicate groups
+# (Hamming radius r) without comparing every pair.
+#
+# The radius-r search splits the 64 bits into m bands. Two hashes at most r bits apart
+# are at most r // m bits apart on at least one band (pigeonhole), so the candidates are
+# the rows whose band value lies within r // m of the query's in some band: a handful of
+# bucket lookups per band (m and r // m are picked per call from the number of hashes,
+# see _plan), and only those are checked with a popcount. Buckets holding more than
+# PHASH_MAX_BUCKET rows (flat / blank pictures) are skipped.
+#
+# grouping() runs that search for every distinct live hash at once; the connected
+# components of the resulting pairs are the near-duplicate groups. This is single
+# linkage: a ~ b ~ c is one group even if a and c are further apart than r. The grouping
+# is cached until the index changes.
+#
+# Keeping it in sync (as vector_index does):
+#   - first use loads every hashed item in one pass
+#   - every call first upserts the items updated since the last sync (minus an overlap);
+#     ingest sets the hash together with items.updated_at
+#   - purges call remove(); the backfill, which leaves updated_at alone, calls invalidate()
+
+SYNC_OVERLAP = timedelta(seconds=60)
+_PAIRS_PER_STEP = 1 << 22  # candidate pairs expanded per numpy step
+_DIRECT_BITS = 24  # bands up to this wide get a direct-address bucket table
+
+_POP8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(x: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(x)
+    return _POP8[x.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def _plan(n: int, r: int) -> Tuple[int, int]:
+    """
+    (bands m, band radius s = r // m) with the least expected work for n hashes: m * probes
+    lookups per hash, each returning ~n / 2^width candidates.
+    """
+    best = None
+    for m in range(1, r + 2):
+        width, s = 64 // m, r // m
+        probes = sum(comb(width, k) for k in range(s + 1))
+        cost = m * probes * n * (1.0 + n / 2.0 ** width)
+        if best is None or cost < best[0]:
+            best = (cost, m, s)
+    return best[1], best[2]
+
+
+def _bands(m: int) -> List[Tuple[int, int]]:
+    # m (shift, width) bands covering the 64 bits
+    out, shift = [], 0
+    for i in range(m):
+        width = 64 // m + (1 if i < 64 % m else 0)
+        out.append((shift, width))
+        shift += width
+    return out
+
+
+class _BandTables:
+    """
+    Band tables over a set of distinct hashes, for radius r.
+    """
+
+    def __init__(self, hashes: np.ndarray, r: int, max_bucket: int):
+        self.hashes = hashes
+        self.r = int(r)
+        self.max_bucket = int(max_bucket)
+        self.skipped_buckets = 0
+        self.candidates = 0
+        m, self.s = _plan(int(hashes.size), self.r)
+        self.tables = []
+        for shift, width in _bands(m):
+            vals = (hashes >> np.uint64(shift)) & np.uint64((1 << width) - 1)
+            order = np.argsort(vals, kind="stable")
+            direct = None
+            if width <= _DIRECT_BITS:
+                # bucket bounds per band value, instead of a binary search per lookup
+                direct = np.zeros((1 << width) + 1, dtype=np.int32)
+                np.cumsum(np.bincount(vals.astype(np.int64), minlength=1 << width), out=direct[1:])
+            probes = np.array(
+                [sum(1 << b for b in bits) for k in range(self.s + 1) for bits in combinations(range(width), k)],
+                dtype=np.uint64,
+            )
+            self.tables.append((np.uint64(shift), np.uint64((1 << width) - 1), order, vals[order], direct, probes))
+
+    def _buckets(self, table, qv: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        _, _, _, sorted_vals, direct, _ = table
+        if direct is not None:
+            idx = qv.astype(np.int64)
+            lo = direct[idx]
+            return lo, direct[idx + 1] - lo
+        lo = np.searchsorted(sorted_vals, qv, "left")
+        return lo, np.searchsorted(sorted_vals, qv, "right") - lo
+
+    def pairs(self, q: np.ndarray, self_join: bool = False) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        (query index, row) pairs at most r bits apart, in chunks. A pair can come out more
+        than once. self_join: q is self.hashes, each pair with query < row.
+        """
+        for table in self.tables:
+            shift, mask, order, sorted_vals, _, probes = table
+            if self_join:
+                # queries in band order: the lookups below walk the bucket table in runs
+                band, qmap = sorted_vals, order
+            else:
+                band, qmap = (q >> shift) & mask, None
+            for p in probes:
+                qv = band ^ p
+                lo, cnt = self._buckets(table, qv)
+                if self.max_bucket > 0:
+                    big = cnt > self.max_bucket
+                    if big.any():
+                        self.skipped_buckets += int(np.unique(qv[big]).size)
+                        cnt[big] = 0
+                hit = np.flatnonzero(cnt)
+                if hit.size:
+                    qidx = hit if qmap is None else qmap[hit]
+                    yield from self._expand(q, order, qidx, lo[hit], cnt[hit], self_join)
+
+    def _expand(self, q, order, qidx, lo, cnt, self_join):
+        # qidx: queries with a non-empty bucket at lo[i] : lo[i] + cnt[i] of `order`
+        ends = np.cumsum(cnt)
+        start = 0
+        while start < qidx.size:
+            base = int(ends[start - 1]) if start else 0
+            stop = max(start + 1, int(np.searchsorted(ends, base + _PAIRS_PER_STEP, "right")))
+            c = cnt[start:stop]
+            total = int(ends[stop - 1]) - base
+            qi = np.repeat(qidx[start:stop], c)
+            offs = np.arange(total) - np.repeat(np.cumsum(c) - c, c)
+            rows = order[np.repeat(lo[start:stop], c) + offs]
+            start = stop
+            if self_join:
+                keep = qi < rows
+                qi, rows = qi[keep], rows[keep]
+            self.candidates += int(qi.size)
+            ok = _popcount(q[qi] ^ self.hashes[rows]) <= self.r
+            yield qi[ok], rows[ok]
+
+
+def _components(n: int, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # connected components of n nodes under edges (a, b): label = smallest node index
+    labels = np.arange(n)
+    while a.size:
+        la, lb = labels[a], labels[b]
+        cross = la != lb
+        a, b, la, lb = a[cross], b[cross], la[cross], lb[cross]
+        if not a.size:
+            break
+        m = np.minimum(la, lb)
+        np.minimum.at(labels, la, m)
+        np.minimum.at(labels, lb, m)
+        while True:  # pointer jumping: every node points at its root again
+            nxt = labels[labels]
+            if np.array_equal(nxt, labels):
+                break
+            labels = nxt
+    return labels
+
+
+@dataclass
+class _Grouping:
+    sizes: np.ndarray  # items per group, groups sorted by (size desc, key asc)
+    keys: np.ndarray  # uint64: smallest hash in the group
+    members: List[np.ndarray]  # index rows of each group
+    order_keys: List[Tuple[int, int]]  # (-size, key) per group, for keyset seeks
+    stats: dict
+
+
+class PhashIndex:
+    def __init__(self, capacity: int = 1024):
+        self.n = 0
+        self.ids: List[Optional[str]] = []
+        self.created: List[str] = []  # created_at as stored (ISO text, sorts chronologically)
+        self.row_of: Dict[str, int] = {}
+        self.hashes = np.zeros((capacity,), dtype=np.uint64)
+        self.deleted = np.zeros((capacity,), dtype=bool)
+        self.alive = np.zeros((capacity,), dtype=bool)
+        self.version = 0
+        self._groupings: Dict[Tuple[int, int, bool], _Grouping] = {}
+        self.groupings_built = 0
+        self.last_grouping: Optional[dict] = None
+        self.lock = threading.RLock()
+
+    # ---- storage ----
+
+    def _grow(self, need: int) -> None:
+        cap = self.hashes.shape[0]
+        if need <= cap:
+            return
+        new_cap = max(need, cap + cap // 2)
+        for name in ("hashes", "deleted", "alive"):
+            old = getattr(self, name)
+            arr = np.zeros((new_cap,), dtype=old.dtype)
+            arr[: self.n] = old[: self.n]
+            setattr(self, name, arr)
+
+    def _changed(self) -> None:
+        self.version += 1
+        self._groupings.clear()
+
+    def upsert(self, rows: Sequence[Tuple[str, int, bool, str]]) -> int:
+        """
+        rows: (item_id, unsigned hash, is_deleted, created_at). Returns rows changed.
+        """
+        changed = 0
+        with self.lock:
+            self._grow(self.n + len(rows))
+            for iid, h, deleted, created in rows:
+                r = self.row_of.get(iid)
+                if r is None:
+                    r = self.row_of[iid] = self.n
+                    self.ids.append(iid)
+                    self.created.append(created)
+                    self.n += 1
+                elif self.hashes[r] == h and bool(self.deleted[r]) == bool(deleted):
+                    continue
+                self.hashes[r] = h
+                self.deleted[r] = bool(deleted)
+                self.alive[r] = True
+                changed += 1
+            if changed:
+                self._changed()
+        return changed
+
+    def remove(self, item_ids: Sequence[str]) -> int:
+        removed = 0
+        with self.lock:
+            for iid in item_ids:
+                r = self.row_of.pop(iid, None)
+                if r is None:
+                    continue
+                self.alive[r] = False
+                self.ids[r] = None
+                removed += 1
+            if removed:
+                if self.n and (self.n - len(self.row_of)) > max(1024, self.n // 4):
+                    self._compact()
+                self._changed()
+        return removed
+
+    def _compact(self) -> None:
+        keep = np.flatnonzero(self.alive[: self.n])
+        for name in ("hashes", "deleted", "alive"):
+            arr = getattr(self, name)
+            arr[: keep.size] = arr[keep]
+            arr[keep.size : self.n] = 0
+        self.ids = [self.ids[r] for r in keep]
+        self.created = [self.created[r] for r in keep]
+        self.row_of = {iid: i for i, iid in enumerate(self.ids)}
+        self.n = int(keep.size)
+
+    @property
+    def size(self) -> int:
+        return len(self.row_of)
+
+    def _live_rows(self, include_deleted: bool) -> np.ndarray:
+        mask = self.alive[: self.n].copy()
+        if not include_deleted:
+            mask &= ~self.deleted[: self.n]
+        return np.flatnonzero(mask)
+
+    # ---- query ----
+
+    def grouping(self, r: int, include_deleted: bool) -> _Grouping:
+        with self.lock:
+            key = (self.version, int(r), bool(include_deleted))
+            g = self._groupings.get(key)
+            if g is None:
+                t0 = time.perf_counter()
+                g = self._groupings[key] = self._group(int(r), bool(include_deleted))
+                self.groupings_built += 1
+                self.last_grouping = {**g.stats, "max_distance": int(r), "seconds": round(time.perf_counter() - t0, 3)}
+            return g
+
+    def _group(self, r: int, include_deleted: bool) -> _Grouping:
+        rows = self._live_rows(include_deleted)
+        uniq, inv = np.unique(self.hashes[rows], return_inverse=True)
+        inv = inv.reshape(-1)
+        tables = _BandTables(uniq, r, int(settings.phash_max_bucket))
+        a_parts, b_parts = [], []
+        for qi, ri in tables.pairs(uniq, self_join=True):
+            a_parts.append(qi)
+            b_parts.append(ri)
+        a = np.concatenate(a_parts) if a_parts else np.zeros(0, dtype=np.int64)
+        b = np.concatenate(b_parts) if b_parts else np.zeros(0, dtype=np.int64)
+        labels = _components(uniq.size, a, b)
+
+        # items -> component of their hash; groups of 2+ items
+        comp = labels[inv]
+        order = np.argsort(comp, kind="stable")
+        comp_sorted = comp[order]
+        cuts = np.flatnonzero(np.diff(comp_sorted)) + 1
+        starts = np.concatenate(([0], cuts)) if comp_sorted.size else np.zeros(0, dtype=np.int64)
+        ends = np.concatenate((cuts, [comp_sorted.size])) if comp_sorted.size else np.zeros(0, dtype=np.int64)
+        sizes = ends - starts
+        multi = np.flatnonzero(sizes >= 2)
+        # a component's label is its smallest index into uniq (sorted): its smallest hash
+        keys = uniq[comp_sorted[starts[multi]]] if multi.size else np.zeros(0, dtype=np.uint64)
+        sizes = sizes[multi]
+        rank = np.lexsort((keys, -sizes))
+        members = [rows[order[starts[multi[i]] : ends[multi[i]]]] for i in rank]
+        sizes, keys = sizes[rank], keys[rank]
+        return _Grouping(
+            sizes=sizes,
+            keys=keys,
+            members=members,
+            order_keys=list(zip((-sizes).tolist(), keys.tolist())),
+            stats={
+                "items": int(rows.size), "distinct_hashes": int(uniq.size),
+                "bands": len(tables.tables), "band_radius": tables.s,
+                "candidates": tables.candidates, "pairs": int(a.size), "groups": len(members),
+                "skipped_buckets": tables.skipped_buckets,
+            },
+        )
+
+    def page(
+        self,
+        r: int,
+        include_deleted: bool,
+        min_count: int,
+        page: int,
+        page_size: int,
+        items_limit: int,
+        after: Optional[Tuple[int, int]] = None,
+        key_filter: Optional[str] = None,
+    ) -> Tuple[int, List[Tuple[str, int, List[str]]], Optional[Tuple[int, int]]]:
+        """
+        (total groups, [(key hex, size, newest items_limit item ids)], keyset of the last
+        group when there is a next page). Groups are ordered by (size desc, key asc);
+        after = (size, key) of the last group of the previous page.
+        """
+        with self.lock:
+            g = self.grouping(r, include_deleted)
+            # sizes are descending: the groups with min_count+ items are a prefix
+            eligible = int(np.searchsorted(-g.sizes, -int(min_count), "right"))
+            idx: Sequence[int] = range(eligible)
+            if key_filter:
+                idx = [i for i in idx if key_filter in to_hex(int(g.keys[i]))]
+            total = len(idx)
+            if after is not None:
+                pos = bisect.bisect_right(g.order_keys, (-int(after[0]), int(after[1])))
+                start = bisect.bisect_left(idx, pos) if key_filter else pos
+            else:
+                start = (page - 1) * page_size
+            sel = list(idx[start : start + page_size + 1])
+            has_more = len(sel) > page_size
+            sel = sel[:page_size]
+            out = []
+            for i in sel:
+                rows = sorted(g.members[i].tolist(), key=lambda rr: (self.created[rr], self.ids[rr]), reverse=True)
+                out.append((to_hex(int(g.keys[i])), int(g.sizes[i]), [self.ids[rr] for rr in rows[:items_limit]]))
+            last = (int(g.sizes[sel[-1]]), int(g.keys[sel[-1]])) if has_more else None
+            return total, out, last
+
+
+_index: Optional[PhashIndex] = None
+_sync_mark: Optional[datetime] = None
+_lock = threading.Lock()
+_stats = {"full_loads": 0, "syncs": 0, "synced_rows": 0, "removed": 0}
+
+
+def _rows(session: Session, since: Optional[datetime] = None) -> list:
+    if since is None:
+        sql = "SELECT id, media_phash, is_deleted, created_at FROM items WHERE media_phash IS NOT NULL"
+        return session.exec(text(sql)).all()
+    sql = "SELECT id, media_phash, is_deleted, created_at FROM items WHERE updated_at >= :since"
+    return session.exec(text(sql), params={"since": since}).all()
+
+
+def _split(rows) -> Tuple[list, List[str]]:
+    keep, gone = [], []
+    for iid, h, deleted, created in rows:
+        if h is None:
+            gone.append(iid)
+        else:
+            keep.append((iid, from_db(int(h)), bool(deleted), str(created)))
+    return keep, gone
+
+
+def _sync(session: Session) -> PhashIndex:
+    global _index, _sync_mark
+    now = datetime.utcnow()
+    with _lock:
+        if _index is None:
+            keep, _ = _split(_rows(session))
+            idx = PhashIndex(capacity=len(keep) + max(1024, len(keep) // 8))
+            idx.upsert(keep)
+            _index, _sync_mark = idx, now
+            _stats["full_loads"] += 1
+            return idx
+
+        keep, gone = _split(_rows(session, _sync_mark - SYNC_OVERLAP))
+        _stats["synced_rows"] += _index.upsert(keep)
+        if gone:
+            _stats["removed"] += _index.remove(gone)
+        _sync_mark = now
+        _stats["syncs"] += 1
+        return _index
+
+
+def groups_page(session: Session, r: int, include_deleted: bool, **kw):
+    """
+    A page of near-duplicate groups (see PhashIndex.page).
+    """
+    return _sync(session).page(r, include_deleted, **kw)
+
+
+def remove(item_ids: Sequence[str]) -> None:
+    """
+    Drop purged items.
+    """
+    ids = [i for i in item_ids if i]
+    with _lock:
+        idx = _index
+    if idx is not None and ids:
+        _stats["removed"] += idx.remove(ids)
+
+
+def invalidate() -> None:
+    global _index, _sync_mark
+    with _lock:
+        _index = None
+        _sync_mark = None
+
+
+def stats() -> dict:
+    with _lock:
+        idx = _index
+    if idx is None:
+        return {**_stats, "size": None}
+    return {
+        **_stats, "size": idx.size, "version": idx.version,
+        "groupings": idx.groupings_built, "last_grouping": idx.last_grouping,
+    }
@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.db import engine
+from app.services import centroids, file_stat, phash_index, vector_index
+from app.services.thumbs import rendition_rels
+from app.settings import settings
+
+
+# Purge engine for trashed items (POST /items/bulk_purge, /_maintenance/purge_deleted).
+#
+#   1. rows: items are deleted in chunks of purge_chunk_size, one transaction per chunk,
+#      with set-based DELETE ... WHERE item_id IN (...) for the item rows, embeddings,
+#      tag links and versions. The same transaction records the item's files in
+#      purge_files (migration 20261017_02).
+#   2. files: once a chunk is committed its files are unlinked on a bounded thread pool
+#      (purge_file_workers) while the next chunk is deleted; purge_files rows are
+#      dropped as their files go.
+#
+# A run killed half way loses nothing: items not reached yet are still in the trash
+# (purge again) and files recorded but not removed stay in purge_files, which is
+# drained on startup (resume_files_async) and at the start of every purge.
+#
+# Runs are serialized; progress() reports the current / last one.
+
+_run_lock = threading.Lock()
+_progress_lock = threading.Lock()
+_progress: Dict[str, object] = {"running": False}
+
+_FILES_BATCH = 1000
+
+
+def _set_progress(**kw) -> None:
+    with _progress_lock:
+        _progress.update(kw)
+
+
+def progress() -> dict:
+    with _progress_lock:
+        out = dict(_progress)
+    if out.get("running") and out.get("started"):
+        out["elapsed_sec"] = round(time.perf_counter() - float(out.pop("started")), 3)
+    else:
+        out.pop("started", None)
+    return out
+
+
+def _outbox_available(session: Session) -> bool:
+    row = session.exec(
+        text("SELECT name FROM sqlite_master WHERE type='table' AND name='purge_files' LIMIT 1")
+    ).first()
+    return bool(row)
+
+
+def _rel(p: Optional[str]) -> Optional[str]:
+    rel = (p or "").replace("\\", "/").lstrip("/")
+    return rel or None
+
+
+def _in(name: str, values: List[str]) -> Tuple[str, dict]:
+    # ":name_0, :name_1, ..." + params, for IN (...) lists in text() statements
+    params = {f"{name}_{i}": v for i, v in enumerate(values)}
+    return ", ".join(f":{k}" for k in params), params
+
+
+# ---- files ----
+
+def _unlink(root: Path, rel: str) -> str:
+    p = (root / rel).resolve()
+    if root not in p.parents:
+        return "error"  # never outside the storage root
+    try:
+        p.unlink()
+        return "deleted"
+    except FileNotFoundError:
+        return "missing"
+    except Exception:
+        return "error"
+
+
+class _FileSweeper:
+    """
+    Unlinks files on a bounded pool; finish() waits, clears purge_files and returns counts.
+    """
+
+    def __init__(self, workers: int, outbox: bool = True):
+        self.root = Path(settings.storage_root).resolve()
+        self.outbox = outbox
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="purge-files")
+        self.futures: List[Tuple[str, str, Future]] = []
+        self.counts = {"deleted": 0, "missing": 0, "error": 0}
+        self.errors: List[dict] = []
+        self._lock = threading.Lock()
+        self._finished = 0
+
+    def _on_done(self, _fut: Future) -> None:
+        with self._lock:
+            self._finished += 1
+            n = self._finished
+        _set_progress(files_done=n)
+
+    def submit(self, files: Iterable[Tuple[str, Optional[str]]]) -> None:
+        for rel, item_id in files:
+            fut = self.pool.submit(_unlink, self.root, rel)
+            fut.add_done_callback(self._on_done)
+            self.futures.append((rel, item_id, fut))
+
+    def finish(self) -> None:
+        done: List[str] = []
+        for rel, item_id, fut in self.futures:
+            res = fut.result()
+            self.counts[res] += 1
+            if res == "error":
+                # stays in purge_files, retried by the next purge
+                self.errors.append({"item_id": item_id, "stage": "delete_file", "path": rel})
+            else:
+                done.append(rel)
+        self.pool.shutdown(wait=True)
+        self.futures = []
+        file_stat.forget(done)
+        if not self.outbox:
+            return
+        with Session(engine) as s:
+            for i in range(0, len(done), _FILES_BATCH):
+                ph, params = _in("p", done[i : i + _FILES_BATCH])
+                s.exec(text(f"DELETE FROM purge_files WHERE path IN ({ph})"), params=params)
+            s.commit()
+
+
+def _pending_files(session: Session) -> List[Tuple[str, Optional[str]]]:
+    rows = session.exec(text("SELECT path, item_id FROM purge_files ORDER BY path")).all()
+    return [(r[0], r[1]) for r in rows]
+
+
+def resume_files() -> dict:
+    """
+    Remove the files left in purge_files by an interrupted purge.
+    """
+    with _run_lock:
+        with Session(engine) as s:
+            if not _outbox_available(s):
+                return {"deleted": 0, "missing": 0, "error": 0}
+            pending = _pending_files(s)
+        if not pending:
+            return {"deleted": 0, "missing": 0, "error": 0}
+        sweeper = _FileSweeper(int(settings.purge_file_workers))
+        sweeper.submit(pending)
+        sweeper.finish()
+        return sweeper.counts
+
+
+def resume_files_async() -> None:
+    threading.Thread(target=resume_files, name="purge-resume", daemon=True).start()
+
+
+# ---- rows ----
+
+def _delete_chunk(
+    session: Session, ids: List[str], purge_files: bool, outbox: bool,
+) -> Tuple[Dict[str, int], List[dict], List[Tuple[str, str]]]:
+    """
+    Deletes the trashed items among `ids` in the session's transaction.
+    Returns (row counts, purged {id, category_id}, their files), recording the files in
+    purge_files when `outbox`.
+    """
+    ph, params = _in("i", ids)
+    rows = session.exec(
+        text(
+            "SELECT id, category_id, media_path, thumb_path, poster_path, renditions FROM items "
+            f"WHERE id IN ({ph}) AND is_deleted = 1"
+        ),
+        params=params,
+    ).all()
+    counts = {"items": 0, "item_versions": 0, "item_tags": 0, "item_embeddings": 0}
+    if not rows:
+        return counts, [], []
+
+    purged = [{"id": r[0], "category_id": r[1]} for r in rows]
+    files: List[Tuple[str, str]] = []
+    if purge_files:
+        seen = set()
+        for r in rows:
+            for rel in (_rel(r[2]), _rel(r[3]), _rel(r[4]), *rendition_rels(r[3], r[5])):
+                if rel and rel not in seen:
+                    seen.add(rel)
+                    files.append((rel, r[0]))
+    if files and outbox:
+        now = datetime.utcnow().isoformat(" ")
+        for i in range(0, len(files), _FILES_BATCH):
+            session.exec(
+                text("INSERT OR IGNORE INTO purge_files (path, item_id, created_at) VALUES (:p, :i, :t)"),
+                params=[{"p": rel, "i": iid, "t": now} for rel, iid in files[i : i + _FILES_BATCH]],
+            )
+
+    ph, params = _in("i", [p["id"] for p in purged])
+    # the item rows go first: their FTS document is dropped once, and the version / tag
+    # link triggers that follow find no document left to recompute (foreign keys are not
+    # enforced on these connections)
+    counts["items"] = int(session.exec(text(f"DELETE FROM items WHERE id IN ({ph})"), params=params).rowcount or 0)
+    for table in ("item_embeddings", "item_tags", "item_versions"):
+        res = session.exec(text(f"DELETE FROM {table} WHERE item_id IN ({ph})"), params=params)
+        counts[table] = int(res.rowcount or 0)
+    return counts, purged, files
+
+
+def purge(item_ids: List[str], purge_files: bool = True) -> dict:
+    """
+    Permanently deletes the trashed items among `item_ids` (order kept), their rows and,
+    with purge_files, their media / thumb / poster files.
+    """
+    chunk = max(1, int(settings.purge_chunk_size))
+    deleted = {"items": 0, "item_versions": 0, "item_tags": 0, "item_embeddings": 0}
+    errors: List[dict] = []
+    purged_ids: List[str] = []
+    touched_categories: set = set()
+    phases: Dict[str, float] = {}
+
+    with _run_lock:
+        t0 = time.perf_counter()
+        _set_progress(
+            running=True, started=t0, phase="rows", items_total=len(item_ids), items_done=0,
+            files_total=0, files_done=0, chunks=0, errors=0,
+        )
+        sweeper: Optional[_FileSweeper] = None
+        try:
+            with Session(engine) as s:
+                outbox = _outbox_available(s)
+                if purge_files:
+                    sweeper = _FileSweeper(int(settings.purge_file_workers), outbox=outbox)
+                if sweeper is not None and outbox:
+                    # files of an earlier, interrupted purge
+                    sweeper.submit(_pending_files(s))
+                s.rollback()
+
+                for n, i in enumerate(range(0, len(item_ids), chunk), start=1):
+                    ids = item_ids[i : i + chunk]
+                    try:
+                        counts, purged, files = _delete_chunk(s, ids, purge_files, outbox)
+                        s.commit()
+                    except Exception as e:
+                        s.rollback()
+                        errors.append({"item_ids": ids[:5], "stage": "db_delete", "err": str(e)[:400]})
+                        continue
+                    for k, v in counts.items():
+                        deleted[k] += v
+                    purged_ids += [p["id"] for p in purged]
+                    touched_categories.update(p["category_id"] for p in purged)
+                    if sweeper is not None:
+                        sweeper.submit(files)
+                    _set_progress(items_done=min(len(item_ids), i + len(ids)), chunks=n, errors=len(errors),
+                                  files_total=(len(sweeper.futures) if sweeper is not None else 0))
+
+            phases["rows"] = time.perf_counter() - t0
+            _set_progress(phase="files")
+            if sweeper is not None:
+                t = time.perf_counter()
+                sweeper.finish()
+                errors += sweeper.errors
+                phases["files_wait"] = time.perf_counter() - t
+        finally:
+            if sweeper is not None and sweeper.futures:
+                sweeper.pool.shutdown(wait=True)
+            dt = time.perf_counter() - t0
+            _set_progress(
+                running=False, phase="done", errors=len(errors), seconds=round(dt, 3),
+                items_per_sec=(round(deleted["items"] / dt, 1) if dt > 0 else None),
+                finished_at=datetime.utcnow().isoformat(),
+            )
+
+        centroids.invalidate_categories(touched_categories)
+        vector_index.remove(purged_ids)
+        phash_index.remove(purged_ids)
+
+    return {
+        "deleted": {
+            **deleted,
+            "files_deleted": (sweeper.counts["deleted"] if sweeper is not None else 0),
+            "files_missing": (sweeper.counts["missing"] if sweeper is not None else 0),
+        },
+        "purged_ids": purged_ids,
+        "errors": errors,
+        "seconds": round(dt, 3),
+        "phases_sec": {k: round(v, 3) for k, v in phases.items()},
+    }
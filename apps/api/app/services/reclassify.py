@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from app.models import Item
+from app.settings import settings
+from app.services import centroids
+from app.services.auto_category import classify_items_batch, serialize_candidates
+
+
+def reclassify_items(
+    session: Session,
+    limit: int,
+    threshold: Optional[float] = None,
+    dry_run: bool = True,
+    include_deleted: bool = True,
+    force: bool = False,
+    only_uncategorized: bool = True,
+    write_chunk: int = 1000,
+) -> dict:
+    """
+    Bulk re-run of auto-category over the newest `limit` items.
+
+    Reads only the columns it needs (no ORM instances), scores every candidate with
+    classify_items_batch, and writes changed rows back as chunked executemany UPDATEs
+    in a single transaction. Rows whose auto_* fields and category are unchanged are
+    not written.
+    """
+    thr = float(threshold) if threshold is not None else float(settings.auto_cat_threshold)
+
+    stmt = (
+        select(
+            Item.id,
+            Item.title,
+            Item.category_id,
+            Item.auto_category_id,
+            Item.auto_confidence,
+            Item.auto_candidates_json,
+            Item.is_category_locked,
+        )
+        .order_by(Item.created_at.desc())
+        .limit(limit)
+    )
+    if not include_deleted:
+        stmt = stmt.where(Item.is_deleted == False)
+    rows = session.exec(stmt).all()
+
+    # Skip items with manually locked categories (unless force=True)
+    todo = [r for r in rows if force or not r.is_category_locked]
+
+    unc, results = classify_items_batch(
+        session,
+        [r.id for r in todo],
+        topk=3,
+        threshold=thr,
+        include_deleted_for_prototypes=include_deleted,
+    )
+
+    would_update = 0
+    samples = []
+    changes: List[Dict] = []
+    touched_categories: set[str] = set()
+    now = datetime.utcnow()
+
+    for r in todo:
+        best, top = results.get(r.id, (None, []))
+        prev_cat = r.category_id
+        prev_auto = r.auto_category_id
+        prev_conf = r.auto_confidence
+
+        # compute next fields
+        next_auto_id = best.category_id if best else None
+        next_conf = best.score if best else None
+        next_candidates_json = serialize_candidates(top) if top else None
+        next_cat = (best.category_id if (best and best.score >= thr) else unc.id)
+
+        # decide whether to change final category_id
+        # If category is locked, never change category_id (but can still update auto_* fields)
+        allow_change = force and not r.is_category_locked
+        if not allow_change and not r.is_category_locked:
+            # safe mode:
+            # 1) only_uncategorized: only change if current category is uncategorized
+            if only_uncategorized and prev_cat == unc.id:
+                allow_change = True
+            # 2) or if current category equals previous auto_category_id (not manually overridden)
+            elif (not only_uncategorized) and prev_auto and prev_cat == prev_auto:
+                allow_change = True
+        change_cat = allow_change and next_cat != prev_cat
+
+        will_change = change_cat \
+                      or (next_candidates_json != (r.auto_candidates_json or None)) \
+                      or (next_auto_id != prev_auto) \
+                      or (next_conf != prev_conf)
+        if not will_change:
+            continue
+
+        would_update += 1
+        if len(samples) < 50:
+            samples.append({
+                "item_id": r.id,
+                "title": r.title,
+                "prev": {"category_id": prev_cat, "auto_category_id": prev_auto, "auto_conf": prev_conf},
+                "next": {"category_id": (next_cat if allow_change else prev_cat), "auto_category_id": next_auto_id, "auto_conf": next_conf},
+            })
+
+        ch = {
+            "id": r.id,
+            "auto_candidates_json": next_candidates_json,
+            "auto_category_id": next_auto_id,
+            "auto_confidence": next_conf,
+            "category_id": (next_cat if change_cat else prev_cat),
+            "updated_at": now,
+        }
+        if change_cat:
+            touched_categories.update([prev_cat, next_cat])
+        changes.append(ch)
+
+    applied = 0
+    if not dry_run and changes:
+        for i in range(0, len(changes), write_chunk):
+            chunk = changes[i : i + write_chunk]
+            # ORM bulk UPDATE by primary key -> one executemany per chunk
+            session.exec(update(Item), params=chunk)
+            applied += len(chunk)
+        session.commit()
+        centroids.invalidate_categories(touched_categories)
+
+    return {
+        "status": "ok",
+        "dry_run": dry_run,
+        "threshold": thr,
+        "scanned": len(rows),
+        "would_update": would_update,
+        "applied": applied,
+        "sample": samples,
+        "uncategorized_id": unc.id,
+    }
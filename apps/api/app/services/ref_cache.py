@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from sqlmodel import Session, select
+
+from app.db import engine
+from app.models import Tool, Category, Tag
+
+
+# In-process cache for rarely-changing reference rows (tools / categories / tags).
+#
+# Snapshots are plain frozen dataclasses (not ORM instances) so they can be shared
+# across sessions/threads safely. Misses are loaded through a private short-lived
+# session, which only sees COMMITTED rows: a tag flushed by a request that later
+# rolls back can never leak into the cache.
+#
+# An id/key/name missing from a loaded tools/categories snapshot reloads the table, in
+# case another process (seed, migration) added the row, but at most once per
+# _RELOAD_MIN_INTERVAL_S: a stale or bogus id in a request can't turn every call into a
+# full-table read.
+
+
+@dataclass(frozen=True)
+class ToolRef:
+    id: str
+    key: str
+    label: str
+
+
+@dataclass(frozen=True)
+class CategoryRef:
+    id: str
+    name: str
+    sort_order: int
+    is_active: bool
+
+
+@dataclass(frozen=True)
+class TagRef:
+    id: str
+    name: str
+
+
+_lock = threading.Lock()
+
+_tools: Optional[Dict[str, ToolRef]] = None        # by id, created_at order
+_tools_by_key: Dict[str, ToolRef] = {}
+_cats: Optional[Dict[str, CategoryRef]] = None     # by id, sort_order order
+_cats_by_name: Dict[str, CategoryRef] = {}
+_tags_by_id: Dict[str, TagRef] = {}
+_tags_by_name: Dict[str, TagRef] = {}
+
+_RELOAD_MIN_INTERVAL_S = 5.0
+_loaded_at = {"tools": 0.0, "categories": 0.0}  # time.monotonic() of the last load
+
+_stats = {
+    "tools": {"hits": 0, "misses": 0, "loads": 0, "invalidations": 0, "reloads_skipped": 0},
+    "categories": {"hits": 0, "misses": 0, "loads": 0, "invalidations": 0, "reloads_skipped": 0},
+    "tags": {"hits": 0, "misses": 0, "loads": 0, "invalidations": 0},
+}
+
+
+def _count(kind: str, key: str, n: int = 1) -> None:
+    with _lock:
+        _stats[kind][key] += n
+
+
+def _reload_due(kind: str) -> bool:
+    """
+    False (and counted) when the snapshot of kind was loaded less than
+    _RELOAD_MIN_INTERVAL_S ago: the miss is answered from it as "unknown".
+    """
+    with _lock:
+        if time.monotonic() - _loaded_at[kind] >= _RELOAD_MIN_INTERVAL_S:
+            return True
+        _stats[kind]["reloads_skipped"] += 1
+        return False
+
+
+# ---- loaders ----
+
+def _load_tools() -> Dict[str, ToolRef]:
+    global _tools, _tools_by_key
+    with Session(engine) as s:
+        rows = s.exec(select(Tool).order_by(Tool.created_at.asc())).all()
+        snap = {r.id: ToolRef(id=r.id, key=r.key, label=r.label) for r in rows}
+    with _lock:
+        _tools = snap
+        _tools_by_key = {t.key: t for t in snap.values()}
+        _loaded_at["tools"] = time.monotonic()
+    _count("tools", "loads")
+    return snap
+
+
+def _load_categories() -> Dict[str, CategoryRef]:
+    global _cats, _cats_by_name
+    with Session(engine) as s:
+        rows = s.exec(select(Category).order_by(Category.sort_order.asc())).all()
+        snap = {
+            r.id: CategoryRef(id=r.id, name=r.name, sort_order=int(r.sort_order or 0), is_active=bool(r.is_active))
+            for r in rows
+        }
+    with _lock:
+        _cats = snap
+        _cats_by_name = {c.name: c for c in snap.values()}
+        _loaded_at["categories"] = time.monotonic()
+    _count("categories", "loads")
+    return snap
+
+
+def _load_tags(ids: Iterable[str] = (), names: Iterable[str] = ()) -> None:
+    ids = list(ids)
+    names = list(names)
+    if not ids and not names:
+        return
+    found: List[TagRef] = []
+    with Session(engine) as s:
+        if ids:
+            found += [TagRef(id=r.id, name=r.name) for r in s.exec(select(Tag).where(Tag.id.in_(ids))).all()]
+        if names:
+            found += [TagRef(id=r.id, name=r.name) for r in s.exec(select(Tag).where(Tag.name.in_(names))).all()]
+    with _lock:
+        for t in found:
+            _tags_by_id[t.id] = t
+            _tags_by_name[t.name] = t
+    _count("tags", "loads")
+
+
+# ---- tools ----
+
+def list_tools() -> List[ToolRef]:
+    snap = _tools
+    if snap is None:
+        _count("tools", "misses")
+        snap = _load_tools()
+    else:
+        _count("tools", "hits")
+    return list(snap.values())
+
+
+def get_tool(tool_id: Optional[str]) -> Optional[ToolRef]:
+    if not tool_id:
+        return None
+    snap = _tools
+    if snap is not None and tool_id in snap:
+        _count("tools", "hits")
+        return snap[tool_id]
+    # unknown id: reload in case the row was added by another process (seed/migration)
+    _count("tools", "misses")
+    if snap is not None and not _reload_due("tools"):
+        return None
+    return _load_tools().get(tool_id)
+
+
+def get_tool_by_key(key: Optional[str]) -> Optional[ToolRef]:
+    if not key:
+        return None
+    ref = _tools_by_key.get(key)  # one lookup: invalidate_tools() may swap the dict meanwhile
+    if ref is not None:
+        _count("tools", "hits")
+        return ref
+    _count("tools", "misses")
+    if _tools is None or _reload_due("tools"):
+        _load_tools()
+    return _tools_by_key.get(key)
+
+
+# ---- categories ----
+
+def list_categories(active_only: bool = True) -> List[CategoryRef]:
+    snap = _cats
+    if snap is None:
+        _count("categories", "misses")
+        snap = _load_categories()
+    else:
+        _count("categories", "hits")
+    return [c for c in snap.values() if c.is_active or not active_only]
+
+
+def get_category(category_id: Optional[str]) -> Optional[CategoryRef]:
+    if not category_id:
+        return None
+    snap = _cats
+    if snap is not None and category_id in snap:
+        _count("categories", "hits")
+        return snap[category_id]
+    _count("categories", "misses")
+    if snap is not None and not _reload_due("categories"):
+        return None
+    return _load_categories().get(category_id)
+
+
+def get_category_by_name(name: str) -> Optional[CategoryRef]:
+    ref = _cats_by_name.get(name)  # one lookup: invalidate_categories() may swap the dict meanwhile
+    if ref is not None:
+        _count("categories", "hits")
+        return ref
+    _count("categories", "misses")
+    if _cats is None or _reload_due("categories"):
+        _load_categories()
+    return _cats_by_name.get(name)
+
+
+# ---- tags ----
+
+def tag_names_by_ids(tag_ids: Iterable[str]) -> Dict[str, str]:
+    """
+    Returns {tag_id: name} for known (committed) tags.
+    """
+    tag_ids = list(dict.fromkeys(tag_ids))
+    missing = [t for t in tag_ids if t not in _tags_by_id]
+    _count("tags", "hits", len(tag_ids) - len(missing))
+    if missing:
+        _count("tags", "misses", len(missing))
+        _load_tags(ids=missing)
+    # .get only: invalidate_tags() may clear the dict between a check and an index
+    found = {t: _tags_by_id.get(t) for t in tag_ids}
+    return {t: ref.name for t, ref in found.items() if ref is not None}
+
+
+def tag_ids_by_names(names: Iterable[str]) -> Dict[str, str]:
+    """
+    Returns {name: tag_id} for known (committed) tags. Unknown names are absent;
+    callers that need to create tags must still check their own session.
+    """
+    names = list(dict.fromkeys(names))
+    missing = [n for n in names if n not in _tags_by_name]
+    _count("tags", "hits", len(names) - len(missing))
+    if missing:
+        _count("tags", "misses", len(missing))
+        _load_tags(names=missing)
+    found = {n: _tags_by_name.get(n) for n in names}
+    return {n: ref.id for n, ref in found.items() if ref is not None}
+
+
+# ---- invalidation / stats ----
+
+def invalidate_tools() -> None:
+    global _tools, _tools_by_key
+    with _lock:
+        _tools = None
+        _tools_by_key = {}
+    _count("tools", "invalidations")
+
+
+def invalidate_categories() -> None:
+    global _cats, _cats_by_name
+    with _lock:
+        _cats = None
+        _cats_by_name = {}
+    _count("categories", "invalidations")
+
+
+def invalidate_tags() -> None:
+    with _lock:
+        _tags_by_id.clear()
+        _tags_by_name.clear()
+    _count("tags", "invalidations")
+
+
+def invalidate_all() -> None:
+    invalidate_tools()
+    invalidate_categories()
+    invalidate_tags()
+
+
+def stats() -> dict:
+    with _lock:
+        snap = {kind: dict(st) for kind, st in _stats.items()}
+    out = {}
+    for kind, st in snap.items():
+        total = st["hits"] + st["misses"]
+        out[kind] = {**st, "hit_rate": (round(st["hits"] / total, 4) if total else None)}
+    out["tools"]["size"] = len(_tools or {})
+    out["categories"]["size"] = len(_cats or {})
+    out["tags"]["size"] = len(_tags_by_id)
+    return out
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlmodel import Session
+
+from app.settings import settings
+from app.services import vector_index
+from app.services.vector_index import Hit
+
+
+# Text -> image retrieval: CLIP text embedding of the query ranked against the item
+# embedding index, optionally blended with FTS bm25 ("hybrid").
+
+_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_cache_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "encodes": 0}
+
+
+def _norm_query(text: str) -> str:
+    return " ".join((text or "").split()).lower()
+
+
+def encode_query(text: str) -> np.ndarray:
+    """
+    CLIP text embedding for a search string, memoized in a small LRU
+    (SEMANTIC_QUERY_CACHE_SIZE entries). Returned arrays are read-only.
+    """
+    from app.services.classify import _encode_texts
+
+    key = _norm_query(text)
+    with _cache_lock:
+        v = _cache.get(key)
+        if v is not None:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return v
+        _stats["misses"] += 1
+
+    v = _encode_texts([key])[0].astype(np.float32)
+    v.setflags(write=False)
+    _stats["encodes"] += 1
+
+    with _cache_lock:
+        _cache[key] = v
+        _cache.move_to_end(key)
+        while len(_cache) > max(1, int(settings.semantic_query_cache_size)):
+            _cache.popitem(last=False)
+    return v
+
+
+def vector_hits(
+    session: Session,
+    model_key: str,
+    query_vec: np.ndarray,
+    category_id: Optional[str] = None,
+    tool_id: Optional[str] = None,
+    include_deleted: bool = False,
+) -> List[Hit]:
+    return vector_index.search(
+        session, model_key, query_vec,
+        k=int(settings.semantic_max_results),
+        category_id=category_id, tool_id=tool_id, include_deleted=include_deleted,
+    )
+
+
+def _minmax(xs: Dict[str, float]) -> Dict[str, float]:
+    if not xs:
+        return {}
+    lo, hi = min(xs.values()), max(xs.values())
+    if hi - lo <= 1e-12:
+        return {k: 1.0 for k in xs}
+    return {k: (v - lo) / (hi - lo) for k, v in xs.items()}
+
+
+def blend(
+    session: Session,
+    model_key: str,
+    query_vec: np.ndarray,
+    hits: List[Hit],
+    bm25: Dict[str, float],
+    alpha: Optional[float] = None,
+) -> List[Hit]:
+    """
+    Hybrid ranking over the union of vector and FTS candidates:
+      score = alpha * minmax(cosine) + (1 - alpha) * minmax(-bm25)
+    (SQLite bm25 is "lower is better"). FTS-only candidates get their cosine from the
+    index when they have an embedding; a side that did not return an item contributes 0.
+    """
+    a = float(settings.semantic_hybrid_alpha if alpha is None else alpha)
+
+    cos = {h.item_id: h.score for h in hits}
+    idx = vector_index.get_index(session, model_key)
+    if idx is not None:
+        q = np.asarray(query_vec, dtype=np.float32)
+        q = q / max(float(np.linalg.norm(q)), 1e-12)
+        for iid in bm25:
+            if iid not in cos:
+                v = idx.get_vector(iid)
+                if v is not None:
+                    cos[iid] = float(v @ q)
+
+    vs = _minmax(cos)
+    ts = _minmax({k: -v for k, v in bm25.items()})
+    ids = list(dict.fromkeys([h.item_id for h in hits] + list(bm25)))
+    scored = [Hit(item_id=i, score=a * vs.get(i, 0.0) + (1.0 - a) * ts.get(i, 0.0)) for i in ids]
+    scored.sort(key=lambda h: h.score, reverse=True)
+    return scored
+
+
+def cache_stats() -> dict:
+    total = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "size": len(_cache),
+        "capacity": int(settings.semantic_query_cache_size),
+        "hit_rate": (round(_stats["hits"] / total, 4) if total else None),
+    }
@@ -6,6 +6,8 @@ import hashlib
 
 from fastapi import UploadFile
 
+from app.services import file_stat
+
 DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # 200MB
 
 
@@ -51,6 +53,7 @@ def safe_unlink(p: Optional[Path]) -> None:
             p.unlink()
     except Exception:
         pass
+    file_stat.forget_path(p)
 
 
 def safe_rmdir_empty(p: Optional[Path]) -> None:
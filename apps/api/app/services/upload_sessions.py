@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+from app.models import UploadSession
+from app.services import ingest
+from app.settings import settings
+from app.util.errors import raise_api_error
+from app.util.ids import new_id
+
+
+# Resumable chunked uploads (POST /items/uploads, PUT .../{id}?offset=N, POST .../finalize).
+#
+# A session announces the file size and the item meta up front. The client then PUTs
+# byte ranges as raw bodies, in any order and in parallel; each one is written with
+# os.pwrite straight into <storage>/.staging/uploads/<id>.part through a small
+# write-behind buffer (never a whole chunk in memory). Received ranges are merged into
+# the session row, so after a dropped connection GET tells the client what is missing.
+#
+# The sha256 advances over the contiguous prefix as it grows (bytes just written, read
+# back from the page cache), so finalize only hashes what arrived last. Hash state lives
+# in memory; after a restart it is rebuilt from the part file when next needed.
+# Finalize hands the part file to item creation (routes/items.py), which renames it into
+# place or links media already stored with the same sha256.
+#
+# Finalize claims the session first (open -> finalizing, a conditional UPDATE), so only
+# one request creates the item. Chunk writes register while they stream: a claim with a
+# write in flight is given back (UPLOAD_BUSY), and a write that finds the session claimed
+# is refused, so nothing lands in the part file once it is being hashed and moved.
+#
+# Sessions expire upload_session_ttl_hours after their last chunk (sweep()).
+
+_WRITE_BUFFER = 1024 * 1024
+_HASH_BLOCK = 4 * 1024 * 1024
+SUBDIR = "uploads"
+
+_lock = threading.Lock()
+_hashes: Dict[str, "_HashState"] = {}
+_writers: Dict[str, int] = {}  # upload id -> chunk writes streaming right now
+_stats = {
+    "created": 0, "chunks": 0, "bytes": 0, "hashed_bytes": 0, "finalized": 0, "aborted": 0, "expired": 0,
+    "finalize_conflicts": 0,
+}
+
+
+class _HashState:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.sha = hashlib.sha256()
+        self.upto = 0
+
+
+def _bump(**kw: int) -> None:
+    with _lock:
+        for k, v in kw.items():
+            _stats[k] += v
+
+
+def part_path(upload_id: str) -> Path:
+    return settings.storage_root / ingest.STAGING_DIR / SUBDIR / f"{upload_id}.part"
+
+
+def ranges(up: UploadSession) -> List[List[int]]:
+    return json.loads(up.received_json or "[]")
+
+
+def received_bytes(up: UploadSession) -> int:
+    return sum(e - s for s, e in ranges(up))
+
+
+def missing(up: UploadSession, limit: int = 20) -> List[List[int]]:
+    """
+    Up to `limit` [start, end) gaps still to be sent.
+    """
+    out: List[List[int]] = []
+    pos = 0
+    for s, e in ranges(up) + [[up.size, up.size]]:
+        if s > pos:
+            out.append([pos, s])
+            if len(out) >= limit:
+                break
+        pos = max(pos, e)
+    return out
+
+
+def _merge(rs: List[List[int]], start: int, end: int) -> List[List[int]]:
+    out: List[List[int]] = []
+    for s, e in sorted(rs + [[start, end]]):
+        if out and s <= out[-1][1]:
+            out[-1][1] = max(out[-1][1], e)
+        else:
+            out.append([s, e])
+    return out
+
+
+def _prefix_end(up: UploadSession) -> int:
+    rs = ranges(up)
+    return rs[0][1] if rs and rs[0][0] == 0 else 0
+
+
+def create(session: Session, *, filename: str, content_type: Optional[str], size: int,
+           sha256: Optional[str], meta_json: str) -> UploadSession:
+    if size > settings.upload_session_max_bytes:
+        raise_api_error(413, "FILE_TOO_LARGE", f"file too large (>{settings.upload_session_max_bytes} bytes)",
+                        {"size": size})
+    now = datetime.utcnow()
+    up = UploadSession(
+        id=new_id(),
+        filename=filename,
+        content_type=content_type,
+        size=size,
+        sha256=(sha256.lower() if sha256 else None),
+        meta_json=meta_json,
+        created_at=now,
+        updated_at=now,
+        expires_at=now + timedelta(hours=settings.upload_session_ttl_hours),
+    )
+    p = part_path(up.id)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    with p.open("wb") as f:
+        f.truncate(size)  # sparse: chunks land at their offsets
+    session.add(up)
+    session.commit()
+    session.refresh(up)
+    _bump(created=1)
+    return up
+
+
+def get(session: Session, upload_id: str) -> UploadSession:
+    up = session.get(UploadSession, upload_id)
+    if not up:
+        raise_api_error(404, "UPLOAD_NOT_FOUND", "Upload session not found", {"upload_id": upload_id})
+    if up.status == "open" and up.expires_at < datetime.utcnow():
+        raise_api_error(410, "UPLOAD_EXPIRED", "Upload session expired", {"upload_id": upload_id})
+    return up
+
+
+def _writer(upload_id: str, delta: int) -> None:
+    with _lock:
+        n = _writers.get(upload_id, 0) + delta
+        if n > 0:
+            _writers[upload_id] = n
+        else:
+            _writers.pop(upload_id, None)
+
+
+def _check_open(up: UploadSession) -> None:
+    if up.status != "open":
+        raise_api_error(409, "UPLOAD_FINALIZED", "Upload session is already finalized", {
+            "upload_id": up.id, "status": up.status,
+        })
+
+
+async def write_chunk(session: Session, upload_id: str, offset: int, body: AsyncIterator[bytes]) -> UploadSession:
+    """
+    Writes a request body at `offset` of the part file and records the range.
+    """
+    up = get(session, upload_id)
+    _check_open(up)
+    if offset < 0 or offset >= up.size:
+        raise_api_error(416, "CHUNK_OUT_OF_RANGE", "offset is outside the announced size",
+                        {"offset": offset, "size": up.size})
+    size = up.size
+
+    # registered before the status is read again: either this write sees a claim made
+    # meanwhile, or claim() sees this write (see the module comment)
+    _writer(upload_id, 1)
+    try:
+        session.refresh(up)
+        _check_open(up)
+        session.rollback()  # no read transaction held while the body streams in
+        return await _write_registered(session, upload_id, offset, size, body)
+    finally:
+        _writer(upload_id, -1)
+
+
+async def _write_registered(
+    session: Session, upload_id: str, offset: int, size: int, body: AsyncIterator[bytes],
+) -> UploadSession:
+    fd = os.open(part_path(upload_id), os.O_WRONLY)
+    pos = offset
+    buf = bytearray()
+    try:
+        async for piece in body:
+            if pos + len(buf) + len(piece) > size:
+                raise_api_error(416, "CHUNK_OUT_OF_RANGE", "chunk runs past the announced size",
+                                {"offset": offset, "size": size})
+            buf += piece
+            if len(buf) >= _WRITE_BUFFER:
+                await run_in_threadpool(os.pwrite, fd, bytes(buf), pos)
+                pos += len(buf)
+                buf.clear()
+        if buf:
+            await run_in_threadpool(os.pwrite, fd, bytes(buf), pos)
+            pos += len(buf)
+    finally:
+        os.close(fd)
+
+    up = session.get(UploadSession, upload_id)
+    if pos > offset:
+        up.received_json = json.dumps(_merge(ranges(up), offset, pos), separators=(",", ":"))
+        up.updated_at = datetime.utcnow()
+        up.expires_at = up.updated_at + timedelta(hours=settings.upload_session_ttl_hours)
+        session.add(up)
+        session.commit()
+        session.refresh(up)
+        _bump(chunks=1, bytes=pos - offset)
+        await run_in_threadpool(_advance_hash, upload_id, _prefix_end(up))
+    return up
+
+
+def _advance_hash(upload_id: str, end: int):
+    with _lock:
+        st = _hashes.setdefault(upload_id, _HashState())
+    with st.lock:
+        if st.upto < end:
+            with part_path(upload_id).open("rb") as f:
+                f.seek(st.upto)
+                while st.upto < end:
+                    block = f.read(min(_HASH_BLOCK, end - st.upto))
+                    if not block:
+                        break
+                    st.sha.update(block)
+                    st.upto += len(block)
+                    _bump(hashed_bytes=len(block))
+        return st.sha.copy()
+
+
+def finish_hash(up: UploadSession) -> str:
+    """
+    sha256 of the complete part file (only the not yet hashed tail is read).
+    """
+    return _advance_hash(up.id, up.size).hexdigest()
+
+
+def _forget(upload_id: str) -> None:
+    with _lock:
+        _hashes.pop(upload_id, None)
+
+
+def claim(session: Session, up: UploadSession) -> bool:
+    """
+    Takes the session for finalizing (open -> finalizing). False if another request has it,
+    it is done, or a chunk is still being written (the claim is given back then).
+    """
+    res = session.exec(
+        text("UPDATE upload_sessions SET status = 'finalizing', updated_at = :now WHERE id = :id AND status = 'open'"),
+        params={"id": up.id, "now": datetime.utcnow()},
+    )
+    session.commit()
+    won = res.rowcount == 1
+    if won:
+        with _lock:
+            busy = _writers.get(up.id, 0) > 0
+        if busy:
+            release(session, up)
+            won = False
+    session.refresh(up)
+    if not won:
+        _bump(finalize_conflicts=1)
+    return won
+
+
+def release(session: Session, up: UploadSession) -> None:
+    """
+    Gives a claimed session back (finalizing -> open), e.g. when finalize failed.
+    """
+    session.rollback()
+    session.exec(
+        text("UPDATE upload_sessions SET status = 'open' WHERE id = :id AND status = 'finalizing'"),
+        params={"id": up.id},
+    )
+    session.commit()
+
+
+def finalized(session: Session, up: UploadSession, item_id: str) -> None:
+    """
+    Marks the session done; the caller's commit makes it so together with the item rows.
+    """
+    up.status = "done"
+    up.item_id = item_id
+    up.updated_at = datetime.utcnow()
+    session.add(up)
+    _forget(up.id)
+    _bump(finalized=1)
+
+
+def abort(session: Session, up: UploadSession) -> None:
+    if up.status == "finalizing":
+        raise_api_error(409, "UPLOAD_FINALIZING", "Upload is being finalized", {"upload_id": up.id})
+    session.delete(up)
+    session.commit()
+    part_path(up.id).unlink(missing_ok=True)
+    _forget(up.id)
+    _bump(aborted=1)
+
+
+def sweep(session: Session, startup: bool = False) -> int:
+    """
+    Drops expired open sessions (and their part files) and done sessions past their TTL.
+    At startup no finalize is in flight, so claims a crash left behind go back to open.
+    """
+    exists = session.exec(
+        text("SELECT name FROM sqlite_master WHERE type='table' AND name='upload_sessions' LIMIT 1")
+    ).first()
+    if not exists:
+        return 0  # not migrated yet
+    if startup:
+        session.exec(text("UPDATE upload_sessions SET status = 'open' WHERE status = 'finalizing'"))
+    now = datetime.utcnow()
+    rows = session.exec(
+        select(UploadSession).where(UploadSession.expires_at < now, UploadSession.status != "finalizing")
+    ).all()
+    for up in rows:
+        part_path(up.id).unlink(missing_ok=True)
+        _forget(up.id)
+        session.delete(up)
+    session.commit()
+    _bump(expired=len(rows))
+    return len(rows)
+
+
+def stats() -> dict:
+    with _lock:
+        out = dict(_stats)
+        out["hashing"] = len(_hashes)
+    return out
@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlmodel import Session, select
+
+from app.models import Item, ItemEmbedding
+
+
+# In-memory exact (brute-force) similarity index over item_embeddings, one per model_key.
+#
+# Rows are L2-normalized float32 vectors in a growable (capacity, d) matrix, with
+# parallel arrays for the filterable item fields (category, tool, is_deleted).
+# A search is one mat-vec product over the live rows + argpartition.
+#
+# Keeping it in sync:
+#   - first use loads every embedding of the model_key (+ item fields) in one pass
+#   - every search first runs an incremental sync: embeddings created and items
+#     updated since the last sync (minus a small overlap, for transactions that
+#     committed late) are upserted. All item writes bump items.updated_at, so this
+#     also picks up category/tool/trash changes.
+#   - purges call remove(); removed rows are tombstoned and compacted lazily.
+
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+@dataclass
+class Hit:
+    item_id: str
+    score: float
+
+
+class VectorIndex:
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = int(dim)
+        self.n = 0
+        self.ids: List[Optional[str]] = []
+        self.row_of: Dict[str, int] = {}
+        self.emb_created: Dict[str, datetime] = {}
+        self.vecs = np.zeros((capacity, self.dim), dtype=np.float32)
+        self.cat = np.zeros((capacity,), dtype=np.int32)
+        self.tool = np.zeros((capacity,), dtype=np.int32)
+        self.deleted = np.zeros((capacity,), dtype=bool)
+        self.alive = np.zeros((capacity,), dtype=bool)
+        self._codes: Dict[Optional[str], int] = {None: 0}
+        self.lock = threading.RLock()
+
+    # ---- storage ----
+
+    def _code(self, value: Optional[str]) -> int:
+        c = self._codes.get(value)
+        if c is None:
+            c = self._codes[value] = len(self._codes)
+        return c
+
+    def _grow(self, need: int) -> None:
+        cap = self.vecs.shape[0]
+        if need <= cap:
+            return
+        new_cap = max(need, cap + cap // 2)
+        for name in ("vecs", "cat", "tool", "deleted", "alive"):
+            old = getattr(self, name)
+            arr = np.zeros((new_cap,) + old.shape[1:], dtype=old.dtype)
+            arr[: self.n] = old[: self.n]
+            setattr(self, name, arr)
+
+    def upsert(
+        self,
+        item_ids: Sequence[str],
+        vecs: np.ndarray,
+        category_ids: Sequence[Optional[str]],
+        tool_ids: Sequence[Optional[str]],
+        is_deleted: Sequence[bool],
+    ) -> None:
+        m = np.asarray(vecs, dtype=np.float32).reshape(len(item_ids), self.dim)
+        norms = np.linalg.norm(m, axis=1, keepdims=True)
+        norms[norms <= 0.0] = 1.0
+        m = m / norms
+        with self.lock:
+            new_rows = [iid for iid in item_ids if iid not in self.row_of]
+            self._grow(self.n + len(new_rows))
+            for iid in new_rows:
+                self.row_of[iid] = self.n
+                self.ids.append(iid)
+                self.n += 1
+            rows = np.fromiter((self.row_of[iid] for iid in item_ids), dtype=np.int64, count=len(item_ids))
+            self.vecs[rows] = m
+            self.cat[rows] = [self._code(c) for c in category_ids]
+            self.tool[rows] = [self._code(t) for t in tool_ids]
+            self.deleted[rows] = np.asarray(is_deleted, dtype=bool)
+            self.alive[rows] = True
+
+    def update_fields(self, item_id: str, category_id: Optional[str], tool_id: Optional[str], is_deleted: bool) -> bool:
+        with self.lock:
+            r = self.row_of.get(item_id)
+            if r is None:
+                return False
+            self.cat[r] = self._code(category_id)
+            self.tool[r] = self._code(tool_id)
+            self.deleted[r] = bool(is_deleted)
+            return True
+
+    def remove(self, item_ids: Iterable[str]) -> int:
+        removed = 0
+        with self.lock:
+            for iid in item_ids:
+                r = self.row_of.pop(iid, None)
+                if r is None:
+                    continue
+                self.alive[r] = False
+                self.ids[r] = None
+                self.emb_created.pop(iid, None)
+                removed += 1
+            if self.n and (self.n - len(self.row_of)) > max(1024, self.n // 4):
+                self._compact()
+        return removed
+
+    def _compact(self) -> None:
+        keep = np.flatnonzero(self.alive[: self.n])
+        for name in ("vecs", "cat", "tool", "deleted", "alive"):
+            arr = getattr(self, name)
+            arr[: keep.size] = arr[keep]
+            arr[keep.size : self.n] = 0
+        self.ids = [self.ids[r] for r in keep]
+        self.row_of = {iid: i for i, iid in enumerate(self.ids)}
+        self.n = int(keep.size)
+
+    @property
+    def size(self) -> int:
+        return len(self.row_of)
+
+    def get_vector(self, item_id: str) -> Optional[np.ndarray]:
+        with self.lock:
+            r = self.row_of.get(item_id)
+            return None if r is None else self.vecs[r].copy()
+
+    # ---- query ----
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 20,
+        category_id: Optional[str] = None,
+        tool_id: Optional[str] = None,
+        include_deleted: bool = False,
+        exclude_ids: Sequence[str] = (),
+    ) -> List[Hit]:
+        """
+        Exact top-k by cosine similarity among live rows matching the filters.
+        """
+        q = np.asarray(query, dtype=np.float32).reshape(-1)
+        if q.shape[0] != self.dim:
+            raise ValueError(f"query dim {q.shape[0]} != index dim {self.dim}")
+        nq = float(np.linalg.norm(q))
+        if nq <= 0.0:
+            return []
+        q = q / nq
+
+        with self.lock:
+            n = self.n
+            if n == 0:
+                return []
+            mask = self.alive[:n].copy()
+            if not include_deleted:
+                mask &= ~self.deleted[:n]
+            if category_id is not None:
+                code = self._codes.get(category_id)
+                if code is None:
+                    return []
+                mask &= self.cat[:n] == code
+            if tool_id is not None:
+                code = self._codes.get(tool_id)
+                if code is None:
+                    return []
+                mask &= self.tool[:n] == code
+            for iid in exclude_ids:
+                r = self.row_of.get(iid)
+                if r is not None:
+                    mask[r] = False
+
+            cand = np.flatnonzero(mask)
+            if cand.size == 0:
+                return []
+            # unfiltered: scan everything; selective filters: only the matching rows
+            if cand.size > n // 2:
+                scores = self.vecs[:n] @ q
+                scores[~mask] = -np.inf
+                idx = np.arange(n)
+            else:
+                scores = self.vecs[cand] @ q
+                idx = cand
+
+            k = min(int(k), int(cand.size))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [Hit(item_id=self.ids[idx[i]], score=float(scores[i])) for i in top]
+
+
+_indexes: Dict[str, VectorIndex] = {}
+_sync_marks: Dict[str, datetime] = {}
+_lock = threading.Lock()
+_stats = {"full_loads": 0, "syncs": 0, "synced_vectors": 0, "synced_fields": 0, "removed": 0, "searches": 0}
+
+
+def _load_vectors(session: Session, model_key: str, item_ids: Optional[List[str]] = None):
+    stmt = (
+        select(
+            ItemEmbedding.item_id,
+            ItemEmbedding.dim,
+            ItemEmbedding.vector_blob,
+            ItemEmbedding.created_at,
+            Item.category_id,
+            Item.tool_id,
+            Item.is_deleted,
+        )
+        .join(Item, Item.id == ItemEmbedding.item_id)
+        .where(ItemEmbedding.model_key == model_key)
+    )
+    if item_ids is not None:
+        if not item_ids:
+            return []
+        out = []
+        for i in range(0, len(item_ids), 500):
+            out += session.exec(stmt.where(ItemEmbedding.item_id.in_(item_ids[i : i + 500]))).all()
+        return out
+    return session.exec(stmt).all()
+
+
+def _apply_rows(idx: Optional[VectorIndex], rows, batch: int = 4096) -> Optional[VectorIndex]:
+    # rows: (item_id, dim, blob, created_at, category_id, tool_id, is_deleted)
+    for i in range(0, len(rows), batch):
+        chunk = rows[i : i + batch]
+        if idx is None and chunk:
+            # headroom so new uploads don't immediately trigger a full-matrix copy
+            idx = VectorIndex(dim=int(chunk[0][1]), capacity=len(rows) + max(1024, len(rows) // 8))
+        good = [r for r in chunk if r[2] and int(r[1]) == idx.dim and len(r[2]) == idx.dim * 4]
+        if not good:
+            continue
+        m = np.frombuffer(b"".join(r[2] for r in good), dtype=np.float32).reshape(len(good), idx.dim)
+        idx.upsert([r[0] for r in good], m, [r[4] for r in good], [r[5] for r in good], [bool(r[6]) for r in good])
+        for r in good:
+            idx.emb_created[r[0]] = r[3]
+    return idx
+
+
+def _sync(session: Session, model_key: str) -> Optional[VectorIndex]:
+    now = datetime.utcnow()
+    with _lock:
+        idx = _indexes.get(model_key)
+        mark = _sync_marks.get(model_key)
+
+        if idx is None:
+            idx = _apply_rows(None, _load_vectors(session, model_key))
+            _stats["full_loads"] += 1
+            if idx is None:
+                return None  # nothing embedded yet; retry on next call
+            _indexes[model_key] = idx
+            _sync_marks[model_key] = now
+            return idx
+
+        since = mark - SYNC_OVERLAP
+        # new / replaced embeddings
+        fresh = session.exec(
+            select(ItemEmbedding.item_id, ItemEmbedding.created_at).where(
+                ItemEmbedding.model_key == model_key, ItemEmbedding.created_at >= since
+            )
+        ).all()
+        need = {iid for iid, created in fresh if idx.emb_created.get(iid) != created}
+
+        # item field changes (category / tool / trash); unknown ids may have a new embedding
+        changed = session.exec(
+            select(Item.id, Item.category_id, Item.tool_id, Item.is_deleted).where(Item.updated_at >= since)
+        ).all()
+        for iid, cid, tid, deleted in changed:
+            if iid in need:
+                continue
+            if idx.update_fields(iid, cid, tid, bool(deleted)):
+                _stats["synced_fields"] += 1
+            else:
+                need.add(iid)
+
+        if need:
+            rows = _load_vectors(session, model_key, sorted(need))
+            _apply_rows(idx, rows)
+            _stats["synced_vectors"] += len(rows)
+        _sync_marks[model_key] = now
+        _stats["syncs"] += 1
+        return idx
+
+
+def get_index(session: Session, model_key: str) -> Optional[VectorIndex]:
+    """
+    The (synced) index for model_key, or None if no item has an embedding yet.
+    """
+    return _sync(session, model_key)
+
+
+def search(
+    session: Session,
+    model_key: str,
+    query: np.ndarray,
+    k: int = 20,
+    category_id: Optional[str] = None,
+    tool_id: Optional[str] = None,
+    include_deleted: bool = False,
+    exclude_ids: Sequence[str] = (),
+) -> List[Hit]:
+    idx = _sync(session, model_key)
+    _stats["searches"] += 1
+    if idx is None:
+        return []
+    return idx.search(
+        query, k=k, category_id=category_id, tool_id=tool_id,
+        include_deleted=include_deleted, exclude_ids=exclude_ids,
+    )
+
+
+def remove(item_ids: Iterable[str]) -> None:
+    """
+    Drop purged items from every loaded index.
+    """
+    ids = [i for i in item_ids if i]
+    if not ids:
+        return
+    with _lock:
+        indexes = list(_indexes.values())
+    for idx in indexes:
+        _stats["removed"] += idx.remove(ids)
+
+
+def invalidate_all() -> None:
+    with _lock:
+        _indexes.clear()
+        _sync_marks.clear()
+
+
+def stats() -> dict:
+    with _lock:
+        sizes = {k: {"vectors": v.size, "dim": v.dim, "rows": v.n} for k, v in _indexes.items()}
+    return {**_stats, "indexes": sizes}
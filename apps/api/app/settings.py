@@ -15,6 +15,12 @@ class Settings:
     # DB - 使用项目内 .data 目录（被 gitignore 忽略，但本地保留）
     database_url: str = _env("DATABASE_URL", "sqlite:///./.data/prompt-gallery-app.db")
 
+    # SQLite connection profile (both prompt-gallery-app.db and library.db, see app/util/sqlite.py)
+    sqlite_busy_timeout_ms: int = int(_env("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    sqlite_mmap_size_mb: int = int(_env("SQLITE_MMAP_SIZE_MB", "256"))
+    sqlite_cache_size_mb: int = int(_env("SQLITE_CACHE_SIZE_MB", "64"))  # per connection
+    sqlite_pool_size: int = int(_env("SQLITE_POOL_SIZE", "8"))  # warm connections kept per database
+
     # Storage - 使用项目内 .data 目录
     storage_root: Path = Path(_env("STORAGE_ROOT", "./.data/prompt-gallery-storage")).resolve()
 
@@ -47,5 +53,54 @@ class Settings:
         "portrait,face,headshot,beauty,model,character,close-up,closeup,macro portrait"
     ))
 
+    # --- CLIP image encoding (batched) ---
+    clip_batch_size: int = int(_env("CLIP_BATCH_SIZE", "16"))
+    clip_batch_wait_ms: int = int(_env("CLIP_BATCH_WAIT_MS", "20"))  # how long a batch waits to fill up
+    clip_torch_threads: int = int(_env("CLIP_TORCH_THREADS", "0"))  # 0 = torch default
+    clip_preprocess_workers: int = int(_env("CLIP_PREPROCESS_WORKERS", "4"))
+
+    # --- Semantic (CLIP text -> image) search ---
+    semantic_query_cache_size: int = int(_env("SEMANTIC_QUERY_CACHE_SIZE", "256"))
+    semantic_max_results: int = int(_env("SEMANTIC_MAX_RESULTS", "1000"))  # ranked candidates per query
+    semantic_hybrid_alpha: float = float(_env("SEMANTIC_HYBRID_ALPHA", "0.7"))  # weight of the vector score
+
+    # --- GET /items response cache (see services/items_cache.py); 0 disables ---
+    items_cache_mb: float = float(_env("ITEMS_CACHE_MB", "32"))
+
+    # --- Cached file-existence checks for listing pages (see services/file_stat.py) ---
+    file_stat_ttl_sec: float = float(_env("FILE_STAT_TTL_SEC", "300"))  # 0 disables caching
+    file_stat_cache_size: int = int(_env("FILE_STAT_CACHE_SIZE", "200000"))  # paths
+
+    # --- Background jobs (upload post-processing) ---
+    # 0 = run post-processing inline in the request (old behaviour)
+    job_workers: int = int(_env("JOB_WORKERS", "1"))
+    job_poll_interval_sec: float = float(_env("JOB_POLL_INTERVAL_SEC", "1.0"))
+    job_max_attempts: int = int(_env("JOB_MAX_ATTEMPTS", "3"))
+
+    # --- FTS ---
+    fts_rebuild_chunk_size: int = int(_env("FTS_REBUILD_CHUNK_SIZE", "5000"))  # items per transaction
+
+    # --- Resumable chunked uploads (see services/upload_sessions.py) ---
+    upload_session_max_bytes: int = int(_env("UPLOAD_SESSION_MAX_BYTES", str(20 * 1024**3)))
+    upload_session_ttl_hours: float = float(_env("UPLOAD_SESSION_TTL_HOURS", "24"))  # since the last chunk
+    upload_chunk_size_mb: int = int(_env("UPLOAD_CHUNK_SIZE_MB", "8"))  # suggested to clients
+
+    # --- Thumbnails and grid renditions (see services/thumbs.py) ---
+    thumb_renditions: str = _env("THUMB_RENDITIONS", "256,512,1024")  # widths, comma-separated; "" for the thumb only
+    thumb_formats: str = _env("THUMB_FORMATS", "webp,jpeg")  # in srcset preference order
+    thumb_quality: int = int(_env("THUMB_QUALITY", "80"))  # renditions; the 768px thumb stays at 85
+    image_max_pixels: int = int(_env("IMAGE_MAX_PIXELS", "120000000"))  # decompression-bomb cap; 0 keeps PIL's default
+
+    # --- Reuse of thumb/poster/pHash/embeddings across uploads of the same bytes (see services/artifacts.py) ---
+    artifact_reuse: bool = _env("ARTIFACT_REUSE", "true").lower() in ("1", "true", "yes")
+
+    # --- Near-duplicate search on perceptual hashes (see services/phash_index.py) ---
+    phash_max_distance: int = int(_env("PHASH_MAX_DISTANCE", "4"))  # default Hamming radius of scope=phash
+    phash_max_bucket: int = int(_env("PHASH_MAX_BUCKET", "4096"))  # band buckets larger than this are skipped
+
+    # --- Purge of trashed items (see services/purge.py) ---
+    purge_chunk_size: int = int(_env("PURGE_CHUNK_SIZE", "2000"))  # items per transaction (write lock held meanwhile)
+    purge_file_workers: int = int(_env("PURGE_FILE_WORKERS", "8"))  # threads unlinking files
+
 
 settings = Settings()
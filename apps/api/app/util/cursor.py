@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import base64
+import json
+
+
+def encode_cursor(payload: dict) -> str:
+    """
+    Opaque pagination cursor: urlsafe base64 of a compact JSON payload (no padding).
+    """
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    Inverse of encode_cursor. Raises ValueError on anything malformed.
+    """
+    try:
+        s = (cursor or "").strip()
+        raw = base64.urlsafe_b64decode(s + "=" * (-len(s) % 4))
+        payload = json.loads(raw.decode("utf-8"))
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {e}")
+    if not isinstance(payload, dict):
+        raise ValueError("invalid cursor: payload must be an object")
+    return payload
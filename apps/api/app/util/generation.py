@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import re
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Global data generation: a counter bumped after every committed transaction that wrote
+# to a table the gallery reads (items, versions, tags, series, categories, tools, ...).
+# Read caches remember the generation they were filled at and are stale once it moves.
+#
+# Bumping is wired into the engine (install()), so every write path is covered: routes,
+# the background job runner, maintenance and raw SQL alike. Writes
+# are spotted from the statement text; the bump happens once the connection goes back
+# to the pool (or starts its next transaction), i.e. after the commit is visible.
+#
+# Only the SQLAlchemy engine is watched: writes through a raw DBAPI connection must call
+# bump() themselves.
+
+# tables that never show up in gallery reads (job bookkeeping, embeddings, purge outbox)
+IGNORED_TABLES = frozenset({"jobs", "alembic_version", "item_embeddings", "category_embeddings", "purge_files", "upload_sessions"})
+
+_WRITE_RE = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+[\"`\[]?(\w+)",
+    re.IGNORECASE,
+)
+
+_lock = threading.Lock()
+_generation = 0
+_bumps = 0
+
+
+def current() -> int:
+    return _generation
+
+
+def bump() -> int:
+    global _generation, _bumps
+    with _lock:
+        _generation += 1
+        _bumps += 1
+        return _generation
+
+
+def _is_data_write(statement: str) -> bool:
+    m = _WRITE_RE.match(statement)
+    return bool(m) and m.group(1).lower() not in IGNORED_TABLES
+
+
+def install(engine: Engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _on_execute(conn, _cursor, statement, _params, _context, _executemany):
+        if _is_data_write(statement):
+            conn.info["gen_dirty"] = True
+
+    @event.listens_for(engine, "commit")
+    def _on_commit(conn):
+        # fires just before the DBAPI commit: only remember it here
+        if conn.info.pop("gen_dirty", False):
+            conn.info["gen_committed"] = True
+
+    @event.listens_for(engine, "rollback")
+    def _on_rollback(conn):
+        conn.info.pop("gen_dirty", None)
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn):
+        if conn.info.pop("gen_committed", False):
+            bump()
+
+    @event.listens_for(engine.pool, "checkin")
+    def _on_checkin(_dbapi_conn, record):
+        if record is not None and record.info.pop("gen_committed", False):
+            bump()
+
+
+def stats() -> dict:
+    return {"generation": _generation, "bumps": _bumps}
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from app.settings import settings
+
+
+# Connection profile shared by both SQLite databases (prompt-gallery-app.db through the
+# SQLAlchemy engine, library.db through ConnectionPool below):
+#
+#   journal_mode=WAL        readers no longer block on (or get blocked by) the writer
+#   synchronous=NORMAL      fsync at checkpoints only; safe with WAL (no corruption, the
+#                           last commits may be lost on power failure)
+#   busy_timeout            writers queue up instead of failing with "database is locked"
+#   mmap_size / cache_size  keep hot pages in memory across requests
+#   temp_store=MEMORY       sorts / temp b-trees for ORDER BY, GROUP BY, DISTINCT
+#
+# journal_mode is persistent (stored in the db file); the rest is per connection, which
+# is why connections are pooled and kept warm instead of opened per request.
+
+
+def pragmas() -> list[str]:
+    return [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}",
+        f"PRAGMA mmap_size={int(settings.sqlite_mmap_size_mb) * 1024 * 1024}",
+        f"PRAGMA cache_size={-int(settings.sqlite_cache_size_mb) * 1024}",  # negative = KiB
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def is_file_url(url: str) -> bool:
+    return url.startswith("sqlite") and ":memory:" not in url and url.rstrip("/") not in ("sqlite:", "sqlite+pysqlite:")
+
+
+def apply_pragmas(dbapi_conn) -> None:
+    cur = dbapi_conn.cursor()
+    try:
+        for p in pragmas():
+            cur.execute(p)
+    finally:
+        cur.close()
+
+
+class ConnectionPool:
+    """
+    Warm sqlite3 connections for one database file.
+
+    connection() checks one out (opening a new one when all are in use) and returns it
+    afterwards; anything left uncommitted is rolled back, as closing would have done.
+    At most `size` idle connections are kept.
+    """
+
+    def __init__(self, path: str, size: int, row_factory=sqlite3.Row):
+        self.path = path
+        self.size = max(0, int(size))
+        self.row_factory = row_factory
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._stats = {"opened": 0, "reused": 0, "discarded": 0}
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,  # handed between request threads, one at a time
+            timeout=int(settings.sqlite_busy_timeout_ms) / 1000.0,
+        )
+        apply_pragmas(conn)
+        conn.row_factory = self.row_factory
+        with self._lock:
+            self._stats["opened"] += 1
+        return conn
+
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            return self._open()
+        with self._lock:
+            self._stats["reused"] += 1
+        return conn
+
+    def _checkin(self, conn: sqlite3.Connection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = self.row_factory  # callers may have changed it
+        except sqlite3.Error:
+            conn.close()
+            return
+        if self._idle.qsize() >= self.size:
+            conn.close()
+            with self._lock:
+                self._stats["discarded"] += 1
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "idle": self._idle.qsize(), "size": self.size, "path": self.path}
+
+
+_pools: dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path: str, size: Optional[int] = None) -> ConnectionPool:
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(path, settings.sqlite_pool_size if size is None else size)
+        return pool
+
+
+def pool_stats() -> list[dict]:
+    with _pools_lock:
+        return [p.stats() for p in _pools.values()]
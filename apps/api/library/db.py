@@ -6,6 +6,9 @@ from pathlib import Path
 from contextlib import contextmanager
 from typing import Generator
 
+from app.util.cursor import decode_cursor
+from app.util.sqlite import apply_pragmas, get_pool
+
 # 数据库路径：.data/library/library.db
 LIBRARY_DB_PATH = Path(".data/library/library.db")
 
@@ -15,6 +18,7 @@ def init_db():
     LIBRARY_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
     
     conn = sqlite3.connect(str(LIBRARY_DB_PATH))
+    apply_pragmas(conn)  # switches the file to WAL (persistent)
     cursor = conn.cursor()
     
     # Assets table
@@ -90,6 +94,9 @@ def init_db():
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_faces_asset ON face_instances(asset_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_faces_person ON face_instances(person_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_faces_bucket ON face_instances(bucket)")
+    # Keyset pagination: ORDER BY created_at DESC, id DESC
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_assets_created_id ON assets(created_at, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_people_created_id ON people(created_at, id)")
     
     conn.commit()
     conn.close()
@@ -98,15 +105,20 @@ def init_db():
 
 @contextmanager
 def get_db() -> Generator[sqlite3.Connection, None, None]:
-    """Get database connection with row factory"""
-    conn = sqlite3.connect(str(LIBRARY_DB_PATH))
-    conn.row_factory = sqlite3.Row
-    try:
+    """Get a pooled database connection (WAL, row factory); uncommitted work is rolled back"""
+    with get_pool(str(LIBRARY_DB_PATH)).connection() as conn:
         yield conn
-    finally:
-        conn.close()
 
 
 def dict_from_row(row: sqlite3.Row) -> dict:
     """Convert sqlite3.Row to dict"""
     return {key: row[key] for key in row.keys()}
+
+
+def parse_keyset_cursor(cursor: str) -> tuple[int, str]:
+    """(created_at, id) of a keyset cursor, encode_cursor({"c": created_at, "i": id}); raises ValueError if malformed"""
+    payload = decode_cursor(cursor)
+    try:
+        return int(payload["c"]), str(payload["i"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("invalid cursor: not a keyset cursor")
@@ -64,6 +64,7 @@ class PersonRefDTO(BaseModel):
 
 class ListResponse(BaseModel):
     items: List[Any]
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
@@ -1,15 +1,20 @@
 """
 Assets routes - /library/assets/* endpoints
 """
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query
-from typing import Optional
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, Request
+from typing import Callable, List, Optional
 import time
 import hashlib
 from pathlib import Path
 import uuid
 import shutil
 
-from library.db import get_db, dict_from_row
+from sqlmodel import Session
+
+from app.db import engine
+from app.services import artifacts, ingest
+from app.util.cursor import encode_cursor
+from library.db import get_db, dict_from_row, parse_keyset_cursor
 from library.models import AssetDTO, ListResponse
 
 router = APIRouter(prefix="/library/assets")
@@ -39,9 +44,25 @@ def list_assets(
     kind: Optional[str] = None,
     q: Optional[str] = None,
     page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100)
+    page_size: int = Query(20, ge=1, le=100),
+    next_cursor: Optional[str] = Query(None, alias="cursor"),
+    with_total: Optional[int] = Query(None, ge=0, le=1),
 ):
-    """List assets with optional filters"""
+    """
+    List assets with optional filters
+
+    Pass next_cursor back as ?cursor= to page by keyset instead of OFFSET.
+    The total count is skipped by default in cursor mode (with_total=1 forces it).
+    """
+    if with_total is None:
+        with_total = 0 if next_cursor else 1
+    after = None
+    if next_cursor:
+        try:
+            after = parse_keyset_cursor(next_cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     with get_db() as conn:
         cursor = conn.cursor()
         
@@ -57,20 +78,29 @@ def list_assets(
             query += " AND (filename LIKE ? OR source LIKE ?)"
             params.extend([f"%{q}%", f"%{q}%"])
         
-        query += " ORDER BY created_at DESC"
-        
         #  Count total
-        count_query = query.replace("SELECT *", "SELECT COUNT(*)")
-        cursor.execute(count_query, params)
-        total = cursor.fetchone()[0]
+        total = None
+        if with_total:
+            count_query = query.replace("SELECT *", "SELECT COUNT(*)")
+            cursor.execute(count_query, params)
+            total = cursor.fetchone()[0]
         
-        # Paginate
-        offset = (page - 1) * page_size
-        query += f" LIMIT ? OFFSET ?"
-        params.extend([page_size, offset])
+        # Paginate (one extra row tells whether a next page exists)
+        if after:
+            query += " AND (created_at, id) < (?, ?)"
+            params.extend(after)
+        query += " ORDER BY created_at DESC, id DESC"
+        if after:
+            query += " LIMIT ?"
+            params.append(page_size + 1)
+        else:
+            query += " LIMIT ? OFFSET ?"
+            params.extend([page_size + 1, (page - 1) * page_size])
         
         cursor.execute(query, params)
         rows = cursor.fetchall()
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
         
         items = [AssetDTO(**dict_from_row(row)) for row in rows]
         
@@ -78,39 +108,40 @@ def list_assets(
             "items": items,
             "total": total,
             "page": page,
-            "page_size": page_size
+            "page_size": page_size,
+            "next_cursor": encode_cursor({"c": rows[-1]["created_at"], "i": rows[-1]["id"]}) if has_more else None,
         }
 
 
-@router.post("/upload")
-async def upload_asset(
-    file: UploadFile = File(...),
-    kind: Optional[str] = Form(None),
-    source: Optional[str] = Form(None)
-):
-    """Upload a new asset"""
+def _gallery_copies(sha256_hex: str) -> List[Path]:
+    """Gallery media with these bytes: hard-linked instead of storing another copy"""
+    with Session(engine) as s:
+        return artifacts.gallery_media(s, sha256_hex)
+
+
+def _create_asset(
+    filename: str,
+    kind: Optional[str],
+    source: Optional[str],
+    sha256_hex: str,
+    save: Callable[[Path], None],
+    on_duplicate: Callable[[], None] = lambda: None,
+) -> AssetDTO:
+    """
+    Records an upload whose sha256 is known: returns the existing asset for a duplicate
+    (on_duplicate() runs, nothing is stored), else save()s the original and inserts the row.
+    """
     # Generate ID and paths
     asset_id = generate_asset_id()
     asset_dir = STORAGE_ROOT / "assets" / asset_id
-    asset_dir.mkdir(parents=True, exist_ok=True)
     
-    # Save original file
-    ext = Path(file.filename).suffix
+    # Original file name
+    ext = Path(filename).suffix
     original_path = asset_dir / f"original{ext}"
     
-    with original_path.open("wb") as f:
-        shutil.copyfileobj(file.file, f)
-    
-    # Compute SHA256
-    sha256 = hashlib.sha256()
-    with original_path.open("rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            sha256.update(chunk)
-    sha256_hex = sha256.hexdigest()
-    
     # Detect kind if not provided
     if not kind:
-        kind = detect_kind(file.filename)
+        kind = detect_kind(filename)
     
     # Create asset record
     created_at = int(time.time())
@@ -128,15 +159,18 @@ async def upload_asset(
         existing = cursor.fetchone()
         
         if existing:
-            # File already exists, return existing asset (clean up newly created directory)
-            import shutil as sh
-            sh.rmtree(asset_dir, ignore_errors=True)
+            # File already exists, return existing asset (nothing was written for it)
+            on_duplicate()
             return AssetDTO(**dict_from_row(existing))
         
+        # Save original file
+        asset_dir.mkdir(parents=True, exist_ok=True)
+        save(original_path)
+        
         cursor.execute("""
             INSERT INTO assets (id, sha256, kind, filename, source, storage_path, created_at)
             VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (asset_id, sha256_hex, kind, file.filename, source or "Upload", relative_path, created_at))
+        """, (asset_id, sha256_hex, kind, filename, source or "Upload", relative_path, created_at))
         conn.commit()
     
     
@@ -144,13 +178,60 @@ async def upload_asset(
         id=asset_id,
         sha256=sha256_hex,
         kind=kind,
-        filename=file.filename,
+        filename=filename,
         source=source or "Upload",
         storage_path=relative_path,
         created_at=created_at
     )
 
 
+@router.post("/upload")
+async def upload_asset(
+    file: UploadFile = File(...),
+    kind: Optional[str] = Form(None),
+    source: Optional[str] = Form(None)
+):
+    """Upload a new asset (multipart; large files: PUT /upload)"""
+    # Compute SHA256 before anything is stored, so a duplicate is never written
+    sha256 = hashlib.sha256()
+    for chunk in iter(lambda: file.file.read(1024 * 1024), b""):
+        sha256.update(chunk)
+    file.file.seek(0)
+    sha256_hex = sha256.hexdigest()
+
+    def save(dst: Path) -> None:
+        if ingest.link_stored(dst, _gallery_copies(sha256_hex)):
+            return
+        with dst.open("wb") as f:
+            shutil.copyfileobj(file.file, f)
+
+    return _create_asset(file.filename, kind, source, sha256_hex, save)
+
+
+@router.put("/upload")
+async def upload_asset_raw(
+    request: Request,
+    filename: str = Query(..., min_length=1),
+    kind: Optional[str] = Query(None),
+    source: Optional[str] = Query(None),
+):
+    """
+    Upload a new asset as the raw request body
+
+    The body is written next to the assets and hashed while received, then renamed
+    into place (see app.services.ingest): no spool file, no second read or copy.
+    """
+    staged = await ingest.receive(request.stream(), STORAGE_ROOT)
+    try:
+        return _create_asset(
+            filename, kind, source, staged.sha256,
+            lambda dst: ingest.place(staged, dst, _gallery_copies(staged.sha256)),
+            lambda: ingest.skipped(staged),
+        )
+    finally:
+        staged.close()  # no-op once placed
+
+
 @router.get("/{asset_id}")
 def get_asset(asset_id: str):
     """Get asset details"""
@@ -5,6 +5,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from library.db import get_db
+from library.services import face_index
 
 router = APIRouter(prefix="/library/faces")
 
@@ -54,8 +55,9 @@ def exclude_face(face_id: str, req: ExcludeRequest):
         
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail="Face not found")
-        
-        return {"ok": True, "excluded": req.excluded}
+    
+    face_index.set_excluded(face_id, req.excluded)
+    return {"ok": True, "excluded": req.excluded}
 
 
 @router.post("/people/{person_id}/refs")
@@ -5,6 +5,7 @@ from fastapi import APIRouter
 import logging
 
 from library.services.face_processor import process_all_person_assets
+from library.services import face_index
 
 logger = logging.getLogger(__name__)
 
@@ -34,3 +35,23 @@ def process_faces():
             "status": "error",
             "message": str(e)
         }
+
+
+@router.get("/face-index")
+def face_index_stats():
+    """Face matching index status (size, IVF cells, snapshot loads)"""
+    return face_index.stats()
+
+
+@router.post("/face-index/rebuild")
+def face_index_rebuild():
+    """
+    Rebuild the face matching index from the DB and rewrite its snapshot
+    
+    Needed after editing face_instances outside the API (e.g. clear_faces.py)
+    while the server is running.
+    """
+    face_index.invalidate()
+    face_index.get_index()
+    face_index.save_snapshot(force=True)
+    return face_index.stats()
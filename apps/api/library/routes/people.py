@@ -4,7 +4,8 @@ People routes - /library/people/* endpoints
 from fastapi import APIRouter, HTTPException, Query
 from typing import Optional
 
-from library.db import get_db, dict_from_row
+from app.util.cursor import encode_cursor
+from library.db import get_db, dict_from_row, parse_keyset_cursor
 from library.models import PersonDTO
 
 router = APIRouter(prefix="/library/people")
@@ -15,9 +16,25 @@ def list_people(
     status: Optional[str] = None,
     q: Optional[str] = None,
     page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100)
+    page_size: int = Query(20, ge=1, le=100),
+    next_cursor: Optional[str] = Query(None, alias="cursor"),
+    with_total: Optional[int] = Query(None, ge=0, le=1),
 ):
-    """List people with optional filters"""
+    """
+    List people with optional filters
+
+    Pass next_cursor back as ?cursor= to page by keyset instead of OFFSET.
+    The total count is skipped by default in cursor mode (with_total=1 forces it).
+    """
+    if with_total is None:
+        with_total = 0 if next_cursor else 1
+    after = None
+    if next_cursor:
+        try:
+            after = parse_keyset_cursor(next_cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     with get_db() as conn:
         cursor = conn.cursor()
         
@@ -32,20 +49,30 @@ def list_people(
             query += " AND name LIKE ?"
             params.append(f"%{q}%")
         
-        query += " ORDER BY created_at DESC"
-        
         # Count total
-        count_query = query.replace("SELECT *", "SELECT COUNT(*)")
-        cursor.execute(count_query, params)
-        total = cursor.fetchone()[0]
-        
-        # Paginate
-        offset = (page - 1) * page_size
-        query += f" LIMIT ? OFFSET ?"
-        params.extend([page_size, offset])
+        total = None
+        if with_total:
+            count_query = query.replace("SELECT *", "SELECT COUNT(*)")
+            cursor.execute(count_query, params)
+            total = cursor.fetchone()[0]
+        
+        # Paginate (one extra row tells whether a next page exists)
+        if after:
+            query += " AND (created_at, id) < (?, ?)"
+            params.extend(after)
+        query += " ORDER BY created_at DESC, id DESC"
+        if after:
+            query += " LIMIT ?"
+            params.append(page_size + 1)
+        else:
+            query += " LIMIT ? OFFSET ?"
+            params.extend([page_size + 1, (page - 1) * page_size])
         
         cursor.execute(query, params)
         rows = cursor.fetchall()
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        next_cursor = encode_cursor({"c": rows[-1]["created_at"], "i": rows[-1]["id"]}) if has_more else None
         
         items = []
         for row in rows:
@@ -74,7 +101,8 @@ def list_people(
             "items": items,
             "total": total,
             "page": page,
-            "page_size": page_size
+            "page_size": page_size,
+            "next_cursor": next_cursor,
         }
 
 
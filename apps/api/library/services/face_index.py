@@ -0,0 +1,386 @@
+"""
+In-memory face matching index (replaces the per-face full-table scan)
+
+- All usable face embeddings (person assigned, not excluded) live in one contiguous
+  float32 matrix, L2-normalized, so matching a new face is one mat-vec product
+- Above FACE_INDEX_IVF_MIN faces an IVF layer (spherical k-means, sqrt(N) cells) is
+  trained; a query then only scans the FACE_INDEX_NPROBE closest cells
+- A snapshot (.npz) is written after ingest runs / on shutdown and reused at startup
+  when the DB fingerprint still matches; otherwise the index is rebuilt from the DB
+"""
+import os
+import threading
+import time
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from library.db import get_db
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = Path(".data/library/face_index.npz")
+
+IVF_MIN = int(os.environ.get("FACE_INDEX_IVF_MIN", "200000"))  # exact search below this many faces
+NPROBE = int(os.environ.get("FACE_INDEX_NPROBE", "16"))
+
+EMBED_DTYPE = np.float64  # face_instances.embedding is stored as float64 bytes (Facenet512)
+
+
+class FaceIndex:
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self.n = 0
+        self.face_ids: List[Optional[str]] = []
+        self.row_of: Dict[str, int] = {}
+        self.persons: List[Optional[str]] = []
+        self.vecs = np.zeros((capacity, dim), dtype=np.float32)
+        self.alive = np.zeros((capacity,), dtype=bool)
+        # IVF layer (None = exact search)
+        self.centroids: Optional[np.ndarray] = None
+        self.assign = np.zeros((capacity,), dtype=np.int32)
+        self.cells: List[np.ndarray] = []
+        self.cell_extra: List[List[int]] = []
+        self.trained_n = 0
+
+    # ---- storage ----
+
+    def _grow(self, need: int) -> None:
+        cap = self.vecs.shape[0]
+        if need <= cap:
+            return
+        new_cap = max(need, cap + cap // 2)
+        for name in ("vecs", "alive", "assign"):
+            old = getattr(self, name)
+            arr = np.zeros((new_cap,) + old.shape[1:], dtype=old.dtype)
+            arr[: self.n] = old[: self.n]
+            setattr(self, name, arr)
+
+    def add(self, face_ids: Sequence[str], person_ids: Sequence[str], vecs: np.ndarray) -> None:
+        m = np.asarray(vecs, dtype=np.float32).reshape(len(face_ids), self.dim)
+        norms = np.linalg.norm(m, axis=1, keepdims=True)
+        norms[norms <= 0.0] = 1.0
+        m = m / norms
+
+        self._grow(self.n + len(face_ids))
+        start = self.n
+        for fid, pid in zip(face_ids, person_ids):
+            self.row_of[fid] = self.n
+            self.face_ids.append(fid)
+            self.persons.append(pid)
+            self.n += 1
+        self.vecs[start : self.n] = m
+        self.alive[start : self.n] = True
+
+        if self.centroids is not None:
+            cells = np.argmax(m @ self.centroids.T, axis=1)
+            self.assign[start : self.n] = cells
+            for r, c in zip(range(start, self.n), cells):
+                self.cell_extra[c].append(r)
+
+    def remove(self, face_id: str) -> bool:
+        r = self.row_of.pop(face_id, None)
+        if r is None:
+            return False
+        self.alive[r] = False
+        return True
+
+    @property
+    def size(self) -> int:
+        return len(self.row_of)
+
+    # ---- IVF ----
+
+    def train_ivf(self, nlist: Optional[int] = None, iters: int = 8, seed: int = 0) -> None:
+        n = self.n
+        if n == 0:
+            return
+        nlist = int(nlist or max(16, int(np.sqrt(n))))
+        rng = np.random.default_rng(seed)
+        live = np.flatnonzero(self.alive[:n])
+        sample = live if live.size <= nlist * 64 else rng.choice(live, nlist * 64, replace=False)
+        x = self.vecs[sample]
+        cent = x[rng.choice(x.shape[0], min(nlist, x.shape[0]), replace=False)].copy()
+        for _ in range(iters):
+            a = np.argmax(x @ cent.T, axis=1)
+            sums = np.zeros_like(cent)
+            np.add.at(sums, a, x)
+            counts = np.bincount(a, minlength=cent.shape[0])
+            empty = counts == 0
+            sums[empty] = x[rng.choice(x.shape[0], int(empty.sum()))]
+            cent = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+        self.centroids = cent.astype(np.float32)
+        self._assign_all()
+
+    def _assign_all(self, chunk: int = 65536) -> None:
+        n = self.n
+        for s in range(0, n, chunk):
+            e = min(n, s + chunk)
+            self.assign[s:e] = np.argmax(self.vecs[s:e] @ self.centroids.T, axis=1)
+        order = np.argsort(self.assign[:n], kind="stable")
+        bounds = np.searchsorted(self.assign[:n][order], np.arange(self.centroids.shape[0] + 1))
+        self.cells = [order[bounds[c] : bounds[c + 1]] for c in range(self.centroids.shape[0])]
+        self.cell_extra = [[] for _ in range(self.centroids.shape[0])]
+        self.trained_n = n
+
+    def maybe_train(self) -> None:
+        if self.size < IVF_MIN:
+            return
+        # (re)train when the index has doubled since the last training
+        if self.centroids is None or self.n > 2 * max(1, self.trained_n):
+            t0 = time.perf_counter()
+            self.train_ivf()
+            logger.info(f"Face index IVF trained: {self.centroids.shape[0]} cells over {self.n} faces in {time.perf_counter() - t0:.1f}s")
+
+    # ---- query ----
+
+    def match(self, vec: np.ndarray, threshold: float) -> Optional[Tuple[str, float]]:
+        """
+        Nearest stored face by cosine similarity; returns (person_id, score) if score > threshold.
+        """
+        q = np.asarray(vec, dtype=np.float32).reshape(-1)
+        if self.n == 0 or q.shape[0] != self.dim:
+            return None
+        nq = float(np.linalg.norm(q))
+        if nq == 0.0:
+            return None
+        q = q / nq
+
+        if self.centroids is None:
+            scores = self.vecs[: self.n] @ q
+            scores[~self.alive[: self.n]] = -np.inf
+            r = int(np.argmax(scores))
+            best = float(scores[r])
+        else:
+            probe = np.argsort(-(self.centroids @ q))[: max(1, NPROBE)]
+            rows = np.concatenate(
+                [self.cells[c] for c in probe] + [np.asarray(self.cell_extra[c], dtype=np.int64) for c in probe]
+            )
+            rows = rows[self.alive[rows]]
+            if rows.size == 0:
+                return None
+            scores = self.vecs[rows] @ q
+            i = int(np.argmax(scores))
+            r, best = int(rows[i]), float(scores[i])
+
+        if best > threshold:
+            return self.persons[r], best
+        return None
+
+    # ---- snapshot ----
+
+    def save(self, path: Path, fingerprint: tuple) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        live = np.flatnonzero(self.alive[: self.n])
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp,
+            vecs=self.vecs[live],
+            face_ids=np.asarray([self.face_ids[r] for r in live], dtype=object),
+            persons=np.asarray([self.persons[r] for r in live], dtype=object),
+            centroids=(self.centroids if self.centroids is not None else np.zeros((0, self.dim), np.float32)),
+            fingerprint=np.asarray(fingerprint, dtype=np.int64),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Tuple["FaceIndex", tuple]:
+        with np.load(path, allow_pickle=True) as z:
+            vecs = z["vecs"]
+            idx = cls(dim=int(vecs.shape[1]), capacity=vecs.shape[0] + max(1024, vecs.shape[0] // 8))
+            n = vecs.shape[0]
+            idx.vecs[:n] = vecs  # already normalized
+            idx.alive[:n] = True
+            idx.face_ids = list(z["face_ids"])
+            idx.persons = list(z["persons"])
+            idx.row_of = {f: i for i, f in enumerate(idx.face_ids)}
+            idx.n = n
+            if z["centroids"].shape[0]:
+                idx.centroids = z["centroids"]
+                idx._assign_all()
+            return idx, tuple(int(x) for x in z["fingerprint"])
+
+
+# ---- module-level singleton ----
+
+_index: Optional[FaceIndex] = None
+_dirty = False  # in-memory index differs from the snapshot on disk
+_lock = threading.RLock()
+_stats = {"matches": 0, "hits": 0, "loads_snapshot": 0, "loads_db": 0, "snapshots_saved": 0}
+
+
+def _fingerprint(conn) -> tuple:
+    """
+    Cheap DB state summary, to validate a snapshot:
+    (usable faces, max rowid, excluded faces, distinct persons)
+    """
+    try:
+        row = conn.execute("""
+            SELECT
+                SUM(CASE WHEN excluded = 0 AND person_id IS NOT NULL THEN 1 ELSE 0 END),
+                MAX(rowid),
+                SUM(CASE WHEN excluded = 1 THEN 1 ELSE 0 END),
+                COUNT(DISTINCT person_id)
+            FROM face_instances
+            WHERE embedding IS NOT NULL
+        """).fetchone()
+    except Exception:
+        # face_instances.embedding missing (migrate_add_embedding not run yet)
+        return (0, 0, 0, 0)
+    return tuple(int(x or 0) for x in row)
+
+
+def _load_from_db(conn, batch: int = 8192) -> Optional[FaceIndex]:
+    try:
+        total = conn.execute("SELECT COUNT(*) FROM face_instances WHERE embedding IS NOT NULL").fetchone()[0]
+        cursor = conn.execute("""
+            SELECT id, person_id, embedding
+            FROM face_instances
+            WHERE embedding IS NOT NULL
+            AND person_id IS NOT NULL
+            AND excluded = 0
+            ORDER BY rowid
+        """)
+    except Exception:
+        return None
+
+    # streamed: the float64 blobs are twice the size of the index itself
+    idx: Optional[FaceIndex] = None
+    while True:
+        chunk = [r for r in cursor.fetchmany(batch) if r[2]]
+        if not chunk:
+            break
+        if idx is None:
+            dim = len(chunk[0][2]) // np.dtype(EMBED_DTYPE).itemsize
+            idx = FaceIndex(dim=dim, capacity=total + max(1024, total // 8))
+        good = [r for r in chunk if len(r[2]) == idx.dim * np.dtype(EMBED_DTYPE).itemsize]
+        if not good:
+            continue
+        m = np.frombuffer(b"".join(r[2] for r in good), dtype=EMBED_DTYPE).reshape(len(good), idx.dim)
+        idx.add([r[0] for r in good], [r[1] for r in good], m)
+    return idx
+
+
+def get_index() -> Optional[FaceIndex]:
+    global _index
+    with _lock:
+        if _index is not None:
+            return _index
+        t0 = time.perf_counter()
+        with get_db() as conn:
+            fp = _fingerprint(conn)
+            if INDEX_PATH.exists():
+                try:
+                    idx, snap_fp = FaceIndex.load(INDEX_PATH)
+                    if snap_fp == fp:
+                        _index = idx
+                        _stats["loads_snapshot"] += 1
+                        logger.info(f"Face index loaded from snapshot: {idx.size} faces in {time.perf_counter() - t0:.2f}s")
+                        return _index
+                except Exception as e:
+                    logger.warning(f"Face index snapshot unreadable, rebuilding: {e}")
+            _index = _load_from_db(conn)
+        if _index is not None:
+            _index.maybe_train()
+            _stats["loads_db"] += 1
+            logger.info(f"Face index built from DB: {_index.size} faces in {time.perf_counter() - t0:.2f}s")
+        return _index
+
+
+def find_match(embedding: bytes, threshold: float) -> Optional[str]:
+    if not embedding:
+        return None
+    vec = np.frombuffer(embedding, dtype=EMBED_DTYPE)
+    with _lock:
+        idx = get_index()
+        _stats["matches"] += 1
+        res = idx.match(vec, threshold) if idx is not None else None
+    if res is None:
+        return None
+    _stats["hits"] += 1
+    person_id, score = res
+    logger.info(f"Found match: person {person_id} with similarity {score:.3f}")
+    return person_id
+
+
+def add_faces(rows: Sequence[Tuple[str, str, bytes]]) -> None:
+    """
+    Register committed faces (face_id, person_id, embedding bytes).
+    """
+    global _dirty
+    rows = [r for r in rows if r[1] and r[2]]
+    if not rows:
+        return
+    with _lock:
+        if _index is None:
+            # first faces ever (or not loaded yet): build from the DB, which already has them
+            get_index()
+            _dirty = True
+            return
+        size = _index.dim * np.dtype(EMBED_DTYPE).itemsize
+        rows = [r for r in rows if len(r[2]) == size and r[0] not in _index.row_of]
+        if not rows:
+            return
+        m = np.frombuffer(b"".join(r[2] for r in rows), dtype=EMBED_DTYPE).reshape(len(rows), _index.dim)
+        _index.add([r[0] for r in rows], [r[1] for r in rows], m)
+        _index.maybe_train()
+        _dirty = True
+
+
+def set_excluded(face_id: str, excluded: bool) -> None:
+    """
+    Keep the index in line with /library/faces/{id}/exclude.
+    """
+    global _dirty
+    with _lock:
+        if _index is None:
+            return
+        if excluded:
+            _dirty = _index.remove(face_id) or _dirty
+            return
+        if face_id in _index.row_of:
+            return
+        with get_db() as conn:
+            row = conn.execute(
+                "SELECT id, person_id, embedding FROM face_instances WHERE id = ?", (face_id,)
+            ).fetchone()
+    if row is not None:
+        add_faces([(row[0], row[1], row[2])])
+
+
+def invalidate() -> None:
+    """
+    Drop the in-memory index; the next match reloads (snapshot if still valid, else DB).
+    """
+    global _index, _dirty
+    with _lock:
+        _index = None
+        _dirty = False
+
+
+def save_snapshot(force: bool = False) -> bool:
+    global _dirty
+    with _lock:
+        if _index is None or not (_dirty or force):
+            return False
+        with get_db() as conn:
+            fp = _fingerprint(conn)
+        _index.save(INDEX_PATH, fp)
+        _dirty = False
+        _stats["snapshots_saved"] += 1
+        return True
+
+
+def stats() -> dict:
+    idx = _index
+    return {
+        **_stats,
+        "loaded": idx is not None,
+        "faces": (idx.size if idx else 0),
+        "ivf_cells": (int(idx.centroids.shape[0]) if idx is not None and idx.centroids is not None else 0),
+        "nprobe": NPROBE,
+        "ivf_min": IVF_MIN,
+        "snapshot": str(INDEX_PATH),
+    }
@@ -14,6 +14,7 @@ from typing import List, Optional
 
 from library.db import get_db, dict_from_row
 from library.services.face_detector import detect_faces_simple, save_face_crop, extract_face_embedding
+from library.services import face_index
 import numpy as np
 
 logger = logging.getLogger(__name__)
@@ -57,6 +58,9 @@ def find_matching_person(embedding: bytes, threshold: float = 0.6) -> Optional[s
     """
     Find existing person with similar face embedding
     
+    Matches against the in-memory face index (nearest stored face, see
+    library.services.face_index) instead of scanning face_instances.
+    
     Args:
         embedding: Face embedding bytes to match
         threshold: Similarity threshold (default 0.6)
@@ -64,43 +68,7 @@ def find_matching_person(embedding: bytes, threshold: float = 0.6) -> Optional[s
     Returns:
         person_id if match found, None otherwise
     """
-    if not embedding:
-        return None
-    
-    embedding_array = np.frombuffer(embedding, dtype=np.float64)
-    
-    with get_db() as conn:
-        cursor = conn.cursor()
-        
-        # Get all people with at least one embedding
-        cursor.execute("""
-            SELECT DISTINCT person_id, embedding 
-            FROM face_instances 
-            WHERE embedding IS NOT NULL
-            AND person_id IS NOT NULL
-            AND excluded = 0
-        """)
-        
-        best_match = None
-        best_similarity = threshold
-        
-        for row in cursor.fetchall():
-            person_id = row[0]
-            stored_embedding_bytes = row[1]
-            
-            if not stored_embedding_bytes:
-                continue
-            
-            stored_embedding = np.frombuffer(stored_embedding_bytes, dtype=np.float64)
-            
-            similarity = cosine_similarity(embedding_array, stored_embedding)
-            
-            if similarity > best_similarity:
-                best_similarity = similarity
-                best_match = person_id
-                logger.info(f"Found match: person {person_id} with similarity {similarity:.3f}")
-        
-        return best_match
+    return face_index.find_match(embedding, threshold)
 
 
 def process_asset_for_faces(asset_id: str, asset_path: str) -> int:
@@ -127,6 +95,7 @@ def process_asset_for_faces(asset_id: str, asset_path: str) -> int:
     
     created_at = int(time.time())
     faces_created = 0
+    indexed = []  # (face_id, person_id, embedding) registered with the face index after commit
     
     with get_db() as conn:
         cursor = conn.cursor()
@@ -219,9 +188,13 @@ def process_asset_for_faces(asset_id: str, asset_path: str) -> int:
             ))
             
             faces_created += 1
+            if embedding_bytes:
+                indexed.append((face_id, person_id, embedding_bytes))
         
         conn.commit()
     
+    face_index.add_faces(indexed)
+    
     logger.info(f"Created {faces_created} person(s) from asset {asset_id}")
     return faces_created
 
@@ -278,4 +251,7 @@ def process_all_person_assets():
         except Exception as e:
             logger.error(f"Failed to process asset {asset_id}: {e}")
     
+    if processed:
+        face_index.save_snapshot()
+    
     return processed
@@ -2,5 +2,5 @@ from app.db import session_scope
 from app.services.fts import fts_rebuild_all
 
 with session_scope() as s:
-    n = fts_rebuild_all(s)
-    print("fts rebuilt:", n)
+    res = fts_rebuild_all(s, reindex=True)
+    print("fts rebuilt:", res["documents"], f"({res['rows_per_sec']} rows/s)")
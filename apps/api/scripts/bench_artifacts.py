@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark upload post-processing (services/item_pipeline.py) for new bytes vs a re-upload
+of bytes already processed (services/artifacts.py: thumb/poster/pHash/embeddings reused).
+
+Uploads --uploads distinct photos of --size pixels through POST /items (JOB_WORKERS=0, so
+processing runs inline), then the same files again, and reports the per-upload processing
+time of both rounds (the "run" duration of the job rows) plus the artifact stats.
+CLIP encoding is only part of the saving when open_clip is installed.
+
+Usage:
+  python scripts/bench_artifacts.py [--uploads 20] [--size 4000x3000]
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--uploads", type=int, default=20)
+    ap.add_argument("--size", default="4000x3000")
+    args = ap.parse_args()
+    w, h = (int(x) for x in args.size.split("x"))
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_artifacts_"))
+    # must be set before app.settings is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{(tmp / 'bench.db').as_posix()}"
+    os.environ["STORAGE_ROOT"] = str(tmp / "storage")
+    os.environ["JOB_WORKERS"] = "0"
+
+    import numpy as np
+    from alembic import command
+    from alembic.config import Config
+    from fastapi.testclient import TestClient
+    from PIL import Image
+
+    from app.main import app
+    from app.services import artifacts, item_pipeline
+
+    api_root = Path(__file__).parent.parent
+    cfg = Config(str(api_root / "alembic.ini"))
+    cfg.set_main_option("script_location", str(api_root / "alembic"))
+    command.upgrade(cfg, "head")
+
+    rng = np.random.default_rng(5)
+    files = []
+    for _ in range(args.uploads):
+        # smooth gradient + noise: a photo-like JPEG, not a trivially compressible flat image
+        base = np.linspace(0, 255, w, dtype=np.float32)[None, :, None] * rng.random(3, dtype=np.float32)
+        px = np.clip(base + rng.normal(0, 12, (h, w, 3)), 0, 255).astype(np.uint8)
+        b = io.BytesIO()
+        Image.fromarray(px).save(b, "JPEG", quality=90)
+        files.append(b.getvalue())
+
+    # time just the pipeline step, not the multipart upload around it
+    spent = []
+    run = item_pipeline.run
+
+    def timed_run(session, job):
+        t = time.perf_counter()
+        run(session, job)
+        spent.append(time.perf_counter() - t)
+
+    item_pipeline.run = timed_run  # jobs looks its handlers up on every dispatch
+
+    with TestClient(app) as c:
+        tool_key = c.get("/tools").json()["items"][0]["key"]
+        for label in ("new bytes", "re-upload"):
+            spent.clear()
+            for i, data in enumerate(files):
+                meta = {"title": f"{label} {i}", "prompt_blob": "p", "tool_key": tool_key, "tags": []}
+                r = c.post("/items", files={"file": ("p.jpg", data, "image/jpeg")}, data={"meta": json.dumps(meta)})
+                assert r.status_code == 200, r.text[:300]
+            ms = sorted(x * 1000 for x in spent)
+            print(f"{label:10s} {w}x{h}: processing p50 {ms[len(ms) // 2]:7.1f}ms  mean {sum(ms) / len(ms):7.1f}ms")
+    print(f"artifacts: {artifacts.stats()}")
+
+
+if __name__ == "__main__":
+    main()
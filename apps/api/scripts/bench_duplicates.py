@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark GET /items/duplicates on a synthetic, fully migrated database.
+
+Seeds N items whose media_sha256 repeats for --dup-ratio of them (groups of 2-6, some
+across tools, a few trashed) plus their thumbnail files, then times page 1 and a cursor
+page of 200 groups:
+  - the legacy page (grouped COUNT, one item SELECT + tool lookup per group,
+    Path.resolve().exists() per file), for comparison
+  - the endpoint, with the file flags cold / warm (services/file_stat.py) and off
+
+Usage:
+  python scripts/bench_duplicates.py [--items 200000] [--dup-ratio 0.1]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=200_000)
+    ap.add_argument("--dup-ratio", type=float, default=0.1)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_dups_"))
+    storage = tmp / "storage"
+    # must be set before app.settings is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{(tmp / 'bench.db').as_posix()}"
+    os.environ["STORAGE_ROOT"] = str(storage)
+    os.environ.setdefault("JOB_WORKERS", "0")
+
+    from datetime import datetime, timedelta
+    from alembic import command
+    from alembic.config import Config
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func
+    from sqlmodel import Session, select
+
+    from app.db import engine
+    from app.main import app
+    from app.models import Item
+    from app.services import file_stat, ref_cache
+    from app.util.ids import new_id
+
+    api_root = Path(__file__).parent.parent
+    cfg = Config(str(api_root / "alembic.ini"))
+    cfg.set_main_option("script_location", str(api_root / "alembic"))
+    command.upgrade(cfg, "head")
+
+    n = args.items
+    rnd = random.Random(7)
+    print(f"seeding {n} items into {tmp} ...")
+    t0 = time.perf_counter()
+    (storage / "t").mkdir(parents=True, exist_ok=True)
+    now = datetime.utcnow()
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        tool_ids = [r[0] for r in cur.execute("SELECT id FROM tools").fetchall()]
+        cat_id = cur.execute("SELECT id FROM categories LIMIT 1").fetchone()[0]
+        rows, i, g = [], 0, 0
+        while i < n:
+            if rnd.random() < args.dup_ratio:
+                size, g = rnd.randint(2, 6), g + 1
+            else:
+                size = 1
+            sha = f"{rnd.getrandbits(256):064x}"
+            tool = rnd.choice(tool_ids)
+            for _ in range(min(size, n - i)):
+                iid = new_id()
+                at = now - timedelta(seconds=i)
+                thumb = f"t/{i}.jpg"
+                if size > 1:
+                    (storage / thumb).write_bytes(b"x")
+                rows.append((iid, f"item {i}", (tool if rnd.random() < 0.7 else rnd.choice(tool_ids)),
+                             f"m/{i}.png", thumb, cat_id, new_id(), at, at, int(rnd.random() < 0.05), sha))
+                i += 1
+        cur.executemany("INSERT INTO items (id, title, tool_id, media_type, media_path, thumb_path, category_id,"
+                        " is_category_locked, current_version_id, created_at, updated_at, is_deleted, status, media_sha256)"
+                        " VALUES (?, ?, ?, 'image', ?, ?, ?, 0, ?, ?, ?, ?, 'ready', ?)", rows)
+        raw.commit()
+    finally:
+        raw.close()
+    print(f"  seeded {g} duplicate groups in {time.perf_counter() - t0:.1f}s")
+
+    def timed(fn):
+        ts = []
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            out = fn()
+            ts.append((time.perf_counter() - t) * 1000)
+        ts.sort()
+        return ts[len(ts) // 2], out
+
+    # legacy: what list_duplicates did for page 1 (200 groups)
+    root = storage.resolve()
+
+    def legacy_page():
+        with Session(engine) as s:
+            base = select(Item).where(Item.media_sha256.is_not(None), Item.media_sha256 != "", Item.is_deleted == False)
+            sub = base.subquery()
+            g_stmt = (select(sub.c.media_sha256, func.count().label("cnt")).group_by(sub.c.media_sha256)
+                      .having(func.count() >= 2).order_by(func.count().desc(), sub.c.media_sha256.asc()))
+            s.exec(select(func.count()).select_from(g_stmt.subquery())).one()
+            out = 0
+            for sha, _cnt in s.exec(g_stmt.limit(201)).all()[:200]:
+                items = s.exec(select(Item).where(Item.media_sha256 == sha, Item.is_deleted == False)
+                               .order_by(Item.created_at.desc()).limit(12)).all()
+                for tid in sorted({it.tool_id for it in items}):
+                    ref_cache.get_tool(tid)
+                for it in items:
+                    for rel in (it.media_path, it.thumb_path):
+                        (root / rel).resolve().exists()
+                out += len(items)
+            return out
+
+    ms, _ = timed(legacy_page)
+    print(f"legacy page 1                    p50 {ms:8.1f}ms")
+
+    with TestClient(app) as c:
+        def get(**params):
+            r = c.get("/items/duplicates", params={"page_size": 200, **params})
+            assert r.status_code == 200, r.text[:300]
+            return r.json()
+
+        cursor = get(with_total=0)["next_cursor"]
+        for label, params in (
+            ("page 1", {}),
+            ("page 1, with_total=0", {"with_total": 0}),
+            ("cursor page 2", {"cursor": cursor}),
+            ("page 1, scope=media_sha256_tool", {"scope": "media_sha256_tool"}),
+        ):
+            file_stat.clear()
+            t = time.perf_counter()
+            get(**params)
+            cold = (time.perf_counter() - t) * 1000
+            warm, _ = timed(lambda: get(**params))
+            off, _ = timed(lambda: get(check_files=0, **params))
+            print(f"{label:32s} p50 {warm:8.1f}ms  (cold file flags {cold:.1f}ms, check_files=0 {off:.1f}ms)")
+        print(f"file_stat: {file_stat.stats()}")
+
+
+if __name__ == "__main__":
+    main()
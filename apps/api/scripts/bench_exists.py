@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark the pre-upload existence check (POST /items/exists, HEAD /items/by_sha256/{sha})
+and link-mode creation (POST /items with meta.media_sha256, no file part).
+
+On a throw-away DB/storage with --items items (one uploaded, the rest cloned rows with
+random media hashes):
+  - one POST /items/exists with --batch hashes, half of them stored, vs a HEAD per hash
+  - creating an item from a --mb MB video already stored: link mode vs sending it again
+Post-processing is not dispatched, so only the request path is timed.
+
+Usage:
+  python scripts/bench_exists.py [--items 200000] [--batch 5000] [--mb 100]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=200000)
+    ap.add_argument("--batch", type=int, default=5000)
+    ap.add_argument("--mb", type=int, default=100)
+    args = ap.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_exists_"))
+    # must be set before app.settings is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{(tmp / 'bench.db').as_posix()}"
+    os.environ["STORAGE_ROOT"] = str(tmp / "storage")
+    os.environ["JOB_WORKERS"] = "0"
+
+    from alembic import command
+    from alembic.config import Config
+    from fastapi.testclient import TestClient
+    from sqlalchemy import text
+
+    from app.db import engine
+    from app.main import app
+    from app.services import jobs
+    from app.util.ids import new_id
+
+    api_root = Path(__file__).parent.parent
+    cfg = Config(str(api_root / "alembic.ini"))
+    cfg.set_main_option("script_location", str(api_root / "alembic"))
+    command.upgrade(cfg, "head")
+
+    jobs.dispatch = lambda job_id: None  # request path only: leave the post-processing queued
+
+    rng = random.Random(7)
+    video = os.urandom(args.mb * 1024 * 1024)
+    with TestClient(app) as c:
+        tool_key = c.get("/tools").json()["items"][0]["key"]
+        meta = {"title": "v", "prompt_blob": "p", "tool_key": tool_key, "tags": []}
+        r = c.post("/items", files={"file": ("v.mp4", video, "video/mp4")}, data={"meta": json.dumps(meta)})
+        assert r.status_code == 200, r.text[:300]
+        video_sha = r.json()["media_sha256"]
+
+        with engine.begin() as cn:
+            row = dict(cn.execute(text("SELECT * FROM items LIMIT 1")).mappings().one())
+            cols = list(row)
+            stored = []
+            rows = []
+            for _ in range(args.items - 1):
+                sha = "%064x" % rng.getrandbits(256)
+                stored.append(sha)
+                rows.append(dict(row, id=new_id(), media_sha256=sha))
+            cn.execute(
+                text(f"INSERT INTO items ({', '.join(cols)}) VALUES ({', '.join(':' + k for k in cols)})"),
+                rows,
+            )
+
+        hits = rng.sample(stored, args.batch // 2)
+        batch = hits + ["%064x" % rng.getrandbits(256) for _ in range(args.batch - len(hits))]
+
+        t = time.perf_counter()
+        r = c.post("/items/exists", json={"sha256": batch})
+        one = time.perf_counter() - t
+        assert r.status_code == 200 and len(r.json()["found"]) == len(hits), r.text[:300]
+
+        t = time.perf_counter()
+        for sha in batch:
+            c.head(f"/items/by_sha256/{sha}")
+        each = time.perf_counter() - t
+        print(f"{args.batch} hashes vs {args.items} items: POST /items/exists {one * 1000:7.1f}ms"
+              f"  HEAD per hash {each * 1000:8.1f}ms ({each / args.batch * 1000:.2f}ms each)")
+
+        t = time.perf_counter()
+        r = c.post("/items", data={"meta": json.dumps(dict(meta, media_sha256=video_sha))})
+        linked = time.perf_counter() - t
+        assert r.status_code == 200, r.text[:300]
+        t = time.perf_counter()
+        r = c.post("/items", files={"file": ("v.mp4", video, "video/mp4")}, data={"meta": json.dumps(meta)})
+        resent = time.perf_counter() - t
+        assert r.status_code == 200, r.text[:300]
+        print(f"{args.mb}MB video already stored: link mode {linked * 1000:7.1f}ms (0MB sent)"
+              f"  upload again {resent * 1000:7.1f}ms ({args.mb}MB sent)")
+
+
+if __name__ == "__main__":
+    main()
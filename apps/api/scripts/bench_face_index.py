@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark face matching (find_matching_person) throughput.
+
+Builds a throwaway library DB with N synthetic face embeddings (clustered around
+N/8 "persons", float64 like Facenet512), then reports matches/sec for:
+  - the old per-face full-table scan (only up to --scan-max faces; it is O(N) in Python)
+  - the in-memory face index, exact
+  - the in-memory face index with IVF (when N >= --ivf-min)
+plus agreement with the exact answer, index build time and snapshot load time.
+
+Usage:
+  python scripts/bench_face_index.py [--sizes 10000,100000,1000000] [--queries 200]
+"""
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import library.db as library_db
+from library.services import face_index
+
+DIM = 512
+
+
+def _old_scan(conn, embedding: bytes, threshold: float):
+    # the pre-index find_matching_person, kept here as the baseline
+    q = np.frombuffer(embedding, dtype=np.float64)
+    best, best_sim = None, threshold
+    for person_id, blob in conn.execute("""
+        SELECT DISTINCT person_id, embedding FROM face_instances
+        WHERE embedding IS NOT NULL AND person_id IS NOT NULL AND excluded = 0
+    """):
+        v = np.frombuffer(blob, dtype=np.float64)
+        sim = float(np.dot(q, v) / (np.linalg.norm(q) * np.linalg.norm(v)))
+        if sim > best_sim:
+            best, best_sim = person_id, sim
+    return best
+
+
+def _face_rows(rng, centers, n: int, step: int = 20000):
+    # generated in chunks: 1M float64 faces are 4 GB
+    for s in range(0, n, step):
+        owner = rng.integers(0, centers.shape[0], size=min(step, n - s))
+        vecs = centers[owner] + 0.6 * rng.standard_normal((owner.size, DIM))
+        for i in range(owner.size):
+            yield f"f{s + i}", f"p{owner[i]}", vecs[i].tobytes()
+
+
+def _queries(rng, centers, count: int):
+    # half near a known person, half unrelated
+    pick = rng.integers(0, centers.shape[0], size=count)
+    q = centers[pick] + 0.6 * rng.standard_normal((count, DIM))
+    q[count // 2 :] = rng.standard_normal((count - count // 2, DIM))
+    return q
+
+
+def _rate(fn, qs):
+    t = time.perf_counter()
+    out = [fn(q) for q in qs]
+    return len(qs) / (time.perf_counter() - t), out
+
+
+def bench(n: int, queries: int, threshold: float, scan_max: int, ivf_min: int, workdir: Path) -> None:
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((max(1, n // 8), DIM))
+    qs = _queries(rng, centers, queries)
+    q_bytes = [q.astype(np.float64).tobytes() for q in qs]
+
+    db_path = workdir / f"faces_{n}.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE face_instances (id TEXT PRIMARY KEY, person_id TEXT, excluded INTEGER DEFAULT 0,
+                                     embedding BLOB, created_at INTEGER)
+    """)
+    conn.executemany(
+        "INSERT INTO face_instances (id, person_id, excluded, embedding, created_at) VALUES (?, ?, 0, ?, 0)",
+        _face_rows(rng, centers, n),
+    )
+    conn.commit()
+
+    library_db.LIBRARY_DB_PATH = db_path
+    face_index.INDEX_PATH = workdir / f"face_index_{n}.npz"
+    face_index.IVF_MIN = 1 << 62  # exact first
+    face_index.invalidate()
+
+    print(f"n={n:>9,}")
+    if n <= scan_max:
+        k = min(queries, 20)
+        rate, _ = _rate(lambda b: _old_scan(conn, b, threshold), q_bytes[:k])
+        print(f"  old full scan          {rate:10.1f} matches/s")
+
+    t = time.perf_counter()
+    idx = face_index.get_index()
+    print(f"  build from DB          {time.perf_counter() - t:10.2f} s   ({idx.size:,} faces)")
+    face_index.save_snapshot(force=True)
+    face_index.invalidate()
+    t = time.perf_counter()
+    face_index.get_index()
+    print(f"  load snapshot          {time.perf_counter() - t:10.2f} s   ({face_index.stats()['loads_snapshot']} snapshot load)")
+
+    rate, exact = _rate(lambda b: face_index.find_match(b, threshold), q_bytes)
+    print(f"  index, exact           {rate:10.1f} matches/s   ({sum(x is not None for x in exact)}/{queries} matched)")
+
+    if n >= ivf_min:
+        face_index.IVF_MIN = ivf_min
+        idx = face_index.get_index()
+        t = time.perf_counter()
+        idx.train_ivf()
+        print(f"  IVF train              {time.perf_counter() - t:10.2f} s   ({idx.centroids.shape[0]} cells, nprobe {face_index.NPROBE})")
+        rate, approx = _rate(lambda b: face_index.find_match(b, threshold), q_bytes)
+        agree = sum(a == b for a, b in zip(exact, approx)) / len(exact)
+        print(f"  index, IVF             {rate:10.1f} matches/s   (agreement with exact {agree:.1%})")
+
+    # ingest: match + register, as process_asset_for_faces does per face
+    idx = face_index.get_index()
+    new = qs.astype(np.float64)
+    t = time.perf_counter()
+    for i, b in enumerate(q_bytes):
+        pid = face_index.find_match(b, threshold) or f"pnew{i}"
+        idx.add([f"new{n}_{i}"], [pid], new[i : i + 1])
+    print(f"  ingest (match+add)     {len(q_bytes) / (time.perf_counter() - t):10.1f} faces/s")
+
+    conn.close()
+    face_index.invalidate()
+    db_path.unlink()
+    face_index.INDEX_PATH.unlink(missing_ok=True)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--threshold", type=float, default=0.6)
+    ap.add_argument("--scan-max", type=int, default=10000)
+    ap.add_argument("--ivf-min", type=int, default=face_index.IVF_MIN)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        for n in [int(x) for x in args.sizes.split(",") if x.strip()]:
+            bench(n, args.queries, args.threshold, args.scan_max, args.ivf_min, Path(d))
+
+
+if __name__ == "__main__":
+    main()
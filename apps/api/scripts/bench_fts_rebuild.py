@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark the FTS rebuild (rows/sec) on a synthetic, fully migrated database.
+
+Seeds N items (one version each, a few tags) into a throw-away DB, then times:
+  - the legacy per-item rebuild (reload item/version/tags, delete + insert, commit),
+    on a sample, for comparison
+  - fts_rebuild_all from an empty index (documents + triggers + optimize)
+  - fts_rebuild_all with nothing to change (resync only)
+  - fts_rebuild_all(reindex=True)
+
+Usage:
+  python scripts/bench_fts_rebuild.py [--items 100000] [--chunk 5000] [--legacy-sample 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=100_000)
+    ap.add_argument("--chunk", type=int, default=5000)
+    ap.add_argument("--tags", type=int, default=200, help="distinct tag names")
+    ap.add_argument("--legacy-sample", type=int, default=2000)
+    args = ap.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_fts_"))
+    # must be set before app.settings is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{(tmp / 'bench.db').as_posix()}"
+    os.environ["STORAGE_ROOT"] = str(tmp / "storage")
+
+    from datetime import datetime
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import text
+    from sqlmodel import Session, select
+
+    from app.db import engine
+    from app.models import Item, ItemVersion, ItemTag, Tag
+    from app.services.fts import fts_rebuild_all
+    from app.util.ids import new_id
+
+    api_root = Path(__file__).parent.parent
+    cfg = Config(str(api_root / "alembic.ini"))
+    cfg.set_main_option("script_location", str(api_root / "alembic"))
+    command.upgrade(cfg, "head")
+
+    print(f"seeding {args.items} items into {tmp} ...")
+    t0 = time.perf_counter()
+    now = datetime.utcnow()
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        tool_id = cur.execute("SELECT id FROM tools LIMIT 1").fetchone()[0]
+        cat_id = cur.execute("SELECT id FROM categories LIMIT 1").fetchone()[0]
+        tag_ids = [new_id() for _ in range(args.tags)]
+        cur.executemany("INSERT INTO tags (id, name, created_at) VALUES (?, ?, ?)",
+                        [(tid, f"标签{i}", now) for i, tid in enumerate(tag_ids)])
+        items, versions, links = [], [], []
+        for i in range(args.items):
+            iid, vid = new_id(), new_id()
+            items.append((iid, f"作品{i} 猫咪", tool_id, f"m/{i}.png", f"t/{i}.jpg", cat_id, vid, now, now))
+            versions.append((vid, iid, 1, f"一只可爱的猫咪在草地上 prompt {i}", now))
+            for k in range(3):
+                links.append((iid, tag_ids[(i * 7 + k * 13) % args.tags], now))
+        cur.executemany("INSERT INTO items (id, title, tool_id, media_type, media_path, thumb_path, category_id,"
+                        " is_category_locked, current_version_id, created_at, updated_at, is_deleted, status)"
+                        " VALUES (?, ?, ?, 'image', ?, ?, ?, 0, ?, ?, ?, 0, 'ready')", items)
+        cur.executemany("INSERT INTO item_versions (id, item_id, v, prompt_blob, created_at) VALUES (?, ?, ?, ?, ?)", versions)
+        cur.executemany("INSERT OR IGNORE INTO item_tags (item_id, tag_id, created_at) VALUES (?, ?, ?)", links)
+        raw.commit()
+    finally:
+        raw.close()
+    print(f"  seeded in {time.perf_counter() - t0:.1f}s (triggers included)")
+
+    with Session(engine) as s:
+        # legacy: what fts_upsert_item did for every item during a rebuild
+        ids = s.exec(select(Item.id).limit(args.legacy_sample)).all()
+        t = time.perf_counter()
+        for iid in ids:
+            s.exec(text("SELECT name FROM sqlite_master WHERE type='table' AND name='items_fts' LIMIT 1")).first()
+            it = s.get(Item, iid)
+            v = s.get(ItemVersion, it.current_version_id) if it.current_version_id else None
+            tag_ids = [r.tag_id for r in s.exec(select(ItemTag).where(ItemTag.item_id == iid)).all()]
+            names = [x.name for x in s.exec(select(Tag).where(Tag.id.in_(tag_ids))).all()] if tag_ids else []
+            # the docs row stands in for the old FTS row (same delete + insert + commit)
+            s.exec(text("DELETE FROM items_fts_docs WHERE item_id = :i"), params={"i": iid})
+            s.exec(text("INSERT INTO items_fts_docs (item_id, title, series, prompt, tags) VALUES (:i, :t, :s, :p, :g)"),
+                   params={"i": iid, "t": it.title, "s": it.series_name_snapshot or "", "p": v.prompt_blob if v else "",
+                           "g": " ".join(sorted(set(names)))})
+            s.commit()
+        dt = time.perf_counter() - t
+        print(f"legacy per-item      {len(ids) / dt:10.1f} rows/s   (sample of {len(ids)}; "
+              f"~{args.items / (len(ids) / dt):.0f}s for {args.items})")
+
+        s.exec(text("DELETE FROM items_fts_docs"))
+        s.commit()
+        res = fts_rebuild_all(s, chunk_size=args.chunk)
+        print(f"set-based, empty     {res['rows_per_sec']:10.1f} rows/s   {res['seconds']:.2f}s  {res['phases_sec']}")
+
+        res = fts_rebuild_all(s, chunk_size=args.chunk)
+        print(f"set-based, no-op     {res['rows_per_sec']:10.1f} rows/s   {res['seconds']:.2f}s  changed={res['changed']}")
+
+        res = fts_rebuild_all(s, chunk_size=args.chunk, reindex=True)
+        print(f"set-based, reindex   {res['rows_per_sec']:10.1f} rows/s   {res['seconds']:.2f}s  {res['phases_sec']}")
+
+        hits = s.exec(text("SELECT COUNT(*) FROM items_fts WHERE items_fts MATCH '\"prompt\"'")).one()[0]
+        s.exec(text("INSERT INTO items_fts(items_fts, rank) VALUES('integrity-check', 1)"))
+        print(f"index check: {hits} rows match 'prompt', integrity-check ok")
+
+
+if __name__ == "__main__":
+    main()
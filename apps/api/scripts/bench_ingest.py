@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark upload ingestion of large files: multipart (stock parser: spooled, then read
+back, hashed and copied to storage) vs raw request bodies (services/ingest.py: written
+into storage and hashed while received, renamed into place), for
+  - gallery items: POST /items vs a chunked upload (POST /items/uploads, one PUT, finalize)
+  - library assets: POST /library/assets/upload vs PUT /library/assets/upload
+
+On a throw-away DB/storage, uploads --uploads distinct --mb MB files per path, then the
+same files again (duplicates). Post-processing is not dispatched, so only ingestion is
+timed. "written"/"read" are the bytes the process passed to write()/read() syscalls
+(/proc/self/io wchar/rchar) per upload.
+
+Usage:
+  python scripts/bench_ingest.py [--uploads 5] [--mb 200]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def _io() -> dict:
+    out = {}
+    with open("/proc/self/io") as f:
+        for line in f:
+            k, v = line.split(":")
+            out[k] = int(v)
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--uploads", type=int, default=5)
+    ap.add_argument("--mb", type=int, default=200)
+    args = ap.parse_args()
+
+    api_root = Path(__file__).parent.parent.resolve()
+    tmp = Path(tempfile.mkdtemp(prefix="bench_ingest_"))
+    # must be set before app.settings is imported; the library keeps its data under ./.data
+    os.environ["DATABASE_URL"] = f"sqlite:///{(tmp / 'bench.db').as_posix()}"
+    os.environ["STORAGE_ROOT"] = str(tmp / "storage")
+    os.environ["JOB_WORKERS"] = "0"
+    os.chdir(tmp)
+
+    from alembic import command
+    from alembic.config import Config
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.services import ingest, jobs
+    from library.db import init_db as init_library_db
+
+    cfg = Config(str(api_root / "alembic.ini"))
+    cfg.set_main_option("script_location", str(api_root / "alembic"))
+    command.upgrade(cfg, "head")
+    init_library_db()
+
+    jobs.dispatch = lambda job_id: None  # ingestion only: leave the post-processing queued
+
+    payload = bytearray(os.urandom(args.mb * 1024 * 1024))
+    with TestClient(app) as c:
+        tool_key = c.get("/tools").json()["items"][0]["key"]
+        meta = {"title": "v", "prompt_blob": "p", "tool_key": tool_key, "tags": []}
+
+        def items_multipart(body: bytes) -> None:
+            r = c.post("/items", files={"file": ("v.mp4", body, "video/mp4")}, data={"meta": json.dumps(meta)})
+            assert r.status_code == 200, r.text[:300]
+
+        def items_chunked(body: bytes) -> None:
+            r = c.post("/items/uploads", json={"filename": "v.mp4", "content_type": "video/mp4", "size": len(body), "meta": meta})
+            assert r.status_code == 200, r.text[:300]
+            up = r.json()["id"]
+            r = c.put(f"/items/uploads/{up}?offset=0", content=body)
+            assert r.status_code == 200, r.text[:300]
+            r = c.post(f"/items/uploads/{up}/finalize")
+            assert r.status_code == 200, r.text[:300]
+
+        def assets_multipart(body: bytes) -> None:
+            r = c.post("/library/assets/upload", files={"file": ("v.mp4", body, "video/mp4")})
+            assert r.status_code == 200, r.text[:300]
+
+        def assets_raw(body: bytes) -> None:
+            r = c.put("/library/assets/upload?filename=v.mp4", content=body)
+            assert r.status_code == 200, r.text[:300]
+
+        seed = 0
+        for label, fn in (
+            ("POST /items (multipart)", items_multipart),
+            ("/items/uploads (raw)", items_chunked),
+            ("POST assets (multipart)", assets_multipart),
+            ("PUT assets (raw)", assets_raw),
+        ):
+            seed += args.uploads  # fresh bytes per path: no path sees another one's duplicates
+            for kind in ("new", "duplicate"):
+                ts, written, read = [], [], []
+                for i in range(args.uploads):
+                    payload[:8] = (seed + i).to_bytes(8, "little")
+                    body = bytes(payload)
+                    before, t = _io(), time.perf_counter()
+                    fn(body)
+                    ts.append(time.perf_counter() - t)
+                    after = _io()
+                    written.append(after["wchar"] - before["wchar"])
+                    read.append(after["rchar"] - before["rchar"])
+                ts.sort()
+                p50 = ts[len(ts) // 2]
+                print(f"{label:24s} {kind:9s} {args.mb}MB x{args.uploads}: p50 {p50 * 1000:7.0f}ms"
+                      f"  written {sum(written) / args.uploads / 2**20:7.1f}MB"
+                      f"  read {sum(read) / args.uploads / 2**20:7.1f}MB per upload")
+    print(f"ingest: {ingest.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Benchmark pHash near-duplicate grouping (services/phash_index.py).
+
+  1. correctness: the MIH grouping of --check random hashes (with planted near-duplicate
+     clusters) equals the connected components of the brute-force O(N^2) pair list
+  2. scale: grouping time for --items hashes at a few radii
+  3. endpoint: GET /items/duplicates?scope=phash on a throw-away DB with --items
+     items (cold = first call: full index load + grouping; warm = cached grouping)
+  4. backfill: POST /_maintenance/backfill_phash over --files generated thumbnails
+
+Usage:
+  python scripts/bench_phash.py [--items 200000] [--check 3000] [--files 500]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def synth_hashes(n: int, rng: np.random.Generator, dup_ratio: float = 0.05, max_flip: int = 4) -> np.ndarray:
+    # random 64-bit hashes; dup_ratio of them are copies of an earlier one with 0..max_flip bits flipped
+    h = rng.integers(0, 2**63, size=n, dtype=np.int64).astype(np.uint64) * np.uint64(2) + rng.integers(0, 2, size=n).astype(np.uint64)
+    dups = np.flatnonzero(rng.random(n) < dup_ratio)
+    for i in dups[dups > 0]:
+        v = int(h[rng.integers(0, i)])
+        for b in rng.choice(64, size=int(rng.integers(0, max_flip + 1)), replace=False):
+            v ^= 1 << int(b)
+        h[i] = np.uint64(v)
+    return h
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=200_000)
+    ap.add_argument("--check", type=int, default=3000)
+    ap.add_argument("--files", type=int, default=500)
+    args = ap.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_phash_"))
+    storage = tmp / "storage"
+    # must be set before app.settings is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{(tmp / 'bench.db').as_posix()}"
+    os.environ["STORAGE_ROOT"] = str(storage)
+    os.environ.setdefault("JOB_WORKERS", "0")
+
+    from app.services import phash_index
+    from app.services.phash_index import PhashIndex, _components, _popcount
+
+    rng = np.random.default_rng(11)
+
+    # 1. correctness against brute force
+    h = synth_hashes(args.check, rng)
+    for r in (0, 2, 4, 6):
+        a, b = np.triu_indices(h.size, 1)
+        near = _popcount(h[a] ^ h[b]) <= r
+        labels = _components(h.size, a[near], b[near])
+        expect = sorted(sorted(g) for g in _groups_of(labels) if len(g) >= 2)
+        idx = PhashIndex()
+        idx.upsert([(f"i{i}", int(v), False, f"{i:08d}") for i, v in enumerate(h)])
+        got = sorted(sorted(int(m) for m in members) for members in idx.grouping(r, False).members)
+        print(f"check r={r}: {len(expect)} groups, MIH == brute force: {got == expect}")
+
+    # 2. grouping at scale
+    h = synth_hashes(args.items, rng)
+    idx = PhashIndex()
+    idx.upsert([(f"i{i}", int(v), False, f"{i:08d}") for i, v in enumerate(h)])
+    for r in (2, 4, 6):
+        t = time.perf_counter()
+        g = idx.grouping(r, False)
+        print(f"group {args.items} hashes r={r}: {time.perf_counter() - t:6.2f}s  {g.stats}")
+
+    # 3. endpoint
+    from datetime import datetime, timedelta
+    from alembic import command
+    from alembic.config import Config
+    from fastapi.testclient import TestClient
+
+    from app.db import engine
+    from app.main import app
+    from app.services.phash import phash_image, to_db
+    from app.util.ids import new_id
+
+    api_root = Path(__file__).parent.parent
+    cfg = Config(str(api_root / "alembic.ini"))
+    cfg.set_main_option("script_location", str(api_root / "alembic"))
+    command.upgrade(cfg, "head")
+
+    now = datetime.utcnow()
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        tool_id = cur.execute("SELECT id FROM tools LIMIT 1").fetchone()[0]
+        cat_id = cur.execute("SELECT id FROM categories LIMIT 1").fetchone()[0]
+        rows = []
+        for i, v in enumerate(h):
+            at = now - timedelta(seconds=i)
+            rows.append((new_id(), f"item {i}", tool_id, f"m/{i}.png", f"t/{i}.jpg", cat_id, new_id(), at, at, to_db(int(v))))
+        cur.executemany("INSERT INTO items (id, title, tool_id, media_type, media_path, thumb_path, category_id,"
+                        " is_category_locked, current_version_id, created_at, updated_at, is_deleted, status, media_phash)"
+                        " VALUES (?, ?, ?, 'image', ?, ?, ?, 0, ?, ?, ?, 0, 'ready', ?)", rows)
+        raw.commit()
+    finally:
+        raw.close()
+
+    with TestClient(app) as c:
+        def get(**params):
+            r = c.get("/items/duplicates", params={"scope": "phash", "page_size": 200, "check_files": 0, **params})
+            assert r.status_code == 200, r.text[:300]
+            return r.json()
+
+        phash_index.invalidate()
+        t = time.perf_counter()
+        j = get()
+        cold = time.perf_counter() - t
+        ts = []
+        for _ in range(5):
+            t = time.perf_counter()
+            get(cursor=j["next_cursor"])
+            ts.append(time.perf_counter() - t)
+        print(f"endpoint {args.items} items: cold {cold * 1000:.0f}ms ({j['total_groups']} groups), "
+              f"warm cursor page {sorted(ts)[2] * 1000:.1f}ms")
+
+        # 4. backfill from generated thumbnails
+        from PIL import Image, ImageDraw
+
+        (storage / "t").mkdir(parents=True, exist_ok=True)
+        ids = []
+        raw = engine.raw_connection()
+        try:
+            cur = raw.cursor()
+            for i in range(args.files):
+                im = Image.new("RGB", (768, 512), tuple(int(x) for x in rng.integers(0, 255, 3)))
+                dr = ImageDraw.Draw(im)
+                for _ in range(12):
+                    x, y = int(rng.integers(0, 700)), int(rng.integers(0, 450))
+                    dr.ellipse([x, y, x + 120, y + 80], fill=tuple(int(v) for v in rng.integers(0, 255, 3)))
+                im.save(storage / "t" / f"f{i}.jpg", "JPEG", quality=85)
+                iid = new_id()
+                ids.append(iid)
+                cur.execute("INSERT INTO items (id, title, tool_id, media_type, media_path, thumb_path, category_id,"
+                            " is_category_locked, current_version_id, created_at, updated_at, is_deleted, status)"
+                            " VALUES (?, ?, ?, 'image', ?, ?, ?, 0, ?, ?, ?, 0, 'ready')",
+                            (iid, f"file {i}", tool_id, f"m/f{i}.png", f"t/f{i}.jpg", cat_id, new_id(), now, now))
+            raw.commit()
+        finally:
+            raw.close()
+        r = c.post("/_maintenance/backfill_phash", json={"limit": args.files}).json()
+        print(f"backfill {r['updated']} thumbnails: {r['items_per_sec']} items/s")
+        with Image.open(storage / "t" / "f0.jpg") as im:
+            t = time.perf_counter()
+            for _ in range(50):
+                im2 = Image.open(storage / "t" / "f0.jpg")
+                phash_image(im2)
+            print(f"phash of one 768px thumbnail: {(time.perf_counter() - t) / 50 * 1000:.2f}ms")
+
+
+def _groups_of(labels: np.ndarray):
+    out = {}
+    for i, l in enumerate(labels.tolist()):
+        out.setdefault(l, []).append(i)
+    return out.values()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark emptying the trash on a synthetic, fully migrated database.
+
+Seeds N trashed items (one version, three tag links, one embedding, and a media /
+thumb / poster file each) into a throw-away DB + storage root, then times:
+  - the legacy per-item purge (ORM deletes, commit per item, serial unlinks), on a
+    sample, for comparison
+  - services.purge over the rest
+  - an interrupted run: rows committed, files left in purge_files, then resume_files()
+
+Usage:
+  python scripts/bench_purge.py [--items 50000] [--legacy-sample 1000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=50_000)
+    ap.add_argument("--legacy-sample", type=int, default=1000)
+    args = ap.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_purge_"))
+    storage = tmp / "storage"
+    # must be set before app.settings is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{(tmp / 'bench.db').as_posix()}"
+    os.environ["STORAGE_ROOT"] = str(storage)
+
+    from datetime import datetime
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import text
+    from sqlmodel import Session, select
+
+    from app.db import engine
+    from app.models import Item, ItemEmbedding, ItemTag, ItemVersion
+    from app.services import purge
+    from app.services.storage import safe_unlink
+    from app.util.ids import new_id
+
+    api_root = Path(__file__).parent.parent
+    cfg = Config(str(api_root / "alembic.ini"))
+    cfg.set_main_option("script_location", str(api_root / "alembic"))
+    command.upgrade(cfg, "head")
+
+    n = args.items
+    print(f"seeding {n} trashed items + {3 * n} files into {tmp} ...")
+    t0 = time.perf_counter()
+    now = datetime.utcnow()
+    for d in ("m", "t", "p"):
+        (storage / d).mkdir(parents=True, exist_ok=True)
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        tool_id = cur.execute("SELECT id FROM tools LIMIT 1").fetchone()[0]
+        cat_id = cur.execute("SELECT id FROM categories LIMIT 1").fetchone()[0]
+        tag_ids = [new_id() for _ in range(50)]
+        cur.executemany("INSERT INTO tags (id, name, created_at) VALUES (?, ?, ?)",
+                        [(tid, f"标签{i}", now) for i, tid in enumerate(tag_ids)])
+        items, versions, links, embs = [], [], [], []
+        for i in range(n):
+            iid, vid = new_id(), new_id()
+            items.append((iid, f"作品{i}", tool_id, f"m/{i}.png", f"t/{i}.jpg", f"p/{i}.jpg", cat_id, vid, now, now, now))
+            versions.append((vid, iid, 1, f"prompt {i}", now))
+            links += [(iid, tag_ids[(i + k * 7) % len(tag_ids)], now) for k in range(3)]
+            embs.append((iid, "bench", 4, b"\0" * 16, now))
+            for rel in (f"m/{i}.png", f"t/{i}.jpg", f"p/{i}.jpg"):
+                (storage / rel).write_bytes(b"x")
+        cur.executemany("INSERT INTO items (id, title, tool_id, media_type, media_path, thumb_path, poster_path, category_id,"
+                        " is_category_locked, current_version_id, created_at, updated_at, deleted_at, is_deleted, status)"
+                        " VALUES (?, ?, ?, 'image', ?, ?, ?, ?, 0, ?, ?, ?, ?, 1, 'ready')", items)
+        cur.executemany("INSERT INTO item_versions (id, item_id, v, prompt_blob, created_at) VALUES (?, ?, ?, ?, ?)", versions)
+        cur.executemany("INSERT OR IGNORE INTO item_tags (item_id, tag_id, created_at) VALUES (?, ?, ?)", links)
+        cur.executemany("INSERT INTO item_embeddings (item_id, model_key, dim, vector_blob, created_at) VALUES (?, ?, ?, ?, ?)", embs)
+        raw.commit()
+    finally:
+        raw.close()
+    print(f"  seeded in {time.perf_counter() - t0:.1f}s")
+
+    ids = [it[0] for it in items]
+    sample, rest = ids[: args.legacy_sample], ids[args.legacy_sample :]
+
+    # legacy: what bulk_purge / purge_deleted did for every item
+    t = time.perf_counter()
+    with Session(engine) as s:
+        for iid in sample:
+            it = s.get(Item, iid)
+            paths = [(storage / p).resolve() for p in (it.media_path, it.thumb_path, it.poster_path) if p]
+            for model in (ItemEmbedding, ItemTag, ItemVersion):
+                for r in s.exec(select(model).where(model.item_id == iid)).all():
+                    s.delete(r)
+            s.delete(it)
+            s.commit()
+            for p in paths:
+                if p.exists():
+                    safe_unlink(p)
+    dt = time.perf_counter() - t
+    print(f"legacy per-item   {len(sample) / dt:10.1f} items/s   (sample of {len(sample)}; ~{n / (len(sample) / dt):.0f}s for {n})")
+
+    # interrupted run: the last 1000 items lose their files phase
+    crash, rest = rest[-1000:], rest[:-1000]
+    res = purge.purge(rest)
+    print(f"purge engine      {res['deleted']['items'] / res['seconds']:10.1f} items/s   {res['seconds']:.2f}s  {res['phases_sec']}\n  {res['deleted']}")
+
+    with Session(engine) as s:
+        purge._delete_chunk(s, crash, purge_files=True, outbox=True)
+        s.commit()
+        pending = s.exec(text("SELECT COUNT(*) FROM purge_files")).one()[0]
+    print(f"interrupted: {pending} files pending, resume -> {purge.resume_files()}")
+
+    with Session(engine) as s:
+        left = {t: s.exec(text(f"SELECT COUNT(*) FROM {t}")).one()[0]
+                for t in ("items", "item_versions", "item_tags", "item_embeddings", "items_fts_docs", "purge_files")}
+    files_left = sum(1 for d in ("m", "t", "p") for _ in (storage / d).iterdir())
+    print(f"left: {left}, files {files_left}")
+
+
+if __name__ == "__main__":
+    main()
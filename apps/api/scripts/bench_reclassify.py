@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark bulk reclassification (items/sec) on a synthetic database.
+
+Creates a throw-away SQLite DB with N items spread over the seeded categories,
+each with a random CLIP-sized embedding, then times:
+  - the batch engine (app.services.reclassify) over all N items
+  - the per-item classify_item path over a small sample, for comparison
+
+Usage:
+  python scripts/bench_reclassify.py [--items 100000] [--dim 512] [--legacy-sample 500]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=100_000)
+    ap.add_argument("--dim", type=int, default=512)
+    ap.add_argument("--categories", type=int, default=20)
+    ap.add_argument("--legacy-sample", type=int, default=500)
+    ap.add_argument("--keep", action="store_true", help="keep the temp database")
+    args = ap.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_reclassify_"))
+    # must be set before app.settings is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{(tmp / 'bench.db').as_posix()}"
+    os.environ["STORAGE_ROOT"] = str(tmp / "storage")
+
+    import numpy as np
+    from datetime import datetime, timedelta
+    from sqlmodel import Session, SQLModel, select
+
+    from app.db import engine
+    from app import models  # noqa: F401
+    from app.models import Category, Tool, Item, ItemEmbedding
+    from app.services.auto_category import classify_item
+    from app.services.classify import MODEL_KEY_DEFAULT
+    from app.services.reclassify import reclassify_items
+    from app.util.ids import new_id
+
+    SQLModel.metadata.create_all(engine)
+    rng = np.random.default_rng(0)
+
+    print(f"seeding {args.items} items (dim={args.dim}) into {tmp} ...")
+    t0 = time.perf_counter()
+    with Session(engine) as s:
+        now = datetime.utcnow()
+        unc = Category(id=new_id(), name="未分类", sort_order=0, is_active=True, created_at=now)
+        cats = [
+            Category(id=new_id(), name=f"cat{i:02d}", sort_order=i + 1, is_active=True, created_at=now)
+            for i in range(args.categories)
+        ]
+        tool = Tool(id=new_id(), key="bench", label="bench", created_at=now)
+        s.add_all([unc, tool, *cats])
+        s.commit()
+
+        protos = rng.normal(size=(len(cats), args.dim)).astype(np.float32)
+        item_rows = []
+        emb_rows = []
+        for i in range(args.items):
+            k = i % len(cats)
+            iid = new_id()
+            # a quarter of the items start out uncategorized
+            cat_id = unc.id if i % 4 == 0 else cats[k].id
+            vec = protos[k] + 2.0 * rng.normal(size=args.dim).astype(np.float32)
+            item_rows.append({
+                "id": iid, "title": f"bench {i}", "tool_id": tool.id, "media_type": "image",
+                "media_path": "", "thumb_path": "", "category_id": cat_id,
+                "is_category_locked": False, "is_deleted": False,
+                "created_at": now - timedelta(seconds=i), "updated_at": now,
+            })
+            emb_rows.append({
+                "item_id": iid, "model_key": MODEL_KEY_DEFAULT, "dim": args.dim,
+                "vector_blob": vec.tobytes(), "updated_at": now,
+            })
+        s.bulk_insert_mappings(Item, item_rows)
+        s.bulk_insert_mappings(ItemEmbedding, emb_rows)
+        s.commit()
+    print(f"seeded in {time.perf_counter() - t0:.1f}s")
+
+    with Session(engine) as s:
+        n = min(args.legacy_sample, args.items)
+        ids = list(s.exec(select(Item.id).limit(n)).all())
+        classify_item(s, ids[0])  # warm the centroid cache
+        t0 = time.perf_counter()
+        for iid in ids:
+            classify_item(s, iid, topk=3)
+        dt = time.perf_counter() - t0
+        print(f"per-item classify_item : {n:>7} items in {dt:7.2f}s -> {n / dt:10.0f} items/s")
+
+    for dry_run in (True, False):
+        with Session(engine) as s:
+            t0 = time.perf_counter()
+            res = reclassify_items(s, limit=args.items, dry_run=dry_run, only_uncategorized=False, force=True)
+            dt = time.perf_counter() - t0
+            label = "batch dry_run" if dry_run else "batch apply"
+            print(
+                f"{label:<23}: {res['scanned']:>7} items in {dt:7.2f}s -> {res['scanned'] / dt:10.0f} items/s"
+                f"  (would_update={res['would_update']}, applied={res['applied']})"
+            )
+
+    if not args.keep:
+        engine.dispose()
+        import shutil
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
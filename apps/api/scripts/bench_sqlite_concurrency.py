@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent reads while an upload is writing, before/after the SQLite profile.
+
+For each mode a throw-away prompt-gallery DB is seeded with N items; then one writer
+thread replays uploads (item + version + job rows per transaction, like create_item)
+while reader threads run the GET /items list query (page + total count). Reports read
+latency p50/p95/p99, reads/s, writes/s and "database is locked" errors.
+
+  before: create_engine(pool_pre_ping=True), rollback journal, default pragmas
+  after:  app.db.make_engine (WAL, synchronous=NORMAL, busy_timeout, mmap, cache, pool)
+
+Also times library.db connection acquisition: sqlite3.connect per call vs the pool.
+
+Usage:
+  python scripts/bench_sqlite_concurrency.py [--items 50000] [--readers 4] [--seconds 5]
+"""
+import argparse
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel, create_engine
+
+from app import models  # noqa: F401
+from app.db import make_engine
+from app.models import Item, ItemVersion, Job
+from app.util.ids import new_id
+from app.util.sqlite import ConnectionPool
+
+LIST_SQL = text("""
+    SELECT id, title, media_path, thumb_path, created_at FROM items
+    WHERE is_deleted = 0
+    ORDER BY created_at DESC, id DESC
+    LIMIT 50 OFFSET :off
+""")
+COUNT_SQL = text("SELECT COUNT(*) FROM items WHERE is_deleted = 0")
+
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))] if xs else float("nan")
+
+
+def _seed(engine, n: int) -> None:
+    SQLModel.metadata.create_all(engine)
+    base = datetime.utcnow() - timedelta(days=30)
+    raw = engine.raw_connection()
+    try:
+        raw.cursor().executemany(
+            "INSERT INTO items (id, title, tool_id, media_type, media_path, thumb_path, category_id,"
+            " is_category_locked, created_at, updated_at, is_deleted, status)"
+            " VALUES (?, ?, 't', 'image', ?, ?, 'c', 0, ?, ?, 0, 'ready')",
+            (
+                (new_id(), f"item {i}", f"media/{i}.png", f"thumbs/{i}.jpg",
+                 base + timedelta(seconds=i), base + timedelta(seconds=i))
+                for i in range(n)
+            ),
+        )
+        # from the init migration (create_all only knows the model-level indexes)
+        raw.cursor().execute("CREATE INDEX IF NOT EXISTS ix_items_created_at_id ON items (created_at, id)")
+        raw.cursor().execute("ANALYZE")
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def _writer(engine, stop: threading.Event, out: dict) -> None:
+    while not stop.is_set():
+        t = time.perf_counter()
+        try:
+            with Session(engine) as s:
+                now = datetime.utcnow()
+                iid = new_id()
+                s.add(Item(id=iid, title="upload", tool_id="t", media_path=f"media/{iid}.png",
+                           thumb_path=f"thumbs/{iid}.jpg", category_id="c", status="processing",
+                           created_at=now, updated_at=now))
+                s.add(ItemVersion(id=new_id(), item_id=iid, v=1, prompt_blob="", created_at=now))
+                s.add(Job(id=new_id(), kind="item_postprocess", item_id=iid, status="queued",
+                          attempts=0, max_attempts=3, created_at=now, updated_at=now))
+                s.commit()
+            out["writes"] += 1
+            out["write_ms"].append((time.perf_counter() - t) * 1000.0)
+        except Exception as e:
+            out["errors"] += 1
+            out["last_error"] = str(e).splitlines()[0]
+        time.sleep(0.002)
+
+
+def _reader(engine, stop: threading.Event, out: dict, seed: int) -> None:
+    off = seed * 50
+    while not stop.is_set():
+        t = time.perf_counter()
+        try:
+            with Session(engine) as s:
+                s.exec(LIST_SQL, params={"off": off}).all()
+                s.exec(COUNT_SQL).one()
+            out["lat"].append((time.perf_counter() - t) * 1000.0)
+        except Exception as e:
+            out["errors"] += 1
+            out["last_error"] = str(e).splitlines()[0]
+        off = (off + 50) % 5000
+
+
+def run(label: str, engine, items: int, readers: int, seconds: float) -> None:
+    _seed(engine, items)
+    with engine.connect() as c:
+        mode = c.exec_driver_sql("PRAGMA journal_mode").scalar()
+
+    stop = threading.Event()
+    w = {"writes": 0, "write_ms": [], "errors": 0, "last_error": None}
+    rs = [{"lat": [], "errors": 0, "last_error": None} for _ in range(readers)]
+    threads = [threading.Thread(target=_writer, args=(engine, stop, w))]
+    threads += [threading.Thread(target=_reader, args=(engine, stop, rs[i], i)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    lat = [x for r in rs for x in r["lat"]]
+    errs = sum(r["errors"] for r in rs)
+    last = next((r["last_error"] for r in rs if r["last_error"]), None) or w["last_error"]
+    print(f"{label:<7} journal={mode:<7} reads/s {len(lat) / seconds:8.1f}   "
+          f"read p50 {_pct(lat, 50):7.2f} ms  p95 {_pct(lat, 95):7.2f} ms  p99 {_pct(lat, 99):7.2f} ms   "
+          f"writes/s {w['writes'] / seconds:7.1f} (p95 {_pct(w['write_ms'], 95):6.2f} ms)   "
+          f"errors r={errs} w={w['errors']}" + (f"  [{last}]" if last else ""))
+    engine.dispose()
+
+
+def bench_library_connections(path: Path, calls: int) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS assets (id TEXT PRIMARY KEY, kind TEXT)")
+    conn.commit()
+    conn.close()
+
+    t = time.perf_counter()
+    for _ in range(calls):
+        c = sqlite3.connect(str(path))
+        c.row_factory = sqlite3.Row
+        c.execute("SELECT COUNT(*) FROM assets").fetchone()
+        c.close()
+    per_call = (time.perf_counter() - t) / calls * 1e6
+
+    pool = ConnectionPool(str(path), size=4)
+    t = time.perf_counter()
+    for _ in range(calls):
+        with pool.connection() as c:
+            c.execute("SELECT COUNT(*) FROM assets").fetchone()
+    pooled = (time.perf_counter() - t) / calls * 1e6
+    pool.close()
+    print(f"library get_db: connect-per-call {per_call:7.1f} us/call   pooled {pooled:7.1f} us/call")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=50_000)
+    ap.add_argument("--readers", type=int, default=4)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--library-calls", type=int, default=2000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        before_url = f"sqlite:///{Path(d, 'before.db').as_posix()}"
+        after_url = f"sqlite:///{Path(d, 'after.db').as_posix()}"
+        # the engine app/db.py used to build
+        before = create_engine(before_url, connect_args={"check_same_thread": False}, pool_pre_ping=True)
+        run("before", before, args.items, args.readers, args.seconds)
+        run("after", make_engine(after_url), args.items, args.readers, args.seconds)
+        bench_library_connections(Path(d, "library.db"), args.library_calls)
+
+
+if __name__ == "__main__":
+    main()
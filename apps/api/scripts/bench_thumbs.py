@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark thumbnail generation (services/thumbs.py) and what a grid page downloads.
+
+For --images photo-like JPEGs of --size pixels (and as many PNGs of half that size):
+  - CPU ms per image (thread CPU time): the former single 768px JPEG thumb (full decode,
+    default-filter resize), the same thumb now (draft()-reduced decode), and the thumb
+    plus every THUMB_RENDITIONS x THUMB_FORMATS rendition from one reduced decode
+  - bytes per grid page of --page tiles --tile CSS px wide, at 1x and 2x pixel density:
+    the 768px thumb for every tile vs the smallest rendition covering the tile
+    (what a browser picks from the DTO's srcset), WebP and JPEG
+
+Usage:
+  python scripts/bench_thumbs.py [--images 10] [--size 4000x3000] [--page 60] [--tile 200]
+"""
+import argparse
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def legacy_thumb(src: Path, dst: Path, max_w: int = 768, quality: int = 85) -> None:
+    # make_image_thumb as it was before renditions
+    from PIL import Image
+
+    with Image.open(src) as im:
+        im = im.convert("RGB")
+        w, h = im.size
+        if w > max_w:
+            im = im.resize((max_w, int(h * (max_w / w))))
+        im.save(dst, format="JPEG", quality=quality, optimize=True)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--images", type=int, default=10)
+    ap.add_argument("--size", default="4000x3000")
+    ap.add_argument("--page", type=int, default=60)
+    ap.add_argument("--tile", type=int, default=200)
+    args = ap.parse_args()
+    w, h = (int(x) for x in args.size.split("x"))
+
+    import numpy as np
+    from PIL import Image
+
+    from app.services import thumbs
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_thumbs_"))
+    rng = np.random.default_rng(5)
+    sources = []
+    for i in range(args.images):
+        for fmt, (sw, sh) in (("JPEG", (w, h)), ("PNG", (w // 2, h // 2))):
+            # smooth gradient + noise: photo-like, not a trivially compressible flat image
+            base = np.linspace(0, 255, sw, dtype=np.float32)[None, :, None] * rng.random(3, dtype=np.float32)
+            px = np.clip(base + rng.normal(0, 12, (sh, sw, 3)), 0, 255).astype(np.uint8)
+            p = tmp / f"src{i}.{fmt.lower()}"
+            b = io.BytesIO()
+            Image.fromarray(px).save(b, fmt, **({"quality": 90} if fmt == "JPEG" else {}))
+            p.write_bytes(b.getvalue())
+            sources.append((fmt, p))
+
+    results = {}
+    for fmt in ("JPEG", "PNG"):
+        srcs = [p for f, p in sources if f == fmt]
+        for label, fn in (
+            ("legacy", lambda s, d: legacy_thumb(s, d)),
+            ("thumb", lambda s, d: thumbs.make_image_thumb(s, d)),
+            ("renditions", lambda s, d: thumbs.make_image_renditions(s, d)),
+        ):
+            cpu = []
+            for src in srcs:
+                dst = tmp / label / f"{src.stem}_{fmt}.jpg"
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                t = time.thread_time()
+                fn(src, dst)
+                cpu.append((time.thread_time() - t) * 1000)
+            cpu.sort()
+            results[(fmt, label)] = cpu[len(cpu) // 2]
+        sw, sh = (w, h) if fmt == "JPEG" else (w // 2, h // 2)
+        print(f"{fmt:4s} {sw}x{sh} CPU-ms/image: legacy 768px thumb {results[(fmt, 'legacy')]:6.1f}  "
+              f"768px thumb now {results[(fmt, 'thumb')]:6.1f}  "
+              f"thumb + {len(thumbs.rendition_widths())}x{len(thumbs.rendition_formats())} renditions "
+              f"{results[(fmt, 'renditions')]:6.1f}")
+
+    # grid page bytes, from the JPEG sources' outputs (the typical upload)
+    stems = [f"{p.stem}_JPEG" for f, p in sources if f == "JPEG"]
+    legacy = sum((tmp / "legacy" / f"{s}.jpg").stat().st_size for s in stems) / len(stems)
+    print(f"grid page of {args.page} tiles {args.tile}px wide:")
+    print(f"  legacy 768px JPEG thumb: {legacy * args.page / 1024:8.1f} KB")
+    for dpr in (1, 2):
+        need = args.tile * dpr
+        width = next((x for x in thumbs.rendition_widths() if x >= need), thumbs.rendition_widths()[-1])
+        for f in thumbs.rendition_formats():
+            per = sum(thumbs.rendition_path(tmp / "renditions" / f"{s}.jpg", width, f).stat().st_size for s in stems) / len(stems)
+            print(f"  {dpr}x density, {f:4s} {width:4d}w: {per * args.page / 1024:8.1f} KB ({per / legacy * 100:5.1f}% of legacy)")
+    print(f"thumbs: {thumbs.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark exact top-k search latency of the in-memory vector index.
+
+Fills app.services.vector_index.VectorIndex with random unit vectors (no DB) and
+reports p50/p95 per query, unfiltered and with a category / tool filter.
+
+Usage:
+  python scripts/bench_vector_index.py [--sizes 100000,1000000] [--dim 512] [--k 20] [--queries 50]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.vector_index import VectorIndex
+
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))]
+
+
+def bench(n: int, dim: int, k: int, queries: int, categories: int, tools: int) -> None:
+    rng = np.random.default_rng(0)
+    idx = VectorIndex(dim=dim, capacity=n + max(1024, n // 8))  # same headroom as the DB loader
+
+    t0 = time.perf_counter()
+    step = 50_000
+    for start in range(0, n, step):
+        m = min(step, n - start)
+        ids = [f"it{start + i}" for i in range(m)]
+        vecs = rng.standard_normal((m, dim), dtype=np.float32)
+        cats = [f"c{(start + i) % categories}" for i in range(m)]
+        tls = [f"t{(start + i) % tools}" for i in range(m)]
+        dels = [(start + i) % 50 == 0 for i in range(m)]
+        idx.upsert(ids, vecs, cats, tls, dels)
+    load_s = time.perf_counter() - t0
+    mem_mb = idx.vecs.nbytes / (1024 * 1024)
+    print(f"n={n:>9,} dim={dim}  load {load_s:6.1f}s  matrix {mem_mb:7.0f} MB")
+
+    qs = rng.standard_normal((queries, dim), dtype=np.float32)
+    cases = [
+        ("unfiltered", {}),
+        (f"category (1/{categories})", {"category_id": "c3"}),
+        (f"tool (1/{tools})", {"tool_id": "t1"}),
+        ("include_deleted", {"include_deleted": True}),
+    ]
+    for label, kw in cases:
+        idx.search(qs[0], k=k, **kw)  # warm-up
+        lat = []
+        for q in qs:
+            t = time.perf_counter()
+            idx.search(q, k=k, **kw)
+            lat.append((time.perf_counter() - t) * 1000.0)
+        print(f"  {label:<22} k={k:<3} p50 {_pct(lat, 50):8.2f} ms   p95 {_pct(lat, 95):8.2f} ms")
+
+    # incremental maintenance
+    t = time.perf_counter()
+    idx.upsert(["new0"], rng.standard_normal((1, dim), dtype=np.float32), ["c0"], ["t0"], [False])
+    up_ms = (time.perf_counter() - t) * 1000.0
+    t = time.perf_counter()
+    idx.remove([f"it{i}" for i in range(1000)])
+    rm_ms = (time.perf_counter() - t) * 1000.0
+    print(f"  upsert 1 vector {up_ms:.3f} ms   remove 1000 {rm_ms:.2f} ms")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="100000,1000000")
+    ap.add_argument("--dim", type=int, default=512)
+    ap.add_argument("--k", type=int, default=20)
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--categories", type=int, default=20)
+    ap.add_argument("--tools", type=int, default=5)
+    args = ap.parse_args()
+
+    for n in [int(x) for x in args.sizes.split(",") if x.strip()]:
+        bench(n, args.dim, args.k, args.queries, args.categories, args.tools)
+
+
+if __name__ == "__main__":
+    main()
@@ -56,6 +56,9 @@ export async function POST(req: NextRequest, ctx: Ctx) {
 export async function PATCH(req: NextRequest, ctx: Ctx) {
     return proxy(req, ctx);
 }
+export async function PUT(req: NextRequest, ctx: Ctx) {
+    return proxy(req, ctx);
+}
 export async function DELETE(req: NextRequest, ctx: Ctx) {
     return proxy(req, ctx);
 }
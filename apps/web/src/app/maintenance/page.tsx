@@ -259,7 +259,7 @@ export default function MaintenancePage() {
                                 onClick={async () => {
                                     try {
                                         const r = await apiJson("/_maintenance/fts_rebuild", { method: "POST" });
-                                        toast.success(`FTS rebuilt: ${r.rebuilt}`);
+                                        toast.success(`FTS rebuilt: ${r.rebuilt} (${r.rows_per_sec ?? "-"} rows/s)`);
                                         refreshDiag();
                                     } catch (e: any) {
                                         toast.error(e?.message || String(e));
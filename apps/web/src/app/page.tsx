@@ -2,13 +2,13 @@
 
 import { Suspense, useEffect, useMemo, useState } from "react";
 import { useSearchParams } from "next/navigation";
-import { Search, Copy, Plus, Filter, Trash2, RotateCcw, PlayCircle } from "lucide-react";
+import { Search, Copy, Plus, Filter, Trash2, RotateCcw, PlayCircle, Loader2, AlertTriangle } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import { Card, CardContent, CardFooter, CardHeader } from "@/components/ui/card";
 import { Input } from "@/components/ui/input";
 import { Badge } from "@/components/ui/badge";
-import { listItems, getCategories, getTools, listSeries, trashItem, restoreItem } from "@/lib/api";
-import { fileUrl } from "@/lib/files";
+import { listItems, getItem, getCategories, getTools, listSeries, trashItem, restoreItem, reprocessItem, friendlyError } from "@/lib/api";
+import { fileSrcset, fileUrl } from "@/lib/files";
 import type { CategoryDTO, ToolDTO, ItemDTO, SeriesDTO } from "@/lib/types";
 import { toast } from "sonner";
 import { AddItemDialog } from "@/components/AddItemDialog";
@@ -17,6 +17,45 @@ import { FilterDialog, type FilterState } from "@/components/FilterDialog";
 import { ActiveFiltersBar } from "@/components/ActiveFiltersBar";
 import { BulkActionBar } from "@/components/BulkActionBar";
 
+// rendered tile width per breakpoint of the grid below (grid-cols-2 sm:3 lg:4 xl:5)
+const GRID_SIZES = "(min-width: 1280px) 20vw, (min-width: 1024px) 25vw, (min-width: 640px) 33vw, 50vw";
+
+// how often items still being post-processed are re-fetched
+const PROCESSING_POLL_MS = 2000;
+
+// tile media for uploads whose thumb/poster does not exist yet, or never will
+function ProcessingTile({ item, onReprocess }: { item: ItemDTO; onReprocess: () => void }) {
+  if (item.status === "failed") {
+    return (
+      <div className="absolute inset-0 flex flex-col items-center justify-center gap-2 bg-red-50 p-3 text-center text-xs text-red-600">
+        <AlertTriangle className="h-5 w-5" />
+        <span className="font-bold">处理失败</span>
+        {item.status_error ? (
+          <span className="line-clamp-3 break-all text-[10px] text-red-400" title={item.status_error}>
+            {item.status_error}
+          </span>
+        ) : null}
+        <Button
+          variant="outline"
+          className="h-7 rounded-full px-3 text-xs"
+          onClick={(e) => {
+            e.stopPropagation();
+            onReprocess();
+          }}
+        >
+          <RotateCcw className="mr-1 h-3 w-3" /> 重新处理
+        </Button>
+      </div>
+    );
+  }
+  return (
+    <div className="absolute inset-0 flex flex-col items-center justify-center gap-2 bg-gray-50 text-xs text-gray-400">
+      <Loader2 className="h-5 w-5 animate-spin" />
+      <span>处理中…</span>
+    </div>
+  );
+}
+
 function Chip({ active, children, onClick }: any) {
   return (
     <button
@@ -162,6 +201,31 @@ function PageContent() {
     }
   }
 
+  // uploads are post-processed in the background: re-fetch those items until ready / failed
+  const processingKey = useMemo(
+    () => items.filter((it) => it.status === "processing").map((it) => it.id).join(","),
+    [items]
+  );
+  useEffect(() => {
+    if (!processingKey) return;
+    const ids = processingKey.split(",");
+    const timer = setInterval(async () => {
+      const fresh = await Promise.all(ids.map((id) => getItem(id).catch(() => null)));
+      const byId = new Map(fresh.filter((x): x is ItemDTO => !!x).map((x) => [x.id, x]));
+      setItems((prev) => prev.map((it) => byId.get(it.id) || it));
+    }, PROCESSING_POLL_MS);
+    return () => clearInterval(timer);
+  }, [processingKey]);
+
+  async function reprocess(itemId: string) {
+    try {
+      const it = await reprocessItem(itemId);
+      setItems((prev) => prev.map((x) => (x.id === itemId ? it : x)));
+    } catch (e: any) {
+      toast.error(friendlyError(e));
+    }
+  }
+
   useEffect(() => {
     const t = setTimeout(() => refresh(1), 250); // debounce
     return () => clearTimeout(t);
@@ -291,7 +355,9 @@ function PageContent() {
                   >
                     {/* 媒体 - 无padding，强制撑满 */}
                     <div className="relative w-full aspect-[9/16] bg-white group">
-                      {it.media_type === "video" ? (
+                      {it.status && it.status !== "ready" ? (
+                        <ProcessingTile item={it} onReprocess={() => reprocess(it.id)} />
+                      ) : it.media_type === "video" ? (
                         <video
                           className="absolute inset-0 h-full w-full object-contain"
                           src={fileUrl(it.media_url)}
@@ -312,16 +378,21 @@ function PageContent() {
                           }}
                         />
                       ) : (
-                        <img
-                          src={fileUrl(it.thumb_url || it.poster_url || it.media_url)}
-                          alt={it.title}
-                          className="absolute inset-0 h-full w-full object-contain"
-                          loading="lazy"
-                          onError={(e) => {
-                            e.currentTarget.style.display = "none";
-                            e.currentTarget.nextElementSibling?.classList.remove("hidden");
-                          }}
-                        />
+                        <picture>
+                          {Object.entries(it.srcset || {}).map(([type, srcset]) => (
+                            <source key={type} type={type} srcSet={fileSrcset(srcset)} sizes={GRID_SIZES} />
+                          ))}
+                          <img
+                            src={fileUrl(it.thumb_url || it.poster_url || it.media_url)}
+                            alt={it.title}
+                            className="absolute inset-0 h-full w-full object-contain"
+                            loading="lazy"
+                            onError={(e) => {
+                              e.currentTarget.style.display = "none";
+                              e.currentTarget.parentElement?.nextElementSibling?.classList.remove("hidden");
+                            }}
+                          />
+                        </picture>
                       )}
                       {/* Fallback for error */}
                       <div className="hidden absolute inset-0 flex items-center justify-center bg-gray-50 text-gray-400 text-xs">
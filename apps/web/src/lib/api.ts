@@ -1,6 +1,6 @@
 import type {
     PageDTO, ItemDTO, ToolDTO, CategoryDTO,
-    ItemVersionDTO, SeriesDTO, SeriesVersionDTO
+    ItemVersionDTO, SeriesDTO, SeriesVersionDTO, UploadSessionDTO
 } from "./types";
 
 import type { DuplicatePageDTO } from "./types";
@@ -132,13 +132,37 @@ export function createSeriesVersion(seriesId: string, body: { base_prompt_blob:
     });
 }
 
+// larger files go through a chunked upload, which the server writes straight into storage
+const CHUNKED_UPLOAD_MIN_BYTES = 8 * 1024 * 1024;
+
 export async function createItem(file: File, meta: any) {
+    if (file.size > CHUNKED_UPLOAD_MIN_BYTES) return createItemChunked(file, meta);
     const fd = new FormData();
     fd.append("file", file);
     fd.append("meta", JSON.stringify(meta));
     return apiFetch<ItemDTO>(`/items`, { method: "POST", body: fd });
 }
 
+async function createItemChunked(file: File, meta: any) {
+    const up = await apiFetch<UploadSessionDTO>(`/items/uploads`, {
+        method: "POST",
+        headers: { "content-type": "application/json" },
+        body: JSON.stringify({ filename: file.name, content_type: file.type || null, size: file.size, meta }),
+    });
+    try {
+        for (let offset = 0; offset < file.size; offset += up.chunk_size) {
+            await apiFetch<UploadSessionDTO>(`/items/uploads/${up.id}?offset=${offset}`, {
+                method: "PUT",
+                body: file.slice(offset, offset + up.chunk_size),
+            });
+        }
+        return await apiFetch<ItemDTO>(`/items/uploads/${up.id}/finalize`, { method: "POST" });
+    } catch (e) {
+        apiFetch(`/items/uploads/${up.id}`, { method: "DELETE" }).catch(() => { });
+        throw e;
+    }
+}
+
 
 export function bulkPatchItems(body: any) {
     return apiFetch<{ status: string; requested: number; updated: number; missing_item_ids: string[] }>(
@@ -152,6 +176,11 @@ export function bulkPatchItems(body: any) {
 }
 
 
+// re-runs upload post-processing (thumb/poster, embedding, classification), e.g. after "failed"
+export function reprocessItem(itemId: string) {
+    return apiFetch<ItemDTO>(`/items/${itemId}/reprocess`, { method: "POST" });
+}
+
 export function trashItem(itemId: string) {
     return apiFetch<{ status: string; deleted: boolean }>(`/items/${itemId}`, { method: "DELETE" });
 }
@@ -5,3 +5,14 @@ export function fileUrl(path: string) {
     if (path.startsWith("/files/")) return `${API_BASE}${path}`;
     return path;
 }
+
+// fileUrl() for every candidate of a srcset string ("url 256w, url 512w")
+export function fileSrcset(srcset: string) {
+    return srcset
+        .split(",")
+        .map((c) => {
+            const [url, w] = c.trim().split(/\s+/);
+            return `${fileUrl(url)} ${w}`;
+        })
+        .join(", ");
+}
@@ -65,14 +65,15 @@ export async function listAssets(params: {
 }
 
 export async function uploadAsset(file: File, kind?: string, source?: string) {
-    const formData = new FormData();
-    formData.append("file", file);
-    if (kind) formData.append("kind", kind);
-    if (source) formData.append("source", source);
-
-    const res = await fetch(`${LIBRARY_API_BASE}/library/assets/upload`, {
-        method: "POST",
-        body: formData,
+    // raw body: the server writes it straight into storage while hashing (no multipart spool)
+    const query = new URLSearchParams({ filename: file.name });
+    if (kind) query.set("kind", kind);
+    if (source) query.set("source", source);
+
+    const res = await fetch(`${LIBRARY_API_BASE}/library/assets/upload?${query}`, {
+        method: "PUT",
+        headers: { "content-type": file.type || "application/octet-stream" },
+        body: file,
     });
     if (!res.ok) throw new Error(`Failed to upload asset: ${res.statusText}`);
     return res.json();
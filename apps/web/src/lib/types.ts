@@ -28,6 +28,8 @@ export type ItemDTO = {
     media_url: string;
     thumb_url: string;
     poster_url?: string | null;
+    // grid renditions, mime type -> "url 256w, url 512w, ..." in preference order (empty until processed)
+    srcset?: Record<string, string>;
     series: { id?: string | null; name_snapshot?: string | null; delimiter_snapshot?: string | null };
     category: CategoryDTO;
     auto_category?: { category: CategoryDTO; confidence?: number | null } | null;
@@ -38,9 +40,27 @@ export type ItemDTO = {
     updated_at: string;
     is_deleted: boolean;
     deleted_at?: string | null;
+    // upload post-processing; thumb/poster only exist once "ready"
+    status?: "processing" | "ready" | "failed";
+    status_error?: string | null;
 };
 
-export type PageDTO<T> = { items: T[]; page: number; page_size: number; total: number };
+// resumable chunked upload (POST /items/uploads)
+export type UploadSessionDTO = {
+    id: string;
+    filename: string;
+    content_type?: string | null;
+    size: number;
+    received_bytes: number;
+    ranges: number[][]; // [start, end) byte ranges received
+    chunk_size: number; // suggested PUT size
+    status: "open" | "finalizing" | "done";
+    item_id?: string | null;
+    expires_at: string;
+};
+
+// total is only omitted (null) when the caller opts out with with_total=0 / cursor mode
+export type PageDTO<T> = { items: T[]; page: number; page_size: number; total: number; next_cursor?: string | null };
 
 
 export type DuplicateItemLiteDTO = {
@@ -71,4 +91,5 @@ export type DuplicatePageDTO = {
     page_size: number;
     total_groups: number;
     groups: DuplicateGroupDTO[];
+    next_cursor?: string | null;
 };